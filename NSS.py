@@ -8,6 +8,8 @@ Metocean & Energy Assessment Department
 import pandas as pd
 import numpy as np
 import os
+import copy
+import time
 import openpyxl
 from openpyxl import Workbook
 from openpyxl.formatting.rule import ColorScale, FormatObject
@@ -15,6 +17,12 @@ from openpyxl.styles import NamedStyle, Border, Color, Font, Alignment, PatternF
 from openpyxl.formatting.rule import ColorScaleRule
 from openpyxl import utils
 
+from backends import PandasBackend
+from export import export_nss_tables
+from group_index import GroupIndex
+from shared_arrays import SharedArrays, attach
+from sketch import QuantileSketch
+
 class NSS():    
     """ A class to calculate and print NSS tables from an instance of the MetoceanData object."""
 
@@ -22,13 +30,30 @@ class NSS():
     def __init__(self, metocean_data):
         # Initialise attributes of NSS object by taking informtation from the metocean_data instance
         print("Calculating NSS tables...")
-        self.set_up(metocean_data)
-        # Select the relevant data from the metocean_data.data attribute
-        self.parse_data(metocean_data)
-        # Use the selected data to calculate the NSS tables
-        self.get_NSS_tables()
-        # Print the NSS tables to excel files
-        self.produce_NSS_Excel()
+        profiler = metocean_data.profiler
+        with profiler.span("nss"):
+            with profiler.span("nss_compute", rows=metocean_data.data.shape[0]):
+                self.set_up(metocean_data)
+                # Select the relevant data from the metocean_data.data attribute
+                self.parse_data(metocean_data)
+                # Sketch medians are merged chunk by chunk, in this process
+                parallel = self.workers and not (self.method == "median" and self.sketch_error)
+                if not parallel:
+                    # Use the selected data to calculate the NSS tables
+                    self.get_NSS_tables()
+            if parallel:
+                # Every sea state calculated and printed to its own excel file by a worker process
+                with profiler.span("nss_workers") as workers_span:
+                    workers_span["seas"] = self.parallel_tables()
+            else:
+                # Print the NSS tables to excel files
+                with profiler.span("nss_save"):
+                    self.produce_NSS_Excel()
+            # Machine-readable copies of the tables, if selected in the config file
+            exports = metocean_data.config.get("table_exports")
+            if exports:
+                with profiler.span("nss_export"):
+                    export_nss_tables(self, f"{self.PID}_Metocean_NSS_Tables", exports)
 
     def set_up(self, metocean_data):
         """set_up: [Initialises the attributes of NSS from information contained in the MetoceanData object]
@@ -38,9 +63,15 @@ class NSS():
         """
         # doesnt check for wind and wave status bc shouldn't be called if they're FALSE
         # TODO: convert to Dictionary
+        self.metocean_data = metocean_data
         self.PID = metocean_data.config["project"]
         self.NSectors_wind = metocean_data.config["wind_sectors"]
         self.WS_bins_list = metocean_data.bins["WS"] 
+        # Wind speed bins as stored in the data. Integer bin codes in the compact layout.
+        if metocean_data.config["compact_layout"]:
+            self.WS_bin_codes = metocean_data.encode("WS_bins", self.WS_bins_list)
+        else:
+            self.WS_bin_codes = self.WS_bins_list
         self.WS_bin_size = metocean_data.config["wind_bin_size"]
         self.WS_HH = metocean_data.config["hub_height"]
         self.NSectors_wave = metocean_data.config["wave_sectors"]
@@ -50,45 +81,46 @@ class NSS():
         self.wave_spectral = metocean_data.config["wave_spectral"]
         self.Total_Count = metocean_data.data.shape[0]
         self.closed_boundary = metocean_data.config["bin_type"]
+        # Rank error of the sketch medians. None or 0 for exact medians.
+        self.sketch_error = metocean_data.config.get("median_sketch_error")
+        # Formatting of the Excel report. "fast" writes the values only.
+        self.report_profile = metocean_data.config.get("report_profile", "full")
+        # Number of worker processes calculating the sea states in parallel. None or 0 for a single process.
+        self.workers = metocean_data.config.get("nss_workers")
+        # Dataframe backend aggregating the values of every group
+        self.backend = metocean_data.backend
 
         # Create empty data attribute where to store wind and wave data conviniently. 
         # Create empty tables attribute of the right size to populate afterwards
-        self.Total_data = []
+        self.Total_data = {}
         self.Total_tables = np.empty((self.NSectors_wind + 1,self.NSectors_wave + 1,self.WS_bins_list.size,4))
         # If Wind and Swell wave data is included in the MetoceanData object, create data and tables attributes for them too 
         if self.wave_spectral: 
-            self.Wind_data, self.Swell_data = [],[]
+            self.Wind_data, self.Swell_data = {}, {}
             self.Wind_tables = np.empty((self.NSectors_wind + 1,self.NSectors_wave + 1,self.WS_bins_list.size,4))
             self.Swell_tables = np.empty((self.NSectors_wind + 1,self.NSectors_wave + 1,self.WS_bins_list.size,4)) # Swell sea not impacted by Wind Direction
 
     def parse_data(self, metocean_data):
-        """parse_data: [Populates the data attributes with wind and wave data taken from the MetoceanData object]
+        """parse_data: [Populates the data attributes with the Hs, Tp and peak enhancement factor columns of the MetoceanData
+            object, as numpy arrays. These are views of metocean_data.data, so no column is copied. The bin and
+            sector columns are read from the codes of the MetoceanData object.]
 
         Args:
             metoecan_data: [An instance of the MetoceanData object]
         """
-        # Total_data attribute is always present
+        # The peak enhancement factor is left out when it is not in the data, and its tables stay NaN
         if self.peak_enhancement == False and self.derive_peak_enhancement == False:
-            self.Total_data = metocean_data.data.loc[:,("WS_bins","WnD_sectors","WvD_sectors","Hs","Tp")]
-            self.Total_data["G"] = np.NAN
+            variables = ["Hs", "Tp"]
         else:
-           self.Total_data = metocean_data.data.loc[:,("WS_bins","WnD_sectors","WvD_sectors","Hs","Tp","G")]
+            variables = ["Hs", "Tp", "G"]
+        # Total_data attribute is always present
+        self.Total_data = {var: metocean_data.data[var].to_numpy() for var in variables}
 
-        # If Wind and Swell data are to be included, populate their respective attributes 
-        # and rename their variables for convinient handling 
+        # If Wind and Swell data are to be included, populate their respective attributes
+        # with the same keys for convinient handling
         if self.wave_spectral:
-            if self.peak_enhancement == False and self.derive_peak_enhancement == False:
-                self.Wind_data = metocean_data.data.loc[:,("WS_bins","WnD_sectors","WvD_W_sectors","Hs_W","Tp_W")]
-                self.Wind_data["G_W"] = np.NAN
-                self.Swell_data = metocean_data.data.loc[:,("WS_bins","WnD_sectors","WvD_S_sectors","Hs_S","Tp_S")]
-                self.Swell_data["G_S"] = np.NAN
-            else:
-                self.Wind_data = metocean_data.data.loc[:,("WS_bins","WnD_sectors","WvD_W_sectors","Hs_W","Tp_W","G_W")]
-                self.Swell_data = metocean_data.data.loc[:,("WS_bins","WnD_sectors","WvD_S_sectors","Hs_S","Tp_S","G_S")]
-            self.Wind_data.rename(
-                columns={"WvD_W_sectors": "WvD_sectors","Hs_W": "Hs","Tp_W":"Tp","G_W":"G"}, inplace=True)
-            self.Swell_data.rename(
-                columns={"WvD_S_sectors": "WvD_sectors","Hs_S": "Hs","Tp_S":"Tp","G_S":"G"}, inplace=True)
+            self.Wind_data = {var: metocean_data.data[var + "_W"].to_numpy() for var in variables}
+            self.Swell_data = {var: metocean_data.data[var + "_S"].to_numpy() for var in variables}
 
     def get_NSS_tables(self):
         """get_NSS_tables: [Populates the tables attributes]
@@ -101,103 +133,191 @@ class NSS():
 
         """ 
         print("Calculating NSS tables...")      
+        # Approximate medians from mergeable quantile sketches, with bounded memory
+        if self.method == "median" and self.sketch_error:
+            self.Total_tables = self.sketch_tables(self.get_sketches(self.Total_data, "WvD_sectors"))
+            if self.wave_spectral:
+                self.Swell_tables = self.sketch_tables(self.get_sketches(self.Swell_data, "WvD_S_sectors"))
+                self.Wind_tables = self.sketch_tables(self.get_sketches(self.Wind_data, "WvD_W_sectors"))
+            print("All NSS Tables calculated!")
+            print("Preparing Excel report...")
+            return
+
         # Calculate tables for NSS Total Sea and populate NSS.Total_tables attribute
-        for WnSector in range(0,self.NSectors_wind + 1):
-            for WvSector in range(0,self.NSectors_wave + 1):
-                if WnSector == 0: # OMNIDIRECTIONAL
-                    if WvSector == 0: # OMNIDIRECTIONAL
-                        self.Total_tables[WnSector][WvSector] = self.calc_table(self.Total_data)
-                    else:
-                        df_temp =  self.Total_data[self.Total_data.WvD_sectors == WvSector]
-                        self.Total_tables[WnSector][WvSector] = self.calc_table(df_temp)
-                else:
-                    if WvSector == 0:
-                        df_temp =  self.Total_data[self.Total_data.WnD_sectors == WnSector]
-                        self.Total_tables[WnSector][WvSector] = self.calc_table(df_temp)
-                    else:
-                        df_temp = self.Total_data[
-                            (self.Total_data.WvD_sectors == WvSector) & (self.Total_data.WnD_sectors == WnSector)]
-                        self.Total_tables[WnSector][WvSector] = self.calc_table(df_temp)        
+        self.Total_tables = self.index_tables(self.Total_data, "WvD_sectors")
 
         # Calculate tables for NSS Wind and Swell Sea
+        # SWELL COMPONENT SHOULDNT BE AFFECTED BY WIND, BUT INCLUDED ATM
         if self.wave_spectral:
             print("Boiling virtual kettle for virtual tea...")    
-            for WnSector in range(0,self.NSectors_wind + 1):
-                for WvSector in range(0,self.NSectors_wave + 1):
-                    if WnSector == 0: 
-                        if WvSector == 0: 
-                            self.Swell_tables[WnSector][WvSector] = self.calc_table(self.Swell_data)
-                            self.Wind_tables[WnSector][WvSector] = self.calc_table(self.Wind_data)
-                        else:
-                            df_temp =  self.Swell_data[self.Swell_data.WvD_sectors == WvSector]
-                            self.Swell_tables[WnSector][WvSector] = self.calc_table(df_temp)
-                            df_temp =  self.Wind_data[self.Wind_data.WvD_sectors == WvSector]
-                            self.Wind_tables[WnSector][WvSector] = self.calc_table(df_temp)
-                    else: # SWELL COMPONENT SHOULDNT BE AFFECTED BY WIND, BUT INCLUDED ATM
-                        if WvSector == 0: # Wind tables contain values for filtered wind but omnidirectional waves
-                            df_temp = self.Swell_data[self.Swell_data.WnD_sectors == WnSector]
-                            self.Swell_tables[WnSector][WvSector] = self.calc_table(df_temp)
-                            df_temp = self.Wind_data[self.Wind_data.WnD_sectors == WnSector]
-                            self.Wind_tables[WnSector][WvSector] = self.calc_table(df_temp)
-                        else:
-                            df_temp = self.Swell_data[
-                                (self.Swell_data.WvD_sectors == WvSector) & (self.Swell_data.WnD_sectors == WnSector)]
-                            self.Swell_tables[WnSector][WvSector] = self.calc_table(df_temp)
-                            df_temp = self.Wind_data[
-                                (self.Wind_data.WvD_sectors == WvSector) & (self.Wind_data.WnD_sectors == WnSector)]
-                            self.Wind_tables[WnSector][WvSector] = self.calc_table(df_temp)
+            self.Swell_tables = self.index_tables(self.Swell_data, "WvD_S_sectors")
+            self.Wind_tables = self.index_tables(self.Wind_data, "WvD_W_sectors")
 
         print("All NSS Tables calculated!")
         print("Preparing Excel report...")
 
-    def calc_table(self, NSS_data):
-        """ calc_table: [creates a single NSS table for a specific combination of wind and wave direction sector.
-                    Works the same for Total, Wind or Swell waves.]
+    def index_tables(self, NSS_data, wave_column):
+        """ index_tables: [creates all the NSS tables of a sea state from the shared group indices of the MetoceanData
+                    object. See sea_state_tables.]
 
             Args: 
-                NSS_data ([pandas Dataframe]): a dataframe containing wind and wave data for this particular table,
-                    already filtered by wind and wave sector
+                NSS_data ([dictionary]): Hs, Tp and G columns of the Total, Wind or Swell sea, see parse_data
+                wave_column ([string]): header of the wave direction sector column of the sea state in the MetoceanData object
 
             Returns:
-                tab ([numpy array]): numpy array containing the NSS table
+                tables ([numpy array]): numpy array containing the NSS tables, same layout as NSS.Total_tables
         """
-        # Create an empty table of the right size
-        tab = np.zeros((self.WS_bins_list.size,4))
-
-        # Iterate and populate with calculated values or NaNs if there are no registries for a particular wind speed bin
-        for i in range(self.WS_bins_list.size):
-            bin_centre = self.WS_bins_list[i]
-            df_temp = NSS_data[NSS_data.WS_bins == bin_centre]
-            if df_temp.shape[0] == 0:
-                tab[i] = [np.NAN, np.NAN, np.NAN, np.NAN]
-            else:
-                # probability of ocurrence of this particular wind speed bin in this particular wind and wave direction sector combination
-                # over the total number of events in the timeseries
-                tab[i][3] = df_temp["Hs"].size/self.Total_Count
-
-                # Mean or median depending on user selection
-                if self.method == "mean":
-                    tab[i][0] = df_temp["Hs"].mean()
-                    tab[i][1] = df_temp["Tp"].mean()
-                    tab[i][2] = df_temp["G"].mean()
-                        
-                else:
-                    tab[i][0] = df_temp["Hs"].median()
-                    tab[i][1] = df_temp["Tp"].median()
-                    tab[i][2] = df_temp["G"].median()
+        return sea_state_tables(
+            self.metocean_data.group_index,
+            NSS_data,
+            wave_column,
+            (self.NSectors_wind, self.NSectors_wave, self.WS_bins_list.size),
+            self.method,
+            self.Total_Count,
+            self.backend,
+        )
+
+    def parallel_tables(self):
+        """ parallel_tables: [calculates the tables of every sea state in a worker process of its own, which also
+                    prints them to an excel file of its own (see nss_filepath). The bin and sector codes and the
+                    values of the sea states are copied once to shared memory, which the workers only read.]
 
-        return tab
+            Returns:
+                [dictionary]: calculation and printing times of every sea state in seconds
+        """
+        print("Calculating NSS tables in {} worker processes...".format(self.workers))
+        seas = {"Total": ("WvD_sectors", self.Total_data)}
+        if self.wave_spectral:
+            seas["Wind"] = ("WvD_W_sectors", self.Wind_data)
+            seas["Swell"] = ("WvD_S_sectors", self.Swell_data)
+        columns = ["WS_bins", "WnD_sectors"] + [column for column, _ in seas.values()]
+        arrays = {column: self.metocean_data.get_codes(column) for column in columns}
+        sizes = {column: len(self.metocean_data.get_categories(column)) for column in columns}
+        for sea, (_, NSS_data) in seas.items():
+            for var, values in NSS_data.items():
+                arrays["{}_{}".format(sea, var)] = values
+
+        # Copy of the NSS object without the data, sent to the workers to print the tables
+        nss = copy.copy(self)
+        nss.metocean_data = nss.Total_data = nss.Wind_data = nss.Swell_data = None
+        times = {}
+        # The pool is shut down before the shared memory is freed
+        with SharedArrays(arrays) as shared, self.backend.process_pool(self.workers) as pool:
+            futures = {
+                sea: pool.submit(
+                    sea_state_worker, nss, sea, column, shared.spec, sizes, self.nss_filepath(sea)
+                )
+                for sea, (column, _) in seas.items()
+            }
+            for sea, future in futures.items():
+                tables, times[sea] = future.result()
+                setattr(self, "{}_tables".format(sea), tables)
+        print("All NSS Tables calculated!")
+        return times
 
-    def produce_NSS_Excel(self):
-        """ produce_NSS_Excel: [routine to produce ant Excel .xlsx file which contains the NSS tables fully formatted]"""
+    def nss_filepath(self, sea=None):
+        """ nss_filepath: [path of the excel file with the NSS tables]
 
-        wb = Workbook()
-        create_styles(wb)
+            Args:
+                sea ([string]): "Wind" or "Swell" for the excel file of that sea state alone, written by parallel_tables.
+                    None or "Total" for the excel file of all of the sea states. Defaults to None.
 
-        ws_Total = wb.active
-        ws_Total.title = "NSS Total sea"
-        #ws_Total.sheet_properties.tabColor = "072B31"
-        ws_Total.sheet_view.showGridLines = False
+            Returns:
+                [string]: path of the excel file
+        """
+        if sea in [None, "Total"]:
+            return "{}_Metocean_NSS_Tables.xlsx".format(self.PID)
+        return "{}_Metocean_NSS_Tables_{}.xlsx".format(self.PID, sea)
+
+    def get_sketches(self, NSS_data, wave_column, chunk_size=1000000, sketches=None):
+        """ get_sketches: [streams the data in chunks into one quantile sketch of Hs, Tp and gamma per
+                    wind sector, wave sector and wind speed bin combination.]
+
+            Args: 
+                NSS_data ([dictionary]): Hs, Tp and G columns of the Total, Wind or Swell sea, see parse_data
+                wave_column ([string]): header of the wave direction sector column of the sea state in the MetoceanData object
+                chunk_size ([integer]): number of rows processed at a time
+                sketches ([dictionary]): sketches of previous chunks or workers to add to. Defaults to None.
+
+            Returns:
+                sketches ([dictionary]): dictionary of {(wind sector, wave sector, WS bin index): [Hs, Tp, G sketches, row count]}
+        """
+        if sketches is None:
+            sketches = {}
+        # Index of the wind speed bin and sector codes, -1 outside the bins and for missing directions
+        bin_codes = self.metocean_data.get_codes("WS_bins")
+        wind_codes = self.metocean_data.get_codes("WnD_sectors")
+        wave_codes = self.metocean_data.get_codes(wave_column)
+        for start in range(0, bin_codes.size, chunk_size):
+            bin_index = bin_codes[start:start + chunk_size]
+            valid = bin_index >= 0
+            # Sector numbers, 0 for missing directions
+            wind_sectors = wind_codes[start:start + chunk_size].astype(np.int64) + 1
+            wave_sectors = wave_codes[start:start + chunk_size].astype(np.int64) + 1
+            group = (
+                wind_sectors[valid] * (self.NSectors_wave + 1) + wave_sectors[valid]
+            ) * self.WS_bins_list.size + bin_index[valid]
+            # Sort once by group so that every group is a contiguous slice
+            order = np.argsort(group, kind="stable")
+            group = group[order]
+            values = [
+                NSS_data[var][start:start + chunk_size][valid][order] if var in NSS_data else None
+                for var in ["Hs", "Tp", "G"]
+            ]
+            keys, starts = np.unique(group, return_index=True)
+            ends = np.append(starts[1:], group.size)
+            for key, i, j in zip(keys, starts, ends):
+                WnSector, rest = divmod(int(key), (self.NSectors_wave + 1) * self.WS_bins_list.size)
+                WvSector, b = divmod(rest, self.WS_bins_list.size)
+                if (WnSector, WvSector, b) not in sketches:
+                    sketches[(WnSector, WvSector, b)] = [
+                        QuantileSketch(self.sketch_error, seed=int(key) * 3 + v) for v in range(3)] + [0]
+                for v in range(3):
+                    # No peak enhancement factor in the data: its sketch stays empty, with a NaN median
+                    if values[v] is not None:
+                        sketches[(WnSector, WvSector, b)][v].update(values[v][i:j])
+                sketches[(WnSector, WvSector, b)][3] += j - i
+        return sketches
+
+    def sketch_tables(self, sketches):
+        """ sketch_tables: [creates the NSS tables from the quantile sketches of every wind sector, wave sector
+                    and wind speed bin combination. Omnidirectional tables merge the sketches of all the sectors.]
+
+            Args: 
+                sketches ([dictionary]): sketches as returned by get_sketches
+
+            Returns:
+                tables ([numpy array]): numpy array containing the NSS tables, same layout as NSS.Total_tables
+        """
+        tables = np.full((self.NSectors_wind + 1, self.NSectors_wave + 1, self.WS_bins_list.size, 4), np.NAN)
+        merged = {}
+        for (WnSector, WvSector, b), group_sketches in sketches.items():
+            # Every sector-sector sketch also belongs to the omnidirectional tables of its sectors
+            # Records with no direction (sector 0) are only in the omnidirectional tables, once
+            for target in dict.fromkeys([(WnSector, WvSector, b), (0, WvSector, b), (WnSector, 0, b), (0, 0, b)]):
+                if target not in merged:
+                    merged[target] = [QuantileSketch(self.sketch_error, seed=v) for v in range(3)] + [0]
+                for v in range(3):
+                    merged[target][v].merge(group_sketches[v])
+                merged[target][3] += group_sketches[3]
+        for (WnSector, WvSector, b), group_sketches in merged.items():
+            tables[WnSector][WvSector][b][:3] = [sketch.median() for sketch in group_sketches[:3]]
+            tables[WnSector][WvSector][b][3] = group_sketches[3] / self.Total_Count
+        return tables
+
+    def produce_NSS_Excel(self, seas=None, filepath=None):
+        """ produce_NSS_Excel: [routine to produce ant Excel .xlsx file which contains the NSS tables fully formatted]
+
+            Args:
+                seas ([list]): sea states to print, of "Total", "Wind" and "Swell". Defaults to all of them.
+                filepath ([string]): path of the excel file. Defaults to nss_filepath().
+        """
+        if seas is None:
+            seas = ["Total", "Wind", "Swell"] if self.wave_spectral else ["Total"]
+
+        wb = Workbook()
+        if self.report_profile != "fast":
+            create_styles(wb)
 
         # create table with the WS bins
         self.WS_bin_table = np.stack((
@@ -219,23 +339,16 @@ class NSS():
             self.WS_bin_headers = ["Lower (>)","Middle","Upper (<=)"]
         self.NSS_table_headers = ["Hs [m]","Tp [s]","γ [-]","Prob [%]"]
 
-        # Call print routine for the Total tables
-        self.print_NSS_tables(ws_Total, self.Total_tables, 2, 2)
-
-        # If required, call print routine also for the Wind and Swell Sea tables
-        if self.wave_spectral:
+        # Call print routine for the tables of every sea state, one sheet each
+        if "Wind" in seas or "Swell" in seas:
             print("Putting on favourite tune for motivation...")
-            ws_Wind = wb.create_sheet("NSS Wind sea", 1)
-            #ws_Wind.sheet_properties.tabColor = "D9D9D6"  
-            ws_Wind.sheet_view.showGridLines = False
-            self.print_NSS_tables(ws_Wind, self.Wind_tables, 2, 2)
-
-            ws_Swell = wb.create_sheet("NSS Swell sea", 2)
-            #ws_Swell.sheet_properties.tabColor = "D9D9D6"
-            ws_Swell.sheet_view.showGridLines = False
-            self.print_NSS_tables(ws_Swell, self.Swell_tables, 2, 2)
-        
-        wb.save("{}_Metocean_NSS_Tables.xlsx".format(self.PID)) 
+        for i, sea in enumerate(seas):
+            ws = wb.active if i == 0 else wb.create_sheet("NSS {} sea".format(sea), i)
+            ws.title = "NSS {} sea".format(sea)
+            ws.sheet_view.showGridLines = False
+            self.print_NSS_tables(ws, getattr(self, "{}_tables".format(sea)), 2, 2)
+
+        wb.save(filepath or self.nss_filepath())
         print("Excel report complete!")   
 
     def print_NSS_tables(self, ws, data, startRow, startCol):
@@ -252,42 +365,136 @@ class NSS():
         index_titles = [self.NSS_table_info["WS_info"], "Wind Sector", "Wave Sector"]
         # Uses title of the worksheet to determine first digit of the table numbers
         table_number = self.NSS_table_info[ws.title] 
+        # Values only in the fast report profile
+        write_table = print_plain_table if self.report_profile == "fast" else print_table
 
         # OMNI-OMNI
-        print_table(ws, self.WS_bin_table, index_titles, self.WS_bin_headers, startRow, startCol, "NSS_index")
+        write_table(ws, self.WS_bin_table, index_titles, self.WS_bin_headers, startRow, startCol, "NSS_index")
         col = startCol + 3
         table_titles = ["Table {}.0.0".format(table_number), "OMNI", "OMNI"]
-        print_table(ws, data[0][0], table_titles, self.NSS_table_headers, startRow, col, "conditional")    
+        write_table(ws, data[0][0], table_titles, self.NSS_table_headers, startRow, col, "conditional")    
         startRow += len(index_titles) + len(self.WS_bins_list) + 4
 
         # Sect-OMNI
-        print_table(ws, self.WS_bin_table, index_titles, self.WS_bin_headers, startRow, startCol, "NSS_index")
+        write_table(ws, self.WS_bin_table, index_titles, self.WS_bin_headers, startRow, startCol, "NSS_index")
         col = startCol + 3
         for WnSector in range(1, data.shape[0]):
             table_titles = ["Table {}.{}.0".format(table_number, WnSector), WnSector, "OMNI"]
-            print_table(ws, data[WnSector][0], table_titles, self.NSS_table_headers, startRow, col, "conditional")
+            write_table(ws, data[WnSector][0], table_titles, self.NSS_table_headers, startRow, col, "conditional")
             col += 4
         startRow += len(index_titles) + len(self.WS_bins_list) + 4
 
         # OMNI-Sect
-        print_table(ws, self.WS_bin_table, index_titles, self.WS_bin_headers, startRow, startCol, "NSS_index")
+        write_table(ws, self.WS_bin_table, index_titles, self.WS_bin_headers, startRow, startCol, "NSS_index")
         col = startCol + 3
         for WvSector in range(1, data.shape[1]):
             table_titles = ["Table {}.0.{}".format(table_number, WvSector), "OMNI", WvSector]
-            print_table(ws, data[0][WvSector], table_titles, self.NSS_table_headers, startRow, col, "conditional")
+            write_table(ws, data[0][WvSector], table_titles, self.NSS_table_headers, startRow, col, "conditional")
             col += 4
         
         # Sect-Sect
         for WnSector in range(1, data.shape[0]):
             startRow += len(index_titles) + len(self.WS_bins_list) + 4
-            print_table(ws, self.WS_bin_table, index_titles, self.WS_bin_headers, startRow, startCol, "NSS_index")
+            write_table(ws, self.WS_bin_table, index_titles, self.WS_bin_headers, startRow, startCol, "NSS_index")
             col = startCol + 3
             for WvSector in range(1, data.shape[1]):
                 titles = [
                     "Table {}.{}.{}".format(table_number,WnSector, WvSector), WnSector, WvSector]           
-                print_table(ws, data[WnSector][WvSector], titles, self.NSS_table_headers, startRow, col, "conditional")
+                write_table(ws, data[WnSector][WvSector], titles, self.NSS_table_headers, startRow, col, "conditional")
                 col += 4
 
+def sea_state_tables(group_index, values, wave_column, shape, method, total_count, backend=None):
+    """ sea_state_tables: [creates all the NSS tables of a sea state from the group indices of the wind speed bin, wind
+                sector and wave sector columns. Every wind sector, wave sector and wind speed bin combination is a
+                contiguous slice of the values sorted by the index, so no subset of the data is masked.]
+
+        Args:
+            group_index ([function]): returns the GroupIndex of a combination of columns, as MetoceanData.group_index
+            values ([dictionary]): Hs, Tp and G values of the sea state, as numpy arrays. Without G, its tables stay NaN.
+            wave_column ([string]): header of the wave direction sector column of the sea state in the MetoceanData object
+            shape ([tuple]): number of wind sectors, wave sectors and wind speed bins
+            method ([string]): "mean" or "median"
+            total_count ([integer]): number of records, for the probability of occurrence
+            backend ([PandasBackend]): dataframe backend aggregating the values of every group. Defaults to None, for pandas.
+
+        Returns:
+            tables ([numpy array]): numpy array containing the NSS tables, same layout as NSS.Total_tables
+    """
+    n_wind, n_wave, n_bins = shape
+    variables = [var for var in ["Hs", "Tp", "G"] if var in values]
+    positions = [["Hs", "Tp", "G"].index(var) for var in variables]
+    tables = np.full((n_wind + 1, n_wave + 1, n_bins, 4), np.NAN)
+    backend = backend or PandasBackend()
+    # Omnidirectional tables use the indices without the wind and/or wave sector column.
+    # Sector codes of the indices start at 0 for sector 1.
+    for columns, WnSectors, WvSectors in [
+        (("WS_bins",), slice(0, 1), slice(0, 1)),
+        ((wave_column, "WS_bins"), slice(0, 1), slice(1, None)),
+        (("WnD_sectors", "WS_bins"), slice(1, None), slice(0, 1)),
+        (("WnD_sectors", wave_column, "WS_bins"), slice(1, None), slice(1, None)),
+    ]:
+        index = group_index(*columns)
+        target = tables[WnSectors, WvSectors]
+        counts = index.counts.reshape(target.shape[:3])
+        # Every group of the index is a slice of the sorted values, reduced by one kernel call
+        offsets = index.offsets[:counts.size + 1]
+        for position, var in zip(positions, variables):
+            # Sorting copies the values, at full precision for compact float32 columns
+            sorted_values = index.sort_values(values[var]).astype(float, copy=False)
+            target[..., position] = backend.group_reduce(sorted_values, offsets, method).reshape(counts.shape)
+        target[..., 3] = counts / total_count
+        # Bins without data stay NaN
+        target[counts == 0] = np.NAN
+    return tables
+
+
+
+def sea_state_worker(nss, sea, wave_column, spec, sizes, filepath):
+    """ sea_state_worker: [calculates the NSS tables of a sea state from the shared memory of NSS.parallel_tables and
+                prints them to an excel file of their own. Runs in a worker process.]
+
+        Args:
+            nss ([NSS]): NSS object without the data
+            sea ([string]): "Total", "Wind" or "Swell"
+            wave_column ([string]): header of the wave direction sector column of the sea state in the MetoceanData object
+            spec ([dictionary]): SharedArrays.spec of the codes of the columns and of the values of the sea states
+            sizes ([dictionary]): number of categories of every column
+            filepath ([string]): path of the excel file
+
+        Returns:
+            [tuple]: tables ([numpy array]) and the calculation and printing times in seconds ([dictionary])
+    """
+    start = time.perf_counter()
+    arrays, blocks = attach(spec)
+    indices = {}
+
+    def group_index(*columns):
+        if columns not in indices:
+            indices[columns] = GroupIndex(
+                [arrays[column] for column in columns], [sizes[column] for column in columns], nss.backend
+            )
+        return indices[columns]
+
+    tables = sea_state_tables(
+        group_index,
+        {var: arrays["{}_{}".format(sea, var)] for var in ["Hs", "Tp", "G"] if "{}_{}".format(sea, var) in arrays},
+        wave_column,
+        (nss.NSectors_wind, nss.NSectors_wave, nss.WS_bins_list.size),
+        nss.method,
+        nss.Total_Count,
+        nss.backend,
+    )
+    # The views of the shared memory must be released before closing it
+    del arrays
+    for block in blocks:
+        block.close()
+    compute_time = time.perf_counter() - start
+
+    setattr(nss, "{}_tables".format(sea), tables)
+    nss.produce_NSS_Excel([sea], filepath)
+    return tables, {"compute": compute_time, "write": time.perf_counter() - start - compute_time}
+
+
 def create_styles(wb):
     """ crate_styles: [create styles to the target workbook object]
 
@@ -412,6 +619,50 @@ def print_table(ws, data, titles, headers, startRow, startCol, style):
         ws.cell(row=endRow + 1, column=startCol+3).number_format = "0.00%"
     outside_borders(ws, endRow + 1, startCol, endRow + 1, endCol)
 
+def print_plain_table(ws, data, titles, headers, startRow, startCol, style=None):
+    """ print_plain_table: [writes the values of an individual NSS table to the target worksheet, at the same positions
+                as print_table, without any styles, merged cells, borders or conditional formatting]
+
+        Args: 
+            ws ([openpyxl worksheet object]): the worksheet to write results to
+            data ([numpy array]): table containing the data to write.
+            titles ([list]): list of titles to write above the headers.
+            headers ([list]): list of headers to write above the table. Generally, information to identify the table.
+            startRow ([integer]): row where to start printing the results
+            startCol ([integer]): column where to start printing the results
+            style ([string]): ignored, for the same arguments as print_table.
+
+    """
+    rows = data.shape[0]
+    cols = data.shape[1]
+
+    for t in range(len(titles)):
+        ws.cell(startRow + t, startCol, titles[t])
+    startRow += len(titles)
+
+    for h in range(len(headers)):
+        ws.cell(startRow, startCol + h, headers[h])
+    startRow += 1
+
+    for r in range(rows):
+        for c in range(cols):
+            if np.isnan(data[r][c]):
+                ws.cell(startRow + r, startCol + c, "NaN")
+            else:
+                ws.cell(startRow + r, startCol + c, float(data[r][c]))
+
+    # Footer: "SUM" under the index, the sum of the table probabilities under the data
+    endRow = startRow + rows - 1
+    if cols == 3:
+        ws.cell(endRow + 1, startCol, "SUM")
+    elif cols == 4:
+        # Added up in row order, as in print_table
+        prob_sum = 0
+        for prob in data[:, 3]:
+            if not np.isnan(prob):
+                prob_sum += prob
+        ws.cell(endRow + 1, startCol + 3, prob_sum)
+
 def outside_borders(ws, startRow, startCol, endRow, endCol, style="thin"): 
     """ outside_borders: [draws outside borders for a range in an excel worksheet]
 
@@ -0,0 +1,235 @@
+"""
+Module for the dataframe backends
+Metocean & Energy Assessment Department
+
+The operations of the tool on the whole data: reading the input files, aligning them in time, binning the values
+and counting and aggregating the rows of every group of bins and sectors. PandasBackend runs them with pandas and
+the kernels module, PolarsBackend with the multithreaded Polars engine, on Apache Arrow memory. Both take and return
+pandas and numpy objects, so the rest of the tool does not depend on the backend, and both give the same tables.
+
+Select the backend of a run with the dataframe backend cell of the config file.
+"""
+
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+import kernels
+
+
+class PandasBackend:
+    """Class running the operations on the data with pandas and the NumPy or Numba kernels."""
+
+    name = "pandas"
+    # Start method of the worker processes, None for the default of the platform
+    start_method = None
+
+    def process_pool(self, workers):
+        """process_pool Returns a pool of worker processes started with the start method of the backend.
+
+        Args:
+            workers (int): Number of worker processes.
+
+        Returns:
+            [concurrent.futures.ProcessPoolExecutor]: Pool of worker processes.
+        """
+        return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(self.start_method))
+
+    def read(self, filepath):
+        """read Reads a tab separated input file without header.
+
+        Args:
+            filepath (str): Path of the file.
+
+        Returns:
+            [pandas.DataFrame]: Dataframe of the file, with the field positions as column labels.
+        """
+        return pd.read_csv(filepath, sep="\t", header=None)
+
+    def time_index(self, df):
+        """time_index Replaces the YYYYMMDD and HHMM columns of a dataframe read with read by a DateTime index.
+
+        Args:
+            df (pandas.DataFrame): Dataframe of an input file.
+
+        Returns:
+            [pandas.DataFrame]: Dataframe with the DateTime index, without the two time columns.
+        """
+        return make_time_index(df)
+
+    def align(self, frames):
+        """align Joins the dataframes of the input files over their overlapping period.
+
+        Args:
+            frames (list): Dataframes with a DateTime index.
+
+        Returns:
+            [pandas.DataFrame]: Dataframe with the columns of all of them, at the timestamps they all have.
+        """
+        return pd.concat(frames, axis=1, join="inner")
+
+    def bin(self, values, edges, right):
+        """bin Returns the bin of every value, as numpy.digitize.
+
+        Args:
+            values (numpy.ndarray): Values to bin.
+            edges (numpy.ndarray): Increasing bin edges.
+            right (bool): Right boundary of the bins closed. If False, the left boundary is closed.
+
+        Returns:
+            [numpy.ndarray]: Bin codes. 0 below the first edge and len(edges) above the last one, or for NaN.
+        """
+        return np.digitize(values, bins=edges, right=right)
+
+    def group_order(self, keys, n_keys, order_dtype=np.int64):
+        """group_order Counts the rows of every group and sorts them by group. See kernels.group_order."""
+        return kernels.group_order(keys, n_keys, order_dtype)
+
+    def count_cells(self, y_codes, x_codes, shape, rows=None):
+        """count_cells Counts the rows in every cell of a scatter table. See kernels.count_cells."""
+        return kernels.count_cells(y_codes, x_codes, shape, rows)
+
+    def group_reduce(self, values, offsets, method):
+        """group_reduce Returns the mean or median of every group, ignoring NaNs. See kernels.group_reduce."""
+        return kernels.group_reduce(values, offsets, method)
+
+
+class PolarsBackend(PandasBackend):
+    """Class running the operations on the data with Polars. The input arrays are handed to Polars without copies
+    where Arrow allows it, and the results are returned as pandas and numpy objects."""
+
+    name = "polars"
+    # The threads of the Polars thread pool are not copied to forked processes, which can then deadlock
+    start_method = "spawn"
+
+    def read(self, filepath):
+        df = pl.read_csv(filepath, separator="\t", has_header=False).to_pandas()
+        df.columns = range(df.shape[1])
+        return df
+
+    def time_index(self, df):
+        times = pl.DataFrame({"date": df[0].to_numpy(), "time": df[1].to_numpy()}).select(
+            pl.col("date").cast(pl.Utf8).str.strptime(pl.Datetime("ns"), "%Y%m%d")
+            + pl.duration(minutes=(pl.col("time") // 100) * 60 + pl.col("time") % 100)
+        )
+        df = df.drop(columns=[0, 1])
+        df.index = pd.DatetimeIndex(times.to_series().to_numpy())
+        return df
+
+    def align(self, frames):
+        # Files over the same timestamps need no join
+        if all(frame.index.equals(frames[0].index) for frame in frames[1:]):
+            return pd.concat(frames, axis=1)
+        # Row of every frame at every common timestamp, in the order of the first frame as in pandas.concat
+        joined = pl.DataFrame(
+            {"time": frames[0].index.to_numpy(), "row_0": np.arange(len(frames[0]))}
+        )
+        for i, frame in enumerate(frames[1:], 1):
+            joined = joined.join(
+                pl.DataFrame({"time": frame.index.to_numpy(), f"row_{i}": np.arange(len(frame))}),
+                on="time",
+                how="inner",
+            )
+        joined = joined.sort("row_0")
+        index = pd.DatetimeIndex(joined["time"].to_numpy())
+        return pd.concat(
+            [
+                frame.iloc[joined[f"row_{i}"].to_numpy()].set_axis(index)
+                for i, frame in enumerate(frames)
+            ],
+            axis=1,
+        )
+
+    def bin(self, values, edges, right):
+        # Position of every value among the edges, as numpy.digitize. NaNs sort after every edge.
+        return (
+            pl.Series(np.asarray(edges, dtype=float))
+            .search_sorted(pl.Series(np.asarray(values, dtype=float)), side="left" if right else "right")
+            .to_numpy()
+            .astype(np.int64)
+        )
+
+    def group_order(self, keys, n_keys, order_dtype=np.int64):
+        # Stable sort of the row positions by their group, and the start of every group in them
+        rows = pl.DataFrame({"key": np.asarray(keys, dtype=np.int64), "row": np.arange(len(keys))}).sort(
+            "key", maintain_order=True
+        )
+        offsets = rows["key"].search_sorted(pl.Series(np.arange(n_keys + 1)), side="left")
+        return rows["row"].to_numpy().astype(order_dtype), offsets.to_numpy().astype(np.int64)
+
+    def count_cells(self, y_codes, x_codes, shape, rows=None):
+        if rows is None:
+            rows = np.arange(len(x_codes))
+        cells = (
+            pl.DataFrame({"y": y_codes[rows], "x": x_codes[rows]})
+            .filter((pl.col("y") >= 0) & (pl.col("x") >= 0))
+            .group_by(cell=pl.col("y").cast(pl.Int64) * shape[1] + pl.col("x").cast(pl.Int64))
+            .len()
+        )
+        counts = np.zeros(shape[0] * shape[1], dtype=np.int64)
+        counts[cells["cell"].to_numpy()] = cells["len"].to_numpy()
+        return counts
+
+    def group_reduce(self, values, offsets, method):
+        offsets = np.asarray(offsets, dtype=np.int64)
+        n_groups = len(offsets) - 1
+        frame = pl.DataFrame(
+            {
+                "group": np.repeat(np.arange(n_groups), np.diff(offsets)),
+                "value": np.asarray(values, dtype=float)[offsets[0]:offsets[-1]],
+            }
+        ).with_columns(pl.col("value").fill_nan(None))
+        statistic = pl.col("value").mean() if method == "mean" else pl.col("value").median()
+        # Groups without values are null, and stay NaN
+        result = frame.group_by("group").agg(statistic).drop_nulls()
+        reduced = np.full(n_groups, np.nan)
+        reduced[result["group"].to_numpy()] = result["value"].to_numpy()
+        return reduced
+
+
+# Dataframe backends, by the name of the config file
+BACKENDS = {"pandas": PandasBackend, "polars": PolarsBackend}
+
+
+def get_backend(name):
+    """get_backend Returns the dataframe backend of a name. Exits with a message if it is unknown or the library it
+    needs is not installed.
+
+    Args:
+        name (str): "pandas" or "polars".
+
+    Returns:
+        [PandasBackend]: Backend object.
+    """
+    if name not in BACKENDS:
+        sys.exit(f"Unknown dataframe backend {name}. Use any of {', '.join(BACKENDS)}.")
+    if name == "polars" and pl is None:
+        sys.exit("The polars dataframe backend needs the polars package.")
+    return BACKENDS[name]()
+
+
+def make_time_index(df):
+    """make_time_index Creates a DateTime index for the dataframes read from the user input .txt files in the YYYY-MM-DD HH:MM format. Deletes the YYMMDD and HHMM string columns.
+
+    Args:
+        df (pandas.Dataframe): [Timeseries DataFrame input by user. Can be wind, wave, current or seawater dataframe.]
+
+    Returns:
+        [pandas.DataFrame]: [Returns the input dataframe with the DateTime index.]
+    """
+    df.iloc[:, 0] = pd.to_datetime(df.iloc[:, 0], format="%Y%m%d")
+    # HHMM time, split into hours and minutes so that sub-hourly timesteps are read correctly
+    df.iloc[:, 1] = pd.to_timedelta(
+        (df.iloc[:, 1] // 100) * 60 + df.iloc[:, 1] % 100, unit="minutes"
+    )
+    df.index = df.iloc[:, 0] + df.iloc[:, 1]
+    df.drop(columns=[0, 1], inplace=True)
+    return df
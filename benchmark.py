@@ -0,0 +1,247 @@
+"""
+Benchmark suite for the Metocean Processing Tool
+Metocean & Energy Assessment Department
+
+Generates synthetic hindcasts with the synthetic module and runs the tool on them. The time of every stage
+(loading, sectorising, every scatter sheet's calculation and writing, NSS calculation and writing) is taken
+from the MetoceanData profiler and stored as JSON, so that runs can be compared over time.
+
+Usage:
+    python benchmark.py --years 1 10 --freq 1H 10min --spectral on off --output results.json
+    python benchmark.py --years 1 --compare previous.json
+    python benchmark.py --years 1 --kernels 1000000
+    python benchmark.py --years 10 --backends pandas polars
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+import kernels
+from backends import BACKENDS, pl
+from metocean_data import MetoceanData
+from NSS import NSS
+from scatter_report import print_scatter_report
+from synthetic import write_synthetic_inputs
+
+
+def run_case(years, freq, spectral, workdir, seed=0, **config):
+    """run_case Generates one synthetic hindcast and times every stage of the tool on it.
+
+    Args:
+        years (float): Length of the timeseries in years.
+        freq (str): Time step of the timeseries as a pandas frequency, e.g. "1H" or "10min".
+        spectral (bool): Include windsea and swell wave components.
+        workdir (str): Folder for the input files and reports.
+        seed (int, optional): Seed of the synthetic data. Defaults to 0.
+        **config: Overrides of the config file values passed on to write_synthetic_inputs.
+
+    Returns:
+        [dict]: Case description and stage times in seconds.
+    """
+    backend = config.get("dataframe_backend", "pandas")
+    name = f"{years:g}y_{freq}_{'spectral' if spectral else 'total'}"
+    if backend != "pandas":
+        name += f"_{backend}"
+    case_dir = os.path.join(workdir, name)
+    config_file, data_files = write_synthetic_inputs(
+        case_dir, years=years, freq=freq, spectral=spectral, seed=seed, **config
+    )
+    cwd = os.getcwd()
+    # The reports are written to the working directory
+    os.chdir(case_dir)
+    try:
+        metocean_data = MetoceanData(config_file, data_files)
+        print_scatter_report(metocean_data)
+        NSS(metocean_data)
+    finally:
+        os.chdir(cwd)
+
+    profiler = metocean_data.profiler
+    return {
+        "name": name,
+        "years": years,
+        "freq": freq,
+        "spectral": spectral,
+        "backend": backend,
+        "rows": int(metocean_data.data.shape[0]),
+        "stages": profiler.flatten(),
+        "total": sum(span["wall_time"] for span in profiler.spans),
+    }
+
+
+def compare(results, baseline, threshold=0.1):
+    """compare Prints the change of every stage time against a previous benchmark run.
+
+    Args:
+        results (dict): Benchmark results of this run.
+        baseline (dict): Benchmark results of a previous run, as loaded from its JSON file.
+        threshold (float, optional): Relative slow-down flagged as a regression. Defaults to 0.1.
+
+    Returns:
+        [list]: List of (case, stage, old time, new time) tuples of the regressions found.
+    """
+    regressions = []
+    old_cases = {case["name"]: case for case in baseline["cases"]}
+    for case in results["cases"]:
+        if case["name"] not in old_cases:
+            continue
+        print(f"\n{case['name']}")
+        old = old_cases[case["name"]]["stages"]
+        for stage, new_time in case["stages"].items():
+            if stage not in old:
+                continue
+            ratio = new_time / old[stage] if old[stage] > 0 else np.inf
+            flag = ""
+            if ratio > 1 + threshold:
+                flag = "  <-- REGRESSION"
+                regressions.append((case["name"], stage, old[stage], new_time))
+            print(f"  {stage:<50} {old[stage]:>9.3f}s -> {new_time:>9.3f}s  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def kernel_benchmark(rows, sectors=12, repeats=5, seed=0):
+    """kernel_benchmark Times every counting and aggregation kernel with the NumPy and Numba backends.
+
+    Args:
+        rows (int): Number of rows of the random inputs.
+        sectors (int, optional): Direction sectors. Defaults to 12.
+        repeats (int, optional): Runs of every kernel. The fastest one is kept. Defaults to 5.
+        seed (int, optional): Seed of the random inputs. Defaults to 0.
+
+    Returns:
+        [dict]: Dictionary of {kernel: {backend: seconds, "first_call": seconds, "speedup": ratio}}. The first call
+            of the Numba kernels includes their compilation, or loading from the cache.
+    """
+    rng = np.random.default_rng(seed)
+    directions = rng.uniform(0, 360, rows)
+    n_groups = sectors * sectors * 30
+    keys = rng.integers(0, n_groups, rows)
+    x_codes = rng.integers(-1, 40, rows).astype(np.int16)
+    y_codes = rng.integers(-1, 30, rows).astype(np.int16)
+    subset = np.flatnonzero(rng.random(rows) < 0.5)
+    order, offsets = kernels.group_order(keys, n_groups)
+    values = rng.weibull(1.5, rows)[order]
+
+    cases = {
+        "sector_numbers": lambda: kernels.sector_numbers(directions, sectors, True),
+        "group_order": lambda: kernels.group_order(keys, n_groups),
+        "count_cells": lambda: kernels.count_cells(y_codes, x_codes, (30, 40), subset),
+        "group_reduce mean": lambda: kernels.group_reduce(values, offsets, "mean"),
+        "group_reduce median": lambda: kernels.group_reduce(values, offsets, "median"),
+    }
+    backends = ["numpy", "numba"] if kernels.numba is not None else ["numpy"]
+    default = kernels.BACKEND
+    results = {}
+    try:
+        for name, kernel in cases.items():
+            results[name] = {}
+            for backend in backends:
+                kernels.BACKEND = backend
+                start = time.perf_counter()
+                kernel()
+                if backend == "numba":
+                    results[name]["first_call"] = time.perf_counter() - start
+                times = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    kernel()
+                    times.append(time.perf_counter() - start)
+                results[name][backend] = min(times)
+            if "numba" in results[name]:
+                results[name]["speedup"] = results[name]["numpy"] / results[name]["numba"]
+    finally:
+        kernels.BACKEND = default
+    return results
+
+
+def get_versions():
+    """get_versions Returns the versions of the environment and code the benchmark ran with."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "xlsxwriter": xlsxwriter.__version__,
+        "numba": kernels.numba.__version__ if kernels.numba is not None else None,
+        "kernels": kernels.BACKEND,
+        "polars": pl.__version__ if pl is not None else None,
+        "platform": platform.platform(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Metocean Processing Tool on synthetic data.")
+    parser.add_argument("--years", type=float, nargs="+", default=[1, 10, 40])
+    parser.add_argument("--freq", nargs="+", default=["1H", "10min"])
+    parser.add_argument("--spectral", nargs="+", choices=["on", "off"], default=["on", "off"])
+    parser.add_argument("--sectors", type=int, default=12, help="Wind and wave sectors.")
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=["pandas"])
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="JSON file of a previous run to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--workdir", help="Folder for the synthetic data. Defaults to a temporary folder.")
+    parser.add_argument("--kernels", type=int, metavar="ROWS", help="Also time the kernels on this many rows.")
+    args = parser.parse_args(argv)
+
+    results = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "versions": get_versions(),
+        "cases": [],
+    }
+    if args.kernels:
+        results["kernels"] = kernel_benchmark(args.kernels, args.sectors)
+        for name, times in results["kernels"].items():
+            line = f"{name:<20} numpy {times['numpy']:.4f} s"
+            if "numba" in times:
+                line += f"  numba {times['numba']:.4f} s  x{times['speedup']:.1f}  (first call {times['first_call']:.2f} s)"
+            print(line)
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or tmp
+        for years in args.years:
+            for freq in args.freq:
+                for spectral in args.spectral:
+                    for backend in args.backends:
+                        case = run_case(
+                            years,
+                            freq,
+                            spectral == "on",
+                            workdir,
+                            wind_sectors=args.sectors,
+                            wave_sectors=args.sectors,
+                            dataframe_backend=backend,
+                        )
+                        print(f"{case['name']}: {case['total']:.2f} s")
+                        results["cases"].append(case)
+                        # Save after every case so that long runs keep partial results
+                        with open(args.output, "w") as f:
+                            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
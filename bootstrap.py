@@ -0,0 +1,498 @@
+"""
+Module for the block bootstrap confidence bounds of the scatter and NSS tables
+Metocean & Energy Assessment Department
+
+The timeseries is split into consecutive blocks of block_hours, which keep the persistence of storms and calms
+within a resample. Every resample draws as many blocks as the record holds, with replacement, so it is described
+by the number of times every block is drawn: its block weights. Once the data is counted per block and cell, the
+tables of a batch of resamples are matrix products of the block weights, whatever the length of the record:
+    probabilities: weights @ (block x cell counts) / weights @ (block sizes)
+    means: weights @ (block x cell sums) / weights @ (block x cell value counts)
+Medians are weighted medians of the values of every cell, with the block weights of their rows.
+The bounds are the (1 - confidence) / 2 and (1 + confidence) / 2 quantiles of the resamples.
+"""
+
+import copy
+import os
+import sys
+import warnings
+
+import numpy as np
+import xlsxwriter
+
+from persistence import get_time_step
+from progress import Progress
+from scatter import ScatterSheet
+from scatter_report import (
+    PlainSheet,
+    TableFactory,
+    count_tables,
+    get_report_plan,
+    make_sheet_tables,
+)
+from shared_arrays import SharedArrays, attach
+
+# Number of resamples in every batch of work
+BATCH_SIZE = 50
+
+# Headers of the statistics of the NSS tables and the wave direction sector column of every sea state
+NSS_HEADERS = ["Hs [m]", "Tp [s]", "γ [-]", "Prob [%]"]
+NSS_WAVE_COLUMNS = {"Total": "WvD_sectors", "Wind": "WvD_W_sectors", "Swell": "WvD_S_sectors"}
+
+
+class Bootstrap:
+    """Class to calculate block bootstrap confidence bounds of scatter and NSS tables."""
+
+    def __init__(self, met_data, resamples, block_hours=720, confidence=0.9, workers=0, seed=0):
+        """__init__ Initialises the Bootstrap class and splits the timeseries into blocks.
+
+        Args:
+            met_data (MetoceanData): MetoceanData object the tables are calculated from.
+            resamples (int): Number of bootstrap resamples.
+            block_hours (float, optional): Length of the blocks in hours. Defaults to 720 (30 days).
+            confidence (float, optional): Confidence level of the bounds, between 0 and 1. Defaults to 0.9.
+            workers (int, optional): Number of worker processes running the batches of resamples. Defaults to 0,
+                which runs them in this process.
+            seed (int, optional): Seed of the resamples. Every resample is the same whatever the batches and
+                workers. Defaults to 0.
+        """
+        self.met_data = met_data
+        self.resamples = int(resamples)
+        self.confidence = confidence
+        self.workers = workers
+        self.seed = seed
+        step = get_time_step(met_data.data.index) / np.timedelta64(1, "h")
+        self.block_length = max(1, int(round(block_hours / step)))
+        # Block of every row. The last block may be shorter than the others.
+        self.blocks = (np.arange(len(met_data.data)) // self.block_length).astype(np.int32)
+        self.n_blocks = int(self.blocks[-1]) + 1
+        self.block_sizes = np.bincount(self.blocks).astype(float)
+
+    def quantiles(self, kernel, arrays):
+        """quantiles Runs a kernel on every resample and returns the bounds of its results.
+
+        Args:
+            kernel (function): Kernel of this module, returning the results of a batch of resamples from the arrays
+                and the block weights of the batch.
+            arrays (dict): Dictionary of {name: numpy array} read by the kernel.
+
+        Returns:
+            [tuple]: Tuple of (lower, upper) bounds, one array element per kernel result.
+        """
+        batches = [
+            (first, min(first + BATCH_SIZE, self.resamples))
+            for first in range(0, self.resamples, BATCH_SIZE)
+        ]
+        if self.workers:
+            # The pool is shut down before the shared memory is freed
+            with SharedArrays(arrays) as shared, self.met_data.backend.process_pool(self.workers) as pool:
+                futures = [
+                    pool.submit(run_batch, kernel, shared.spec, self.n_blocks, self.seed, *batch)
+                    for batch in batches
+                ]
+                results = np.concatenate([future.result() for future in futures])
+        else:
+            results = np.concatenate(
+                [kernel(arrays, resample_weights(self.n_blocks, self.seed, *batch)) for batch in batches]
+            )
+        alpha = (1 - self.confidence) / 2
+        with warnings.catch_warnings():
+            # Results that are NaN in every resample (e.g. no peak enhancement factor) stay NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            lower, upper = np.nanquantile(results, [alpha, 1 - alpha], axis=0)
+        return lower, upper
+
+    def block_counts(self, rows, cells, n_cells, weights=None):
+        """block_counts Counts (or adds up weights of) rows per block and cell, with a single bincount.
+
+        Args:
+            rows (numpy.ndarray): Row positions in met_data.data.
+            cells (numpy.ndarray): Cell of every row, from 0 to n_cells - 1.
+            n_cells (int): Number of cells.
+            weights (numpy.ndarray, optional): Value of every row to add up. Defaults to None, which counts the rows.
+
+        Returns:
+            [numpy.ndarray]: 2D array [block, cell].
+        """
+        return np.bincount(
+            self.blocks[rows].astype(np.int64) * n_cells + cells,
+            weights=weights,
+            minlength=self.n_blocks * n_cells,
+        ).reshape(self.n_blocks, n_cells).astype(float)
+
+    def scatter_bounds(self, tables):
+        """scatter_bounds Returns the bounds of the probabilities of the occupied cells of scatter tables. All of
+        the tables go through the resamples together.
+
+        Args:
+            tables (list): Scatter tables at the bin sizes of the config file.
+
+        Returns:
+            [list]: List of (lower, upper) Scatter tables, with the same occupied cells as the tables.
+        """
+        rows, cells = [], []
+        offset = 0
+        for table in tables:
+            table_rows = table.get_rows(self.met_data)
+            if table_rows is None:
+                table_rows = np.arange(len(self.met_data.data))
+            x_codes = self.met_data.get_codes(table.x_var)[table_rows].astype(np.int64)
+            y_codes = self.met_data.get_codes(table.y_var)[table_rows].astype(np.int64)
+            valid = (x_codes >= 0) & (y_codes >= 0)
+            # Position of every row among the occupied cells of the table, which are sorted
+            occupied = table.sparse.rows.astype(np.int64) * table.shape[1] + table.sparse.cols
+            flat = y_codes[valid] * table.shape[1] + x_codes[valid]
+            rows.append(table_rows[valid])
+            cells.append(offset + np.searchsorted(occupied, flat))
+            offset += table.sparse.nnz
+        counts = self.block_counts(np.concatenate(rows), np.concatenate(cells), offset)
+        lower, upper = self.quantiles(
+            probability_kernel, {"counts": counts, "block_sizes": self.block_sizes}
+        )
+
+        bounds = []
+        offset = 0
+        for table in tables:
+            pair = []
+            for bound, q in [(lower, (1 - self.confidence) / 2), (upper, (1 + self.confidence) / 2)]:
+                bound_table = copy.copy(table)
+                bound_table.sparse = copy.copy(table.sparse)
+                bound_table.sparse.values = bound[offset:offset + table.sparse.nnz].astype(float)
+                bound_table.note = f"Bootstrap {100 * q:g}% bound."
+                pair.append(bound_table)
+            bounds.append(tuple(pair))
+            offset += table.sparse.nnz
+        return bounds
+
+    def nss_bounds(self, nss):
+        """nss_bounds Returns the bounds of the NSS tables of every sea state.
+
+        Args:
+            nss (NSS): NSS object with its tables calculated.
+
+        Returns:
+            [dict]: Dictionary of {sea state: (lower, upper)}, with arrays in the same layout as NSS.Total_tables.
+        """
+        config = self.met_data.config
+        # The sector codes of the data must be those the NSS tables were calculated with (see print_sector_sweep)
+        if (nss.NSectors_wind, nss.NSectors_wave) != (config["wind_sectors"], config["wave_sectors"]):
+            sys.exit(
+                f"NSS tables of {nss.NSectors_wind} wind and {nss.NSectors_wave} wave sectors do not match the "
+                f"{config['wind_sectors']} wind and {config['wave_sectors']} wave sectors of the data. "
+                "Calculate the bootstrap bounds before re-sectorising the data."
+            )
+        seas = ["Total", "Wind", "Swell"] if nss.wave_spectral else ["Total"]
+        return {sea: self.sea_state_bounds(nss, sea) for sea in seas}
+
+    def sea_state_bounds(self, nss, sea):
+        """sea_state_bounds Returns the bounds of the NSS tables of a sea state.
+
+        Args:
+            nss (NSS): NSS object with its tables calculated.
+            sea (str): "Total", "Wind" or "Swell".
+
+        Returns:
+            [tuple]: Tuple of (lower, upper) arrays, in the same layout as NSS.Total_tables.
+        """
+        shape = (nss.NSectors_wind + 1, nss.NSectors_wave + 1, nss.WS_bins_list.size)
+        bin_codes = self.met_data.get_codes("WS_bins").astype(np.int64)
+        wind_codes = self.met_data.get_codes("WnD_sectors").astype(np.int64)
+        wave_codes = self.met_data.get_codes(NSS_WAVE_COLUMNS[sea]).astype(np.int64)
+        # Every row is in the omnidirectional tables and in the tables of its wind and/or wave sector
+        rows, cells = [], []
+        for by_wind in [False, True]:
+            for by_wave in [False, True]:
+                valid = bin_codes >= 0
+                if by_wind:
+                    valid &= wind_codes >= 0
+                if by_wave:
+                    valid &= wave_codes >= 0
+                table_rows = np.flatnonzero(valid)
+                wind = wind_codes[table_rows] + 1 if by_wind else 0
+                wave = wave_codes[table_rows] + 1 if by_wave else 0
+                rows.append(table_rows)
+                cells.append((wind * shape[1] + wave) * shape[2] + bin_codes[table_rows])
+        rows = np.concatenate(rows)
+        # Only the occupied cells go through the resamples
+        occupied, cells = np.unique(np.concatenate(cells), return_inverse=True)
+        n_cells = len(occupied)
+
+        lower = np.full((np.prod(shape), 4), np.nan)
+        upper = np.full((np.prod(shape), 4), np.nan)
+        lower[occupied, 3], upper[occupied, 3] = self.quantiles(
+            probability_kernel,
+            {"counts": self.block_counts(rows, cells, n_cells), "block_sizes": self.block_sizes},
+        )
+
+        # Hs, Tp and gamma of every cell, one after the other. Gamma stays NaN when it is not in the data.
+        variables = [var for var in ["Hs", "Tp", "G"] if var in getattr(nss, f"{sea}_data")]
+        values = [getattr(nss, f"{sea}_data")[var][rows].astype(float) for var in variables]
+        finite = [~np.isnan(v) for v in values]
+        if nss.method == "mean":
+            arrays = {
+                "sums": np.hstack([
+                    self.block_counts(rows[f], cells[f], n_cells, v[f]) for v, f in zip(values, finite)
+                ]),
+                "counts": np.hstack([
+                    self.block_counts(rows[f], cells[f], n_cells) for f in finite
+                ]),
+            }
+            kernel = mean_kernel
+        else:
+            # Values sorted by variable, cell and value, so that every cell is a slice
+            keys = np.concatenate([cells[f] + i * n_cells for i, f in enumerate(finite)])
+            sorted_values = np.concatenate([v[f] for v, f in zip(values, finite)])
+            value_blocks = np.concatenate([self.blocks[rows[f]] for f in finite])
+            order = np.lexsort((sorted_values, keys))
+            keys = keys[order]
+            arrays = {
+                "values": sorted_values[order],
+                "blocks": value_blocks[order],
+                "starts": np.searchsorted(keys, np.arange(len(variables) * n_cells), side="left"),
+                "ends": np.searchsorted(keys, np.arange(len(variables) * n_cells), side="right"),
+            }
+            kernel = median_kernel
+        if variables:
+            statistic_lower, statistic_upper = self.quantiles(kernel, arrays)
+            for i, var in enumerate(variables):
+                column = ["Hs", "Tp", "G"].index(var)
+                lower[occupied, column] = statistic_lower[i * n_cells:(i + 1) * n_cells]
+                upper[occupied, column] = statistic_upper[i * n_cells:(i + 1) * n_cells]
+        return lower.reshape(*shape, 4), upper.reshape(*shape, 4)
+
+
+def resample_weights(n_blocks, seed, first, last):
+    """resample_weights Returns the block weights of a batch of resamples: the number of times every block is drawn.
+
+    Args:
+        n_blocks (int): Number of blocks.
+        seed (int): Seed of the resamples.
+        first (int): First resample of the batch.
+        last (int): Last resample of the batch, not included.
+
+    Returns:
+        [numpy.ndarray]: 2D array [resample, block].
+    """
+    weights = np.empty((last - first, n_blocks))
+    for i, resample in enumerate(range(first, last)):
+        rng = np.random.default_rng([seed, resample])
+        weights[i] = np.bincount(rng.integers(0, n_blocks, n_blocks), minlength=n_blocks)
+    return weights
+
+
+def run_batch(kernel, spec, n_blocks, seed, first, last):
+    """run_batch Runs a kernel on a batch of resamples, on the shared memory of Bootstrap.quantiles. Runs in a
+    worker process.
+
+    Args:
+        kernel (function): Kernel of this module.
+        spec (dict): SharedArrays.spec of the arrays read by the kernel.
+        n_blocks (int): Number of blocks.
+        seed (int): Seed of the resamples.
+        first (int): First resample of the batch.
+        last (int): Last resample of the batch, not included.
+
+    Returns:
+        [numpy.ndarray]: Results of the kernel.
+    """
+    arrays, blocks = attach(spec)
+    results = kernel(arrays, resample_weights(n_blocks, seed, first, last))
+    # The views of the shared memory must be released before closing it
+    del arrays
+    for block in blocks:
+        block.close()
+    return results
+
+
+def probability_kernel(arrays, weights):
+    """probability_kernel Returns the probability of every cell in a batch of resamples.
+
+    Args:
+        arrays (dict): "counts" [block, cell] and "block_sizes" [block] arrays.
+        weights (numpy.ndarray): Block weights [resample, block].
+
+    Returns:
+        [numpy.ndarray]: 2D array [resample, cell].
+    """
+    return weights @ arrays["counts"] / (weights @ arrays["block_sizes"])[:, None]
+
+
+def mean_kernel(arrays, weights):
+    """mean_kernel Returns the mean of every cell in a batch of resamples. NaN for cells without values.
+
+    Args:
+        arrays (dict): "sums" and "counts" [block, cell] arrays of the values.
+        weights (numpy.ndarray): Block weights [resample, block].
+
+    Returns:
+        [numpy.ndarray]: 2D array [resample, cell].
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (weights @ arrays["sums"]) / (weights @ arrays["counts"])
+
+
+def median_kernel(arrays, weights):
+    """median_kernel Returns the median of every cell in a batch of resamples, as the weighted median of its values
+    with the block weights of their rows. Same as numpy.median of the resampled values. NaN for cells without values.
+
+    Args:
+        arrays (dict): "values" sorted by cell and value, "blocks" of the values, and the "starts" and "ends" of
+            the slice of every cell.
+        weights (numpy.ndarray): Block weights [resample, block].
+
+    Returns:
+        [numpy.ndarray]: 2D array [resample, cell].
+    """
+    values, starts, ends = arrays["values"], arrays["starts"], arrays["ends"]
+    results = np.full((len(weights), len(starts)), np.nan)
+    occupied = np.flatnonzero(ends > starts)
+    if len(occupied) == 0:
+        return results
+    for i, block_weights in enumerate(weights.astype(np.int32)):
+        # Number of draws of the values up to every value, in integers so that the middle is found exactly
+        cumulative = np.cumsum(block_weights[arrays["blocks"]], dtype=np.int64)
+        before = np.where(starts[occupied] > 0, cumulative[starts[occupied] - 1], 0)
+        total = cumulative[ends[occupied] - 1] - before
+        drawn = total > 0
+        twice_half = 2 * before[drawn] + total[drawn]
+        # Lower and upper middle values, the same value for odd totals
+        low = np.searchsorted(cumulative, (twice_half + 1) // 2, side="left")
+        high = np.searchsorted(cumulative, twice_half // 2 + 1, side="left")
+        results[i, occupied[drawn]] = (values[low] + values[high]) / 2
+    return results
+
+
+def print_bootstrap_report(metocean_data, nss=None):
+    """print_bootstrap_report Calculates the block bootstrap confidence bounds of the scatter tables of the sheets
+    selected in the config file and of the NSS tables, and prints them next to the tables into an excel .xlsx report.
+
+    Args:
+        metocean_data (MetoceanData): A MetoceanData object from the metocean_data module.
+        nss (NSS, optional): NSS object with its tables calculated. Defaults to None, for no NSS bounds.
+    """
+    config = metocean_data.config
+    profiler = metocean_data.profiler
+    profile = config.get("report_profile", "full")
+    bootstrap = Bootstrap(
+        metocean_data,
+        config["bootstrap_resamples"],
+        config["bootstrap_block_hours"],
+        config["bootstrap_confidence"],
+        config["bootstrap_workers"],
+    )
+    print(
+        f"Bootstrapping {bootstrap.resamples} resamples of {bootstrap.n_blocks} blocks of "
+        f"{bootstrap.block_length} records..."
+    )
+
+    # Scatter sheets of the report with their bounds. The omnidirectional "row" sheets by default.
+    plan = [sheet for sheet in get_report_plan(metocean_data, metocean_data.bins) if sheet[1] in ["row", "grid"]]
+    names = config.get("bootstrap_sheets") or [name for name, kind, contents in plan if kind == "row"]
+    unknown = [name for name in names if name not in [sheet[0] for sheet in plan]]
+    if unknown:
+        sys.exit(
+            f"Scatter report sheets {', '.join(unknown)} in cell D76 of the config file not found. "
+            f"Use any of {', '.join(sheet[0] for sheet in plan)}."
+        )
+    plan = [sheet for sheet in plan if sheet[0] in names]
+
+    filename = f"{config['project']}_Metocean_Bootstrap.xlsx"
+    with profiler.span("bootstrap"):
+        factory = TableFactory(metocean_data)
+        sheets = []
+        with profiler.span("bootstrap_scatter", rows=metocean_data.data.shape[0]):
+            with Progress(count_tables(plan), "Bootstrap tables") as progress:
+                factory.progress = progress
+                for sheet in plan:
+                    tables = make_sheet_tables(metocean_data, sheet, factory)
+                    if sheet[1] == "grid":
+                        tables = [table for row in tables for table in row]
+                    sheets.append((sheet[0], tables))
+            bounds = bootstrap.scatter_bounds([table for name, tables in sheets for table in tables])
+        if nss is not None:
+            with profiler.span("bootstrap_nss", rows=metocean_data.data.shape[0]):
+                nss_bounds = bootstrap.nss_bounds(nss)
+
+        with profiler.span("bootstrap_write"):
+            wb = xlsxwriter.Workbook(filename)
+            start = 0
+            for name, tables in sheets:
+                write_bootstrap_sheet(wb, name, tables, bounds[start:start + len(tables)], profile)
+                start += len(tables)
+            if nss is not None:
+                for sea, (lower, upper) in nss_bounds.items():
+                    write_nss_bootstrap_sheet(wb, f"NSS {sea} sea", nss, getattr(nss, f"{sea}_tables"), lower, upper)
+            wb.close()
+    print(f"Bootstrap report complete! {filename}: {os.path.getsize(filename) / 1024 ** 2:.1f} MB")
+
+
+def write_bootstrap_sheet(wb, name, tables, bounds, profile="full"):
+    """write_bootstrap_sheet Adds a sheet with scatter tables and their bootstrap bounds, one table per band of rows
+    with its lower and upper bounds on its right.
+
+    Args:
+        wb (xlsxwriter.Workbook): xlsxwriter library Workbook class. Excel workbook of the report.
+        name (str): Name of the sheet.
+        tables (list): Scatter tables.
+        bounds (list): (lower, upper) Scatter tables of every table, as returned by Bootstrap.scatter_bounds.
+        profile (str, optional): Report profile of the scatter tables, one of scatter.REPORT_PROFILES. Defaults to "full".
+    """
+    ws = wb.add_worksheet(name)
+    ws.hide_gridlines(2)
+    if profile == "fast":
+        ws = PlainSheet(ws)
+    sheet = ScatterSheet(wb, ws, profile)
+    row = 1
+    for table, pair in zip(tables, bounds):
+        for i, printed in enumerate([table, *pair]):
+            printed.print_table(wb, ws, row=row, col=1 + i * (5 + table.shape[1]), sheet=sheet)
+        row += 6 + table.shape[0]
+    sheet.close()
+
+
+def write_nss_bootstrap_sheet(wb, name, nss, tables, lower, upper):
+    """write_nss_bootstrap_sheet Adds a sheet with the NSS tables of a sea state and their bootstrap bounds, one row
+    per wind sector, wave sector and wind speed bin with data. Sector 0 is omnidirectional.
+
+    Args:
+        wb (xlsxwriter.Workbook): xlsxwriter library Workbook class. Excel workbook of the report.
+        name (str): Name of the sheet.
+        nss (NSS): NSS object with its tables calculated.
+        tables (numpy.ndarray): NSS tables of the sea state.
+        lower (numpy.ndarray): Lower bounds of the tables, as returned by Bootstrap.nss_bounds.
+        upper (numpy.ndarray): Upper bounds of the tables, as returned by Bootstrap.nss_bounds.
+    """
+    ws = wb.add_worksheet(name)
+    header_format = wb.add_format(
+        {"bold": True, "border": 1, "font_color": "#FFFFFF", "bg_color": "072B31", "text_wrap": True}
+    )
+    value_format = wb.add_format({"num_format": "0.00", "border": 1})
+    prob_format = wb.add_format({"num_format": "0.000%", "border": 1})
+    headers = ["Wind Sector", "Wave Sector", "WS Lower", "WS Middle", "WS Upper"]
+    for header in NSS_HEADERS:
+        headers += [header, f"{header} Lower", f"{header} Upper"]
+    ws.write_row(1, 1, headers, header_format)
+    ws.set_column(1, len(headers), 11)
+    ws.freeze_panes(2, 0)
+
+    row = 2
+    for wind_sector, wave_sector, ws_bin in zip(*np.nonzero(tables[..., 3] > 0)):
+        centre = nss.WS_bins_list[ws_bin]
+        ws.write_row(
+            row,
+            1,
+            [wind_sector, wave_sector, centre - nss.WS_bin_size / 2, centre, centre + nss.WS_bin_size / 2],
+            value_format,
+        )
+        for i in range(4):
+            for j, value in enumerate(
+                [tables[wind_sector, wave_sector, ws_bin, i],
+                 lower[wind_sector, wave_sector, ws_bin, i],
+                 upper[wind_sector, wave_sector, ws_bin, i]]
+            ):
+                cell_format = prob_format if i == 3 else value_format
+                if np.isnan(value):
+                    ws.write_string(row, 6 + 3 * i + j, "NaN", cell_format)
+                else:
+                    ws.write_number(row, 6 + 3 * i + j, value, cell_format)
+        row += 1
@@ -0,0 +1,313 @@
+"""
+Module for the machine-readable exports of the scatter and NSS tables
+Metocean & Energy Assessment Department
+
+The tables are exported next to the Excel reports as labelled data, so that downstream tools can load them
+without reading the workbooks cell by cell:
+    parquet: long format, one row per table cell, e.g. for pandas.read_parquet.
+    csv: the same long format as text.
+    netcdf: cubes with the bin centres and sector numbers as coordinates, e.g. for xarray.open_dataset.
+"""
+
+import importlib.util
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy.io import netcdf_file
+
+from scatter import VAR_TITLES
+
+EXPORT_FORMATS = ["parquet", "netcdf", "csv"]
+
+# Statistics along the last dimension of the NSS tables, with their units
+NSS_STATISTICS = [("Hs", "m"), ("Tp", "s"), ("gamma", "-"), ("probability", "-")]
+
+
+def check_formats(formats):
+    """check_formats Exits with a message if an export format is unknown or the library it needs is not installed.
+
+    Args:
+        formats (list): Export formats, any of EXPORT_FORMATS.
+    """
+    for export_format in formats:
+        if export_format not in EXPORT_FORMATS:
+            sys.exit(
+                f"Unknown table export format {export_format}. Use any of {', '.join(EXPORT_FORMATS)}."
+            )
+    if "parquet" in formats and not (
+        importlib.util.find_spec("pyarrow") or importlib.util.find_spec("fastparquet")
+    ):
+        sys.exit("Parquet table exports need the pyarrow or fastparquet package.")
+
+
+def export_scatter_tables(sheets, basename, formats):
+    """export_scatter_tables Writes the scatter tables of a report in the export formats.
+
+    Args:
+        sheets (list): List of (sheet name, tables) tuples, with the Scatter tables of every sheet in print order.
+        basename (str): Path of the files to write, without extension.
+        formats (list): Export formats, any of EXPORT_FORMATS.
+
+    Returns:
+        [list]: Paths of the files written.
+    """
+    files = []
+    if "parquet" in formats or "csv" in formats:
+        files += write_frame(scatter_frame(sheets), basename, formats)
+    if "netcdf" in formats:
+        files.append(write_scatter_netcdf(sheets, basename + ".nc"))
+    return files
+
+
+def export_nss_tables(nss, basename, formats):
+    """export_nss_tables Writes the NSS tables in the export formats.
+
+    Args:
+        nss (NSS): NSS object with its tables calculated.
+        basename (str): Path of the files to write, without extension.
+        formats (list): Export formats, any of EXPORT_FORMATS.
+
+    Returns:
+        [list]: Paths of the files written.
+    """
+    files = []
+    if "parquet" in formats or "csv" in formats:
+        files += write_frame(nss_frame(nss), basename, formats)
+    if "netcdf" in formats:
+        files.append(write_nss_netcdf(nss, basename + ".nc"))
+    return files
+
+
+def write_frame(frame, basename, formats):
+    """write_frame Writes a long format table as Parquet and/or CSV, if they are in the export formats."""
+    files = []
+    if "parquet" in formats:
+        frame.to_parquet(basename + ".parquet", index=False)
+        files.append(basename + ".parquet")
+    if "csv" in formats:
+        frame.to_csv(basename + ".csv", index=False)
+        files.append(basename + ".csv")
+    return files
+
+
+def table_filters(table):
+    """table_filters Returns the (x key, x filter, y key, y filter) of a Scatter table, with None for no filter."""
+    x_filter = (table.x_key, table.x_filt) if table.x_key and table.x_filt else (None, None)
+    y_filter = (table.y_key, table.y_filt) if table.y_key and table.y_filt else (None, None)
+    return (*x_filter, *y_filter)
+
+
+def scatter_frame(sheets):
+    """scatter_frame Returns the scatter tables in long format, one row per occupied cell. Empty cells, with a
+    probability of 0, are left out.
+
+    Args:
+        sheets (list): List of (sheet name, tables) tuples, as for export_scatter_tables.
+
+    Returns:
+        [pandas.DataFrame]: One row per cell, with the sheet, the table number within the sheet, the variables and
+            filters of the table, the centre (or sector number) and bounds of the cell on both axes and its probability.
+    """
+    frames = []
+    for sheet_name, tables in sheets:
+        for number, table in enumerate(tables):
+            x_key, x_filt, y_key, y_filt = table_filters(table)
+            cols = table.sparse.cols
+            rows = table.sparse.rows
+            x_lower, x_upper = (np.asarray(b) for b in table.get_bounds(table.x_var, table.x_bins))
+            y_lower, y_upper = (np.asarray(b) for b in table.get_bounds(table.y_var, table.y_bins))
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "sheet": sheet_name,
+                        "table": number,
+                        "x_var": table.x_var,
+                        "y_var": table.y_var,
+                        "x_key": x_key,
+                        "x_filt": np.nan if x_filt is None else float(x_filt),
+                        "y_key": y_key,
+                        "y_filt": np.nan if y_filt is None else float(y_filt),
+                        "x_bin": np.asarray(table.x_bins, dtype=float)[cols],
+                        "x_lower": x_lower[cols],
+                        "x_upper": x_upper[cols],
+                        "y_bin": np.asarray(table.y_bins, dtype=float)[rows],
+                        "y_lower": y_lower[rows],
+                        "y_upper": y_upper[rows],
+                        "probability": table.sparse.values,
+                    }
+                )
+            )
+    frame = pd.concat(frames, ignore_index=True)
+    for column in ["sheet", "x_var", "y_var", "x_key", "y_key"]:
+        frame[column] = frame[column].astype("category")
+    return frame
+
+
+def write_scatter_netcdf(sheets, filepath):
+    """write_scatter_netcdf Writes the scatter tables of a report as NetCDF cubes.
+
+    Tables of the same variables and filter columns are stacked into one variable, e.g.
+    "Hs_bins_vs_Tp_bins_by_WvD_sectors_by_WnD_sectors", with dimensions (x filter, y filter, y variable, x variable).
+    The axes are named after the table variables, with the bin centres or sector numbers as coordinates and their
+    bounds in "<axis>_bounds". The filter dimensions are named after the filter column with a "_filter" suffix.
+    Empty cells are 0, and filter values without a table in the report NaN.
+
+    Args:
+        sheets (list): List of (sheet name, tables) tuples, as for export_scatter_tables.
+        filepath (str): Path of the .nc file to write.
+
+    Returns:
+        [str]: Path of the file written.
+    """
+    groups = {}
+    axes = {}
+    filters = {}
+    for sheet_name, tables in sheets:
+        for table in tables:
+            x_key, x_filt, y_key, y_filt = table_filters(table)
+            group = groups.setdefault(
+                (table.x_var, table.y_var, x_key, y_key), {"sheets": [], "tables": {}}
+            )
+            if sheet_name not in group["sheets"]:
+                group["sheets"].append(sheet_name)
+            group["tables"][(x_filt, y_filt)] = table
+            for var, bins in [(table.x_var, table.x_bins), (table.y_var, table.y_bins)]:
+                if var not in axes:
+                    axes[var] = (bins, *table.get_bounds(var, bins))
+            for key, value in [(x_key, x_filt), (y_key, y_filt)]:
+                if key:
+                    filters.setdefault(key, set()).add(value)
+
+    nc = netcdf_file(filepath, "w", version=2)
+    nc.createDimension("nv", 2)
+    for var, (centres, lower, upper) in axes.items():
+        add_coordinate(nc, var, centres, VAR_TITLES.get(var, var), lower, upper)
+    for key, values in filters.items():
+        filters[key] = np.array(sorted(values), dtype=float)
+        add_coordinate(
+            nc, f"{key}_filter", filters[key], f"Filter of the tables: {VAR_TITLES.get(key, key)}"
+        )
+
+    for (x_var, y_var, x_key, y_key), group in groups.items():
+        keys = [key for key in (x_key, y_key) if key]
+        dims = tuple(f"{key}_filter" for key in keys) + (y_var, x_var)
+        cube = np.full([nc.dimensions[dim] for dim in dims], np.nan)
+        for (x_filt, y_filt), table in group["tables"].items():
+            position = tuple(
+                int(np.searchsorted(filters[key], value))
+                for key, value in [(x_key, x_filt), (y_key, y_filt)]
+                if key
+            )
+            cube[position] = np.nan_to_num(table.table)
+        name = f"{y_var}_vs_{x_var}" + "".join(f"_by_{key}" for key in keys)
+        variable = nc.createVariable(name, "d", dims)
+        variable[:] = cube
+        variable.long_name = f"Probability of {VAR_TITLES.get(x_var, x_var)} Vs. {VAR_TITLES.get(y_var, y_var)}"
+        variable.units = "-"
+        variable.sheets = ", ".join(group["sheets"])
+    nc.close()
+    return filepath
+
+
+def nss_seas(nss):
+    """nss_seas Returns the NSS tables of every sea state, as a dictionary of {sea state: tables}."""
+    seas = {"Total": nss.Total_tables}
+    if nss.wave_spectral:
+        seas["Wind"] = nss.Wind_tables
+        seas["Swell"] = nss.Swell_tables
+    return seas
+
+
+def nss_frame(nss):
+    """nss_frame Returns the NSS tables in long format, one row per sea state, wind sector, wave sector and wind
+    speed bin with data. Sector 0 is omnidirectional.
+
+    Args:
+        nss (NSS): NSS object with its tables calculated.
+
+    Returns:
+        [pandas.DataFrame]: One row per table row, with the wind speed bin centre and bounds and the statistics.
+    """
+    frames = []
+    for sea, tables in nss_seas(nss).items():
+        wind_sector, wave_sector, ws_bin = np.indices(tables.shape[:3]).reshape(3, -1)
+        values = tables.reshape(-1, tables.shape[3])
+        frame = pd.DataFrame(
+            {
+                "sea": sea,
+                "wind_sector": wind_sector,
+                "wave_sector": wave_sector,
+                "WS_bin": nss.WS_bins_list[ws_bin],
+                "WS_lower": nss.WS_bins_list[ws_bin] - nss.WS_bin_size / 2,
+                "WS_upper": nss.WS_bins_list[ws_bin] + nss.WS_bin_size / 2,
+            }
+        )
+        for i, (statistic, units) in enumerate(NSS_STATISTICS):
+            frame[statistic] = values[:, i]
+        frames.append(frame[frame["probability"] > 0])
+    frame = pd.concat(frames, ignore_index=True)
+    frame["sea"] = frame["sea"].astype("category")
+    return frame
+
+
+def write_nss_netcdf(nss, filepath):
+    """write_nss_netcdf Writes the NSS tables as NetCDF cubes, one variable per sea state and statistic, e.g.
+    "Total_Hs", with dimensions (wind_sector, wave_sector, WS_bins). Sector 0 is omnidirectional.
+
+    Args:
+        nss (NSS): NSS object with its tables calculated.
+        filepath (str): Path of the .nc file to write.
+
+    Returns:
+        [str]: Path of the file written.
+    """
+    nc = netcdf_file(filepath, "w", version=2)
+    nc.createDimension("nv", 2)
+    add_coordinate(
+        nc, "wind_sector", np.arange(nss.NSectors_wind + 1), "Wind direction sector, 0 for omnidirectional"
+    )
+    add_coordinate(
+        nc, "wave_sector", np.arange(nss.NSectors_wave + 1), "Wave direction sector, 0 for omnidirectional"
+    )
+    add_coordinate(
+        nc,
+        "WS_bins",
+        nss.WS_bins_list,
+        f"Hourly Mean WS at {nss.WS_HH}mMSL [m/s]",
+        nss.WS_bins_list - nss.WS_bin_size / 2,
+        nss.WS_bins_list + nss.WS_bin_size / 2,
+    )
+    nc.method = nss.method
+    for sea, tables in nss_seas(nss).items():
+        for i, (statistic, units) in enumerate(NSS_STATISTICS):
+            variable = nc.createVariable(
+                f"{sea}_{statistic}", "d", ("wind_sector", "wave_sector", "WS_bins")
+            )
+            variable[:] = tables[..., i]
+            variable.long_name = f"{statistic} of the {sea} sea NSS tables"
+            variable.units = units
+    nc.close()
+    return filepath
+
+
+def add_coordinate(nc, name, values, long_name, lower=None, upper=None):
+    """add_coordinate Adds a dimension and its coordinate variable to a NetCDF file, with the bounds of the
+    coordinate values in "<name>_bounds" if given.
+
+    Args:
+        nc (scipy.io.netcdf_file): NetCDF file open for writing, with a "nv" dimension of size 2.
+        name (str): Name of the dimension and coordinate.
+        values (numpy.ndarray): Coordinate values.
+        long_name (str): Description of the coordinate.
+        lower (list, optional): Lower bounds of the values. Defaults to None.
+        upper (list, optional): Upper bounds of the values. Defaults to None.
+    """
+    nc.createDimension(name, len(values))
+    variable = nc.createVariable(name, "d", (name,))
+    variable[:] = np.asarray(values, dtype=float)
+    variable.long_name = long_name
+    if lower is not None:
+        variable.bounds = f"{name}_bounds"
+        bounds = nc.createVariable(f"{name}_bounds", "d", (name, "nv"))
+        bounds[:] = np.column_stack([lower, upper])
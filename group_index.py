@@ -0,0 +1,76 @@
+"""
+Module for the GroupIndex class
+Metocean & Energy Assessment Department
+"""
+
+import numpy as np
+
+from backends import PandasBackend
+
+
+class GroupIndex:
+    """A CSR-style index of the rows of every combination of bin and sector codes of one or more columns.
+
+    The rows are sorted once by their combination of codes. The rows of any combination are then a contiguous
+    slice of that permutation, found from the offsets without scanning the data."""
+
+    def __init__(self, codes, sizes, backend=None):
+        """__init__ Initialises the GroupIndex class and sorts the rows by their combination of codes.
+
+        Args:
+            codes (list): List of integer arrays of the same length, one per column. Codes go from 0 to the number of
+                categories of the column minus 1. Rows with a negative code (not in any bin or sector) are left out.
+            sizes (list): Number of categories of every column.
+            backend (PandasBackend, optional): Dataframe backend sorting the rows. Defaults to None, for pandas.
+        """
+        self.shape = tuple(int(size) for size in sizes)
+        n_groups = int(np.prod(self.shape))
+        valid = np.ones(len(codes[0]), dtype=bool)
+        for column_codes, size in zip(codes, self.shape):
+            valid &= (column_codes >= 0) & (column_codes < size)
+        # Flat group of every row. Rows outside the groups go to a trailing group that is never returned.
+        key = np.full(len(codes[0]), n_groups, dtype=np.int64)
+        key[valid] = np.ravel_multi_index(
+            [np.asarray(c)[valid].astype(np.intp) for c in codes], self.shape
+        )
+        # Stable, so that the rows of every group stay in time order
+        self.order, self.offsets = (backend or PandasBackend()).group_order(
+            key, n_groups + 1, np.int32 if len(key) < 2 ** 31 else np.int64
+        )
+
+    @property
+    def counts(self):
+        """counts Returns the number of rows of every combination of codes, with one dimension per column."""
+        return np.diff(self.offsets)[:-1].reshape(self.shape)
+
+    def group(self, *codes):
+        """group Returns the flat group number of a combination of codes, or None if it is outside the index."""
+        if len(codes) != len(self.shape) or any(
+            not 0 <= code < size for code, size in zip(codes, self.shape)
+        ):
+            return None
+        return int(np.ravel_multi_index(codes, self.shape))
+
+    def bounds(self, *codes):
+        """bounds Returns the start and end positions of the rows of a combination of codes in the sorted order.
+        Use them to slice arrays sorted with sort_values."""
+        g = self.group(*codes)
+        if g is None:
+            return 0, 0
+        return int(self.offsets[g]), int(self.offsets[g + 1])
+
+    def rows(self, *codes):
+        """rows Returns the row positions of a combination of codes, in time order.
+
+        Args:
+            *codes (int): One code per column of the index.
+
+        Returns:
+            [numpy.ndarray]: Integer row positions. Empty if no row has that combination.
+        """
+        start, end = self.bounds(*codes)
+        return self.order[start:end]
+
+    def sort_values(self, values):
+        """sort_values Returns values in the sorted order of the index, so that every group is a contiguous slice."""
+        return np.asarray(values)[self.order]
@@ -0,0 +1,195 @@
+"""
+Module for the counting and aggregation kernels
+Metocean & Energy Assessment Department
+
+The tight loops over the bin and sector codes, compiled with Numba when it is installed and in plain NumPy
+otherwise. Both backends give the same results. The compiled kernels are cached to disk in __pycache__, so
+only the first run after installing Numba or changing a kernel pays for their compilation.
+
+Set the METOCEAN_KERNELS environment variable to "numpy" to use the NumPy kernels with Numba installed.
+"""
+
+import os
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Backend of the kernels, "numba" or "numpy"
+BACKEND = "numba" if numba is not None and os.environ.get("METOCEAN_KERNELS") != "numpy" else "numpy"
+
+
+def jit(function):
+    """jit Compiles a kernel with Numba, cached to disk. Returns it unchanged without Numba."""
+    if numba is None:
+        return function
+    return numba.njit(cache=True, nogil=True)(function)
+
+
+def sector_numbers(directions, n_sectors, right):
+    """sector_numbers Returns the direction sector of every direction. Sector 1 is centred on north.
+
+    Args:
+        directions (numpy.ndarray): Directions in degrees.
+        n_sectors (int): Number of sectors.
+        right (bool): Right boundary of the sectors closed. If False, the left boundary is closed.
+
+    Returns:
+        [numpy.ndarray]: Sector numbers from 1 to n_sectors. 0 for missing directions.
+    """
+    directions = np.asarray(directions, dtype=float)
+    if BACKEND == "numba":
+        return _sector_numbers_jit(directions, n_sectors, right)
+    width = 360 / n_sectors
+    if right:
+        sectors = np.ceil(directions / width + 0.5)
+        sectors[directions > 360 - width / 2] = 1
+    else:
+        sectors = np.floor((directions + width / 2) / width + 1)
+        sectors[directions >= 360 - width / 2] = 1
+    sectors[np.isnan(directions)] = 0
+    return sectors.astype(np.int32)
+
+
+@jit
+def _sector_numbers_jit(directions, n_sectors, right):
+    width = 360 / n_sectors
+    sectors = np.empty(directions.size, dtype=np.int32)
+    for i in range(directions.size):
+        direction = directions[i]
+        if np.isnan(direction):
+            sectors[i] = 0
+        elif right:
+            sectors[i] = 1 if direction > 360 - width / 2 else np.ceil(direction / width + 0.5)
+        else:
+            sectors[i] = 1 if direction >= 360 - width / 2 else np.floor((direction + width / 2) / width + 1)
+    return sectors
+
+
+def group_order(keys, n_keys, order_dtype=np.int64):
+    """group_order Stable sort of the rows by their group, as a counting sort.
+
+    Args:
+        keys (numpy.ndarray): Group of every row, from 0 to n_keys - 1.
+        n_keys (int): Number of groups.
+        order_dtype (numpy.dtype, optional): Integer type of the sorted row positions. Defaults to numpy.int64.
+
+    Returns:
+        [tuple]: Tuple of (row positions sorted by group, offsets of every group in them). The rows of group g are
+            order[offsets[g]:offsets[g + 1]], in their original order.
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    if BACKEND == "numba":
+        order = np.empty(keys.size, dtype=order_dtype)
+        offsets = _group_order_jit(keys, n_keys, order)
+        return order, offsets
+    order = np.argsort(keys, kind="stable").astype(order_dtype)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(keys, minlength=n_keys))])
+    return order, offsets
+
+
+@jit
+def _group_order_jit(keys, n_keys, order):
+    offsets = np.zeros(n_keys + 1, dtype=np.int64)
+    for i in range(keys.size):
+        offsets[keys[i] + 1] += 1
+    for g in range(n_keys):
+        offsets[g + 1] += offsets[g]
+    positions = offsets[:-1].copy()
+    for i in range(keys.size):
+        order[positions[keys[i]]] = i
+        positions[keys[i]] += 1
+    return offsets
+
+
+def count_cells(y_codes, x_codes, shape, rows=None):
+    """count_cells Counts the rows in every cell of a scatter table.
+
+    Args:
+        y_codes (numpy.ndarray): Code of the vertical variable of every row of the data. Negative outside the bins.
+        x_codes (numpy.ndarray): Code of the horizontal variable of every row of the data. Negative outside the bins.
+        shape (tuple): (rows, columns) shape of the table.
+        rows (numpy.ndarray, optional): Row positions of the subset to count. Defaults to None, for all of the rows.
+
+    Returns:
+        [numpy.ndarray]: Count of every cell, flattened in row-major order.
+    """
+    if rows is None:
+        rows = np.arange(len(x_codes))
+    if BACKEND == "numba":
+        return _count_cells_jit(y_codes, x_codes, shape[0], shape[1], rows)
+    x_codes = x_codes[rows].astype(np.intp)
+    y_codes = y_codes[rows].astype(np.intp)
+    valid = (x_codes >= 0) & (y_codes >= 0)
+    return np.bincount(y_codes[valid] * shape[1] + x_codes[valid], minlength=shape[0] * shape[1])
+
+
+@jit
+def _count_cells_jit(y_codes, x_codes, n_rows, n_cols, rows):
+    counts = np.zeros(n_rows * n_cols, dtype=np.int64)
+    for row in rows:
+        y = y_codes[row]
+        x = x_codes[row]
+        if y >= 0 and x >= 0:
+            counts[y * n_cols + x] += 1
+    return counts
+
+
+def group_reduce(values, offsets, method):
+    """group_reduce Returns the mean or median of the values of every group, ignoring NaNs.
+
+    Args:
+        values (numpy.ndarray): Values sorted by group, e.g. with GroupIndex.sort_values.
+        offsets (numpy.ndarray): Start of every group in the values, and the end of the last one.
+        method (str): "mean" or "median".
+
+    Returns:
+        [numpy.ndarray]: Mean or median of every group. NaN for groups without values.
+    """
+    values = np.asarray(values, dtype=float)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if BACKEND == "numba":
+        return _group_reduce_jit(values, offsets, method == "mean")
+    n_groups = len(offsets) - 1
+    # Values outside the groups, e.g. of a trailing group of rows not in any bin, are left out
+    values = values[offsets[0]:offsets[-1]]
+    offsets = offsets - offsets[0]
+    groups = np.repeat(np.arange(n_groups), np.diff(offsets))
+    finite = ~np.isnan(values)
+    counts = np.bincount(groups[finite], minlength=n_groups)
+    reduced = np.full(n_groups, np.nan)
+    occupied = counts > 0
+    if method == "mean":
+        sums = np.bincount(groups[finite], weights=values[finite], minlength=n_groups)
+        reduced[occupied] = sums[occupied] / counts[occupied]
+        return reduced
+    # Sorted by value within every group, with the NaNs last
+    ordered = values[np.lexsort((values, groups))]
+    starts = offsets[:-1][occupied]
+    low = ordered[starts + (counts[occupied] - 1) // 2]
+    high = ordered[starts + counts[occupied] // 2]
+    reduced[occupied] = (low + high) / 2
+    return reduced
+
+
+@jit
+def _group_reduce_jit(values, offsets, mean):
+    n_groups = offsets.size - 1
+    reduced = np.full(n_groups, np.nan)
+    for g in range(n_groups):
+        group = values[offsets[g]:offsets[g + 1]]
+        group = group[~np.isnan(group)]
+        if group.size == 0:
+            continue
+        if mean:
+            total = 0.0
+            for value in group:
+                total += value
+            reduced[g] = total / group.size
+        else:
+            group = np.sort(group)
+            reduced[g] = (group[(group.size - 1) // 2] + group[group.size // 2]) / 2
+    return reduced
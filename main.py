@@ -7,8 +7,13 @@ import xlsxwriter
 from metocean_data import MetoceanData
 
 # from scatter import Scatter    # dont need this
-from scatter_report import print_scatter_report
+from scatter_report import (
+    print_scatter_report,
+    print_bin_size_sweep,
+    print_sector_sweep,
+)
 from NSS import NSS
+from bootstrap import print_bootstrap_report
 
 
 def main():
@@ -24,12 +29,15 @@ def main():
     # Create the MetoceanData oject that will hold all of the data and configuration setup.
     metocean_data = MetoceanData(config_filepath)
     print(metocean_data.data.head())
+    memory = metocean_data.memory_report()
+    print(f"Data loaded in {memory.loc['Total', 'MB']:.1f} MB.")
 
     # ---------------------------------------------------------------------------------------------
     # -----------------------------------Creating the NSS Table Report-----------------------------
     # ---------------------------------------------------------------------------------------------
 
     # Method for taking mean or median within bin to be implemented
+    NSS_tables = None
     if (
         metocean_data.config["nss_report"]
         & metocean_data.config["wind_status"]
@@ -37,11 +45,31 @@ def main():
     ):
         NSS_tables = NSS(metocean_data)
 
+    # Confidence bounds of the scatter and NSS tables, if selected in the config file. Before the sweeps of the
+    # scatter report, which re-sectorise the data.
+    if metocean_data.config["bootstrap_resamples"]:
+        print_bootstrap_report(metocean_data, NSS_tables)
+
     # ---------------------------------------------------------------------------------------------
     # ---------------------------------Creating the Scatter Table Report---------------------------
     # ---------------------------------------------------------------------------------------------
     if metocean_data.config["scatter_report"]:
-        print_scatter_report(metocean_data)
+        if metocean_data.config["sector_sweep"]:
+            print_sector_sweep(metocean_data)
+        elif metocean_data.config["bin_size_sweep"]:
+            print_bin_size_sweep(metocean_data)
+        else:
+            print_scatter_report(metocean_data)
+
+    # Time taken by every stage, printed and saved next to the reports
+    metocean_data.profiler.print_summary()
+    metocean_data.profiler.write_summary(
+        f"{metocean_data.config['project']}_Run_Summary.json",
+        project=metocean_data.config["project"],
+        config_file=config_filepath,
+        data_files=metocean_data.data_files,
+        memory_mb=memory["MB"].round(3).to_dict(),
+    )
 
 
 if __name__ == "__main__":
@@ -6,53 +6,184 @@ Metocean & Energy Assessment Department
 """
 
 import sys
+from types import SimpleNamespace
 
 # import os  # remember to remove this import
 # import time  # maybe remove this one too
 import xlsxwriter
-import tkinter as tk
-from tkinter import filedialog
 from openpyxl import load_workbook
 
 import pandas as pd
 import numpy as np
 
+from backends import get_backend
+from export import check_formats
+from group_index import GroupIndex
+from kernels import sector_numbers
+from profiling import Profiler
+from scatter import REPORT_PROFILES
+
+# Direction variables affected by each of the sector settings of the config file
+SECTOR_GROUPS = {
+    "wind_sectors": ["WnD", "WnD_10"],
+    "wave_sectors": ["WvD", "WvD_W", "WvD_S"],
+    "current_sectors": ["CD", "CD_Tid", "CD_Res"],
+}
+
+# Cells of the Config sheet of the config file, by MetoceanData.config key
+CONFIG_CELLS = {
+    "project": "D5",
+    "method": "D6",
+    "bin_type": "D7",
+    "wind_source": "D10",
+    "wind_projection": "D11",
+    "wind_easting": "D12",
+    "wind_northing": "D13",
+    "hub_weibull_a": "D14",
+    "hub_weibull_k": "D15",
+    "hub_height": "D16",
+    "10m": "D17",
+    "wind_bin_size": "D18",
+    "wind_sectors": "D19",
+    "wave_source": "D22",
+    "wave_projection": "D23",
+    "wave_easting": "D24",
+    "wave_northing": "D25",
+    "wave_spectral": "D26",
+    "peak_enhancement": "D27",
+    "derive_peak_enhancement": "D28",
+    "wave_height_bin_size": "D29",
+    "wave_period_bin_size": "D30",
+    "wave_sectors": "D31",
+    "current_source": "D34",
+    "current_projection": "D35",
+    "current_easting": "D36",
+    "current_northing": "D37",
+    "current_bin_size": "D38",
+    "current_sectors": "D39",
+    "current_components": "D40",
+    "water_source": "D43",
+    "water_projection": "D44",
+    "water_easting": "D45",
+    "water_northing": "D46",
+    "nss_report": "D49",
+    "scatter_report": "D50",
+    "persistence_report": "D51",
+    "persistence_hs_limits": "D52",
+    "persistence_ws_limits": "D53",
+    "persistence_durations": "D54",
+    "wind_bin_size_sweep": "D55",
+    "wave_height_bin_size_sweep": "D56",
+    "wave_period_bin_size_sweep": "D57",
+    "wind_sectors_sweep": "D58",
+    "wave_sectors_sweep": "D59",
+    "current_sectors_sweep": "D60",
+    "sector_offset": "D61",
+    "direction_resolution": "D62",
+    "percentiles": "D63",
+    "median_sketch_error": "D64",
+    "profile_stages": "D65",
+    "compact_layout": "D66",
+    "categorical_columns": "D67",
+    "report_profile": "D68",
+    "constant_memory": "D69",
+    "table_exports": "D70",
+    "report_workers": "D71",
+    "nss_workers": "D72",
+    "bootstrap_resamples": "D73",
+    "bootstrap_block_hours": "D74",
+    "bootstrap_confidence": "D75",
+    "bootstrap_sheets": "D76",
+    "bootstrap_workers": "D77",
+    "dataframe_backend": "D78",
+}
+# ON/OFF cells of the data types, by MetoceanData.config key
+STATUS_CELLS = {
+    "wind_status": "F9",
+    "wave_status": "F21",
+    "current_status": "F33",
+    "water_status": "F42",
+}
+# Cells of the sweeps, which MetoceanData.config holds as dictionaries of {bin size or sector setting: list}
+SWEEP_CELLS = {
+    "bin_size_sweep": {
+        setting: CONFIG_CELLS[f"{setting}_sweep"]
+        for setting in ["wind_bin_size", "wave_height_bin_size", "wave_period_bin_size"]
+    },
+    "sector_sweep": {
+        setting: CONFIG_CELLS[f"{setting}_sweep"]
+        for setting in ["wind_sectors", "wave_sectors", "current_sectors"]
+    },
+}
+
 
 class MetoceanData:
     """A class to manage store the user configuration settings and read and store the data inputs."""
 
-    # Inisialise the MetoceanData object using the filepath of the configuration file.
-    def __init__(self, filepath):
+    # Inisialise the MetoceanData object using the filepath of the configuration file, or a dictionary of its values
+    # by config key (see CONFIG_CELLS and STATUS_CELLS).
+    # Data can be given as a dictionary with "wind", "wave", "current" and "water" keys to skip the file dialogs. Every
+    # input is a .txt file path, a DataFrame or a NumPy array (see read_source). With dialogs False, missing inputs
+    # exit with a message instead of being asked for, so that the object can be built without tkinter.
+    def __init__(self, filepath, data_files=None, dialogs=True):
+        # Initialise a data_files attribute with the input .txt file paths, DataFrames or arrays
+        self.data_files = dict(data_files or {})
+        self.dialogs = dialogs
         # Initialise a config attribute which will be a dictionary containing all of the configuration options for the report.
         self.config = {}
         # Initialise a bins attribute which will be a dictionary of lists containing the centre of the different data type bins
         self.bins = {}
+        # Initialise a bin_sizes attribute which will be a dictionary of the bin size of every binned variable
+        self.bin_sizes = {}
+        # Initialise a fine_directions attribute which will be a dictionary of fine angular bin codes per direction variable
+        self.fine_directions = {}
+        # Initialise the codes and group_indices attributes, caches of the bin/sector codes and GroupIndex objects per column
+        self.codes = {}
+        self.group_indices = {}
+        # Initialise a profiler attribute recording the time taken by every processing stage
+        self.profiler = Profiler()
         # Execute the parse_config file to populate the config attribute.
-        self.parse_config(filepath)
+        with self.profiler.span("parse_config"):
+            self.parse_config(filepath)
+        self.profiler.profile_stages = self.config["profile_stages"]
+        # Initialise a backend attribute reading, aligning, binning, counting and aggregating the data
+        self.backend = get_backend(self.config["dataframe_backend"])
         # Read and store the data
-        self.parse_data()
+        with self.profiler.span("parse_data") as span:
+            self.parse_data()
+            span["rows"] = len(self.data) if hasattr(self, "data") else 0
         # Create sector and bins from data and populate the bins attribute
-        self.sectorise()
+        with self.profiler.span("sectorise", rows=span["rows"]):
+            self.sectorise()
+        # Store the measurements as float32 once they have been binned at full precision
+        if self.config["compact_layout"]:
+            self.compact()
 
     def parse_config(self, filepath):
         """parse_config [Parses the 'Config' sheet and stores all configuration parameters in a dictionary self.config.]
 
         Args:
-            filepath ([string]): [full filepath of the config excel file.]
+            filepath ([string]): [full filepath of the config excel file, or a dictionary of its values by config key.]
         """
+        # Values given in memory, read through the same cells as the config file
+        if isinstance(filepath, dict):
+            workbook = {"Config": ConfigSheet(filepath)}
         # Make sure that the config file is closed. Repeat until  the try statement succeeds.
-        while True:
+        while not isinstance(filepath, dict):
             try:
                 workbook = load_workbook(filepath, read_only=True)
                 break  # exit the while loop
             except IOError:
+                # Without dialogs there is nobody to close it
+                if not self.dialogs:
+                    sys.exit(f"Could not open the configuration file {filepath}.")
                 input(
                     "Could not open the configuration file. Please close the file. Press Enter to retry."
                 )
                 # Restart the loop.
 
         # Check if the 'Config' sheet exists in the config file.
-        if "Config" in workbook.sheetnames:
+        if "Config" in workbook:
             config_sheet = workbook["Config"]
         else:
             # Exit the application if no 'config' sheet exists.
@@ -140,6 +271,90 @@ class MetoceanData:
         # Parsing of output requests
         self.config["nss_report"] = config_sheet["D49"].value
         self.config["scatter_report"] = config_sheet["D50"].value
+        # Weather window persistence sheet. Thresholds and durations are comma separated lists.
+        self.config["persistence_report"] = bool(config_sheet["D51"].value)
+        if self.config["persistence_report"]:
+            self.config["persistence_hs_limits"] = parse_list(config_sheet["D52"].value)
+            self.config["persistence_ws_limits"] = parse_list(config_sheet["D53"].value)
+            self.config["persistence_durations"] = parse_list(config_sheet["D54"].value)
+        # Bin size variants of the scatter report. Comma separated bin sizes, multiples of the config bin size.
+        self.config["bin_size_sweep"] = {}
+        for setting, cell in [
+            ("wind_bin_size", "D55"),
+            ("wave_height_bin_size", "D56"),
+            ("wave_period_bin_size", "D57"),
+        ]:
+            sizes = parse_list(config_sheet[cell].value)
+            if sizes and setting in self.config:
+                self.config["bin_size_sweep"][setting] = sizes
+        # Direction sector variants of the scatter report, assembled from a fine angular histogram
+        self.config["sector_sweep"] = {}
+        for setting, cell in [
+            ("wind_sectors", "D58"),
+            ("wave_sectors", "D59"),
+            ("current_sectors", "D60"),
+        ]:
+            counts = [int(n) for n in parse_list(config_sheet[cell].value)]
+            if counts and setting in self.config:
+                self.config["sector_sweep"][setting] = counts
+        # Rotation of the sector centres clockwise from north in degrees, of every report with or without sweeps
+        self.config["sector_offset"] = config_sheet["D61"].value or 0
+        self.config["direction_resolution"] = config_sheet["D62"].value or 0.25
+        # Percentiles of the conditional percentile tables, e.g. "50, 90, 99"
+        self.config["percentiles"] = parse_list(config_sheet["D63"].value)
+        # Rank error of the approximate NSS medians. Empty for exact medians.
+        self.config["median_sketch_error"] = config_sheet["D64"].value
+        # Compact storage of self.data: float32 measurements and small integer bin and sector codes
+        self.config["compact_layout"] = bool(config_sheet["D66"].value)
+        # Ordered Categorical "_bins" and "_sectors" columns, with the bin centres and sector numbers as categories
+        self.config["categorical_columns"] = bool(config_sheet["D67"].value)
+        # Formatting of the reports: "full", "compact" (scatter report with blank empty cells and sheet-wide
+        # colour scales) or "fast" (values only, without any styling)
+        self.config["report_profile"] = str(config_sheet["D68"].value or "full").strip().lower()
+        if self.config["report_profile"] not in REPORT_PROFILES:
+            sys.exit(
+                f"Report profile {config_sheet['D68'].value} in cell D68 of the config file is not one of {REPORT_PROFILES}."
+            )
+        # Write the scatter report row by row in xlsxwriter constant_memory mode, for very large sheets
+        self.config["constant_memory"] = bool(config_sheet["D69"].value)
+        # Worker processes writing the grid sheets of the scatter report to workbooks of their own. Empty for a
+        # single workbook.
+        self.config["report_workers"] = int(config_sheet["D71"].value or 0)
+        # Worker processes calculating and printing the NSS sea states, to excel files of their own. Empty for a single
+        # process.
+        self.config["nss_workers"] = int(config_sheet["D72"].value or 0)
+        # Machine-readable exports of the tables next to the Excel reports, e.g. "parquet, netcdf, csv"
+        self.config["table_exports"] = [
+            export_format.strip().lower()
+            for export_format in str(config_sheet["D70"].value or "").split(",")
+            if export_format.strip()
+        ]
+        check_formats(self.config["table_exports"])
+        # Block bootstrap confidence bounds of the scatter and NSS tables. Empty or 0 resamples for none.
+        self.config["bootstrap_resamples"] = int(config_sheet["D73"].value or 0)
+        # Length of the resampled blocks in hours, 30 days by default
+        self.config["bootstrap_block_hours"] = float(config_sheet["D74"].value or 720)
+        self.config["bootstrap_confidence"] = float(config_sheet["D75"].value or 0.9)
+        if self.config["bootstrap_resamples"] and not 0 < self.config["bootstrap_confidence"] < 1:
+            sys.exit(
+                f"Bootstrap confidence {config_sheet['D75'].value} in cell D75 of the config file is not between 0 and 1."
+            )
+        # Scatter report sheets with bounds, e.g. "WndSpd-WndDir (@HH), Hs-WaveDir". Empty for the omnidirectional sheets.
+        self.config["bootstrap_sheets"] = [
+            sheet.strip()
+            for sheet in str(config_sheet["D76"].value or "").split(",")
+            if sheet.strip()
+        ]
+        # Worker processes running the batches of resamples. Empty for a single process.
+        self.config["bootstrap_workers"] = int(config_sheet["D77"].value or 0)
+        # Dataframe backend of the run, "pandas" or "polars"
+        self.config["dataframe_backend"] = str(config_sheet["D78"].value or "pandas").strip().lower()
+        # Stages to dump a cProfile .prof file for, e.g. "sectorise, nss_compute", or "all" for every top-level stage
+        self.config["profile_stages"] = [
+            stage.strip()
+            for stage in str(config_sheet["D65"].value or "").split(",")
+            if stage.strip()
+        ]
 
         print("Parsing configuration complete!")
 
@@ -151,20 +366,28 @@ class MetoceanData:
         # Create a list to store all of the loaded dataframes from the .txt files
         df_list = []
         if self.config["wind_status"]:
-            wind_df = self.parse_wind()
+            with self.profiler.span("parse_wind") as span:
+                wind_df = self.parse_wind()
+                span["rows"] = len(wind_df)
             df_list.append(wind_df)
         if self.config["wave_status"]:
-            wave_df = self.parse_wave()
+            with self.profiler.span("parse_wave") as span:
+                wave_df = self.parse_wave()
+                span["rows"] = len(wave_df)
             df_list.append(wave_df)
         if self.config["current_status"]:
-            current_df = self.parse_current()
+            with self.profiler.span("parse_current") as span:
+                current_df = self.parse_current()
+                span["rows"] = len(current_df)
             df_list.append(current_df)
         if self.config["water_status"]:
-            water_df = self.parse_water()
+            with self.profiler.span("parse_water") as span:
+                water_df = self.parse_water()
+                span["rows"] = len(water_df)
             df_list.append(water_df)
         # Concatenate all the dataframes (if the list is not empty) into a single dataframe and only in the overlapping period
         if df_list:
-            self.data = pd.concat(df_list, axis=1, join="inner")
+            self.data = self.backend.align(df_list)
         print("Parsing data complete!")
 
     def parse_wind(self):
@@ -175,13 +398,10 @@ class MetoceanData:
             [pandas.Dataframe]: [Dataframe of the wind data timeseries]
         """
         # Read wind data file into a dataframe
-        wind_file = filedialog.askopenfilename(
-            title="Select the wind data file.", filetypes=[("Text Files", "*.txt")]
-        )
-        wind_df = pd.read_csv(wind_file, sep="\t", header=None)
+        wind_df = self.read_source("wind", "Select the wind data file.")
         # Check if the number of columns is correct.
         if self.config["10m"]:
-            if len(wind_df.columns) != 10:
+            if count_fields(wind_df) != 10:
                 sys.exit(
                     "Incorrect number of fields in the wind data file for 10m wind speed = TRUE. Check wind data file or config file and try again."
                 )
@@ -200,7 +420,7 @@ class MetoceanData:
                 axis="columns",
             )
         else:
-            if len(wind_df.columns) != 6:
+            if count_fields(wind_df) != 6:
                 sys.exit(
                     "Incorrect number of fields in the wind data file for 10m wind speed = FALSE. Check wind data file or config file and try again."
                 )
@@ -208,7 +428,7 @@ class MetoceanData:
                 {2: "WS", 3: "WnD", 4: "T", 5: "Roh"}, inplace=True, axis="columns"
             )
 
-        wind_df = make_time_index(wind_df)
+        wind_df = self.time_index(wind_df)
         if True in wind_df.index.duplicated():
             sys.exit(
                 "Duplicate timestamps in the wind data file. Please check and try again."
@@ -223,16 +443,13 @@ class MetoceanData:
             [pandas.Dataframe]: [Dataframe of the wave data timeseries]
         """
         # Read wave data file into a dataframe
-        wave_file = filedialog.askopenfilename(
-            title="Select the wave data file.", filetypes=[("Text Files", "*.txt")]
-        )
-        wave_df = pd.read_csv(wave_file, sep="\t", header=None)
+        wave_df = self.read_source("wave", "Select the wave data file.")
         # Check if there should be spectral wave components (swell and windsea)
         if self.config["wave_spectral"]:
             # Check if the user has input peak enhancement factor.
             if self.config["peak_enhancement"]:
                 # Checks the correct number of columns in the wave .txt file
-                if len(wave_df.columns) != 17:
+                if count_fields(wave_df) != 17:
                     sys.exit(
                         "Incorrect number of fields in the wave data file for spectral components = TRUE and Peak Enhancement Factor = TRUE. Check wave data file or config file and try again."
                     )
@@ -259,7 +476,7 @@ class MetoceanData:
                 )
             # If no peak enhancement factor is input in the .txt file
             else:
-                if len(wave_df.columns) != 14:
+                if count_fields(wave_df) != 14:
                     sys.exit(
                         "Incorrect number of fields in the wave data file for spectral components = TRUE and Peak Enhancement Factor = FALSE. Check wave data file or config file and try again."
                     )
@@ -290,7 +507,7 @@ class MetoceanData:
         else:
             # Check if the user has input peak enhancement factor.
             if self.config["peak_enhancement"]:
-                if len(wave_df.columns) != 7:
+                if count_fields(wave_df) != 7:
                     sys.exit(
                         "Incorrect number of fields in the wave data file for spectral components = FALSE and Peak Enhancement Factor = TRUE. Check wave data file or config file and try again."
                     )
@@ -301,7 +518,7 @@ class MetoceanData:
                 )
             # If no peak enhancement factor is input in the .txt file
             else:
-                if len(wave_df.columns) != 6:
+                if count_fields(wave_df) != 6:
                     sys.exit(
                         "Incorrect number of fields in the wave data file for spectral components = FALSE and Peak Enhancement Factor = FALSE. Check wave data file or config file and try again."
                     )
@@ -313,7 +530,7 @@ class MetoceanData:
                         wave_df
                     )  # populate wave_df with values for gamma
 
-        wave_df = make_time_index(wave_df)
+        wave_df = self.time_index(wave_df)
         if True in wave_df.index.duplicated():
             sys.exit(
                 "Duplicate timestamps in the wave data file. Please check and try again."
@@ -328,13 +545,10 @@ class MetoceanData:
             [pandas.Dataframe]: [Dataframe of the current data timeseries]
         """
         # Read wave data file into a dataframe
-        current_file = filedialog.askopenfilename(
-            title="Select the current data file.", filetypes=[("Text Files", "*.txt")]
-        )
-        current_df = pd.read_csv(current_file, sep="\t", header=None)
+        current_df = self.read_source("current", "Select the current data file.")
         # Check if there are tidal and residual current components
         if self.config["current_components"]:
-            if len(current_df.columns) != 11:
+            if count_fields(current_df) != 11:
                 sys.exit(
                     "Incorrect number of fields in the current data file for current components = TRUE. Check current data file or config file and try again."
                 )
@@ -354,14 +568,14 @@ class MetoceanData:
                 axis="columns",
             )
         else:
-            if len(current_df.columns) != 5:
+            if count_fields(current_df) != 5:
                 sys.exit(
                     "Incorrect number of fields in the current data file for current components = FALSE. Check current data file or config file and try again."
                 )
             current_df.rename(
                 {2: "SV", 3: "DaV", 4: "CD"}, inplace=True, axis="columns"
             )
-        current_df = make_time_index(current_df)
+        current_df = self.time_index(current_df)
         if True in current_df.index.duplicated():
             sys.exit(
                 "Duplicate timestamps in the current data file. Please check and try again."
@@ -376,23 +590,71 @@ class MetoceanData:
             [pandas.Dataframe]: [Dataframe of the water data timeseries]
         """
         # Read water data file into a dataframe
-        water_file = filedialog.askopenfilename(
-            title="Select the seawater data file.", filetypes=[("Text Files", "*.txt")]
-        )
-        water_df = pd.read_csv(water_file, sep="\t", header=None)
+        water_df = self.read_source("water", "Select the seawater data file.")
         # Check if the water file has the correct number of columns.
-        if len(water_df.columns) != 5:
+        if count_fields(water_df) != 5:
             sys.exit(
                 "Incorrect number of field in the water file. Check water data file of config file and try again."
             )
         water_df.rename({2: "Salt", 3: "SST", 4: "Roh_W"}, inplace=True, axis="columns")
-        water_df = make_time_index(water_df)
+        water_df = self.time_index(water_df)
         if True in water_df.index.duplicated():
             sys.exit(
                 "Duplicate timestamps in the water data file. Please check and try again."
             )
         return water_df
 
+    def read_source(self, kind, title):
+        """read_source Reads an input of data_files into a dataframe with the fields as column positions, as the
+        dataframe backend reads the .txt files. Asks for the file with a dialog if the input is not given.
+
+        An input is a .txt file path, a NumPy array or a DataFrame with the columns of the .txt file (YYYYMMDD, HHMM
+        and the fields of the data type), or a DataFrame with a DatetimeIndex and the fields of the data type only, in
+        the order of the .txt file. The fields are renamed by position, whatever their column labels.
+
+        Args:
+            kind (str): "wind", "wave", "current" or "water".
+            title (str): Title of the file dialog.
+
+        Returns:
+            [pandas.DataFrame]: Dataframe of the input. The fields of DataFrames with a DatetimeIndex start at column 2.
+        """
+        source = self.data_files.get(kind)
+        if source is None or isinstance(source, str) and not source:
+            if not self.dialogs:
+                sys.exit(f"No {kind} data given. Add a {kind} file path, DataFrame or array to the data files.")
+            source = ask_data_file(title)
+            self.data_files[kind] = source
+        if isinstance(source, pd.DataFrame):
+            if isinstance(source.index, pd.DatetimeIndex):
+                # The fields are renamed and the wave fields extended, which leaves the given DataFrame as it is
+                df = source.copy(deep=False)
+                df.columns = range(2, df.shape[1] + 2)
+                return df
+            # The time columns are replaced in place by the DateTime index
+            df = source.copy()
+            df.columns = range(df.shape[1])
+            return df
+        if isinstance(source, np.ndarray):
+            if source.ndim != 2 or source.shape[1] < 3:
+                sys.exit(f"The {kind} data array must have the YYYYMMDD, HHMM and data columns of the {kind} data file.")
+            return pd.DataFrame(source).astype({0: np.int64, 1: np.int64})
+        return self.backend.read(source)
+
+    def time_index(self, df):
+        """time_index Replaces the YYYYMMDD and HHMM columns of a dataframe read with read_source by a DateTime index,
+        if it does not have one already.
+
+        Args:
+            df (pandas.DataFrame): Dataframe of an input, with the fields renamed.
+
+        Returns:
+            [pandas.DataFrame]: Dataframe with the DateTime index.
+        """
+        if isinstance(df.index, pd.DatetimeIndex):
+            return df
+        return self.backend.time_index(df)
+
     def get_gamma(self, wave_df):
 
         wave_df["G"] = (wave_df["Tp"] / np.sqrt(wave_df["Hs"])).map(gamma_DNVGL)
@@ -499,6 +761,65 @@ class MetoceanData:
                     "CD_Res", self.config["current_sectors"], right
                 )
 
+        # Sectors rotated by the offset of the config file, so that they match the sector bounds of the reports
+        if self.config["sector_offset"]:
+            self.resectorise(
+                {setting: self.config[setting] for setting in SECTOR_GROUPS if setting in self.config},
+                self.config["sector_offset"],
+            )
+
+    def resectorise(self, sectors, offset=0):
+        """resectorise [Re-assigns the "_sectors" columns of self.data for new sector counts and a rotation offset.
+        Directions are counted once into fine angular bins (self.config["direction_resolution"] wide) and each
+        sector layout is assembled from those bins through a lookup table, so the raw directions are not scanned again.]
+
+        Args:
+            sectors ([dict]): [dictionary of {sector setting: number of sectors}, e.g. {"wind_sectors": 16}]
+            offset ([float]): [rotation of the sector centres clockwise from north in degrees. Defaults to 0]
+        """
+        right = self.config["bin_type"] == "right"
+        resolution = self.config["direction_resolution"]
+        for setting, n_sectors in sectors.items():
+            sector_map = get_sector_map(resolution, n_sectors, offset, right)
+            for header in SECTOR_GROUPS[setting]:
+                if f"{header}_sectors" not in self.data.columns:
+                    continue
+                if header not in self.fine_directions:
+                    self.fine_directions[header] = self.get_fine_directions(
+                        header, resolution, right
+                    )
+                # Missing directions are in the last fine bin, which maps to sector 0 as in get_sectors
+                self.data[f"{header}_sectors"] = self.format_sectors(
+                    sector_map[self.fine_directions[header]], n_sectors
+                )
+            self.config[setting] = n_sectors
+        self.config["sector_offset"] = offset
+        # Codes and indices of the old sectors are no longer valid
+        self.codes = {}
+        self.group_indices = {}
+
+    def get_fine_directions(self, header, resolution, right):
+        """get_fine_directions [Function to get the fine angular bin of a specific direction column under self.data]
+
+        Args:
+            header ([string]): [header of the column in self.data to get the fine bins from]
+            resolution ([float]): [width of the fine angular bins in degrees. Must divide 360]
+            right ([bool]): [indicates if right boundary is closed. If False, left boudnary is closed]
+
+        Returns:
+            [numpy.ndarray]: [array of fine bin indices, from 0 (starting at north) to 360 / resolution - 1, and
+                360 / resolution for missing directions]
+        """
+        n_fine = int(round(360 / resolution))
+        directions = self.data[header].to_numpy(float)
+        if right:
+            codes = np.ceil(directions / resolution) - 1
+        else:
+            codes = np.floor(directions / resolution)
+        codes = codes % n_fine
+        codes[np.isnan(directions)] = n_fine
+        return codes.astype(np.int32)
+
     def get_bins(self, header, bin_size, right):
         """get_bins [Function to get bin values for a specific column under self.data and populate self.bins]
 
@@ -508,14 +829,23 @@ class MetoceanData:
             right ([bool]): [indicates if right boundary is closed. If False, left boudnary is closed]
 
         Returns:
-            [list]: [list to append to self.data containing binned values]
+            [list]: [list to append to self.data containing binned values. Integer bin codes in the compact layout]
         """
         bines = np.arange(0, self.data[str(header)].max(), bin_size)
-        bin_list = (
-            np.digitize(self.data[str(header)], bins=bines, right=right) * bin_size
-            - bin_size / 2
-        )
+        codes = self.backend.bin(self.data[str(header)].to_numpy(), bines, right)
         self.bins[header] = bines + bin_size / 2
+        self.bin_sizes[header] = bin_size
+
+        if self.config["categorical_columns"]:
+            # Values outside the bins (below zero) are missing, as they are never counted in the tables
+            return pd.Categorical.from_codes(
+                np.where(codes > 0, codes - 1, -1),
+                categories=self.bins[header].round(4),
+                ordered=True,
+            )
+        if self.config["compact_layout"]:
+            return codes.astype(code_dtype(len(bines) + 1))
+        bin_list = codes * bin_size - bin_size / 2
 
         return bin_list.round(4)
 
@@ -530,41 +860,326 @@ class MetoceanData:
         Returns:
             [list]: [list to append to self.data containing sectorised values]
         """
-        if right:
-            sector_list = np.where(
-                self.data[header] > (360 - ((360 / N_Sectors) / 2)),
-                1,
-                self.data[header]
-                .apply(lambda x: np.ceil(((x / (360 / N_Sectors)) + 0.5)))
-                .astype("Int64"),
+        sector_list = sector_numbers(self.data[header].to_numpy(float), N_Sectors, right)
+        return self.format_sectors(sector_list, N_Sectors)
+
+    def format_sectors(self, sector_list, N_Sectors):
+        """format_sectors [Function to store sector numbers in the layout of the "_sectors" columns of self.data]
+
+        Args:
+            sector_list ([numpy.ndarray]): [sector numbers from 1 to N_Sectors, 0 for missing directions]
+            N_sectors ([int]): [number of sectors]
+
+        Returns:
+            [list]: [list to append to self.data containing sectorised values]
+        """
+        if self.config["categorical_columns"]:
+            # Missing directions are sector 0, so code -1
+            return pd.Categorical.from_codes(
+                sector_list.astype(np.int64) - 1,
+                categories=np.arange(N_Sectors) + 1,
+                ordered=True,
             )
+        if self.config["compact_layout"]:
+            # Without the nullable integers of the default layout. Missing directions are sector 0.
+            return sector_list.astype(code_dtype(N_Sectors))
+        # Integer sectors, missing for missing directions
+        sector_list = np.array(sector_list.tolist(), dtype=object)
+        sector_list[sector_list == 0] = pd.NA
+        return sector_list
+
+    def compact(self):
+        """compact [Down-casts the float64 measurement columns of self.data to float32.
+        The "_bins" and "_sectors" columns are already small integer codes in the compact layout.]
+        """
+        for column in self.data.columns:
+            if self.data[column].dtype == np.float64:
+                self.data[column] = self.data[column].astype(np.float32)
+
+    def encode(self, column, values):
+        """encode [Function to convert bin centres or sector numbers to the values stored in a column of self.data,
+        so that they can be compared against it. Bin centres are integer bin codes in the compact layout.]
 
+        Args:
+            column ([string]): [header of the "_bins" or "_sectors" column in self.data]
+            values ([float or numpy.ndarray]): [bin centres or sector numbers]
+
+        Returns:
+            [float or numpy.ndarray]: [values as stored in the column]
+        """
+        values = np.asarray(values)
+        if not column.endswith("_bins"):
+            encoded = values
+        elif self.config["compact_layout"] and not self.config["categorical_columns"]:
+            bin_size = self.bin_sizes[column[: -len("_bins")]]
+            encoded = np.rint(values / bin_size + 0.5).astype(np.int64)
         else:
-            sector_list = np.where(
-                self.data[header] >= (360 - ((360 / N_Sectors) / 2)),
-                1,
-                (((self.data[header] + (360 / N_Sectors) / 2) / (360 / N_Sectors)) + 1)
-                .apply(np.floor)
-                .astype("Int64"),
+            encoded = values.round(4)
+        return encoded if encoded.ndim else encoded.item()
+
+    def decode(self, column):
+        """decode [Function to get the bin centres or sector numbers of a column of self.data, whatever the layout]
+
+        Args:
+            column ([string]): [header of the "_bins" or "_sectors" column in self.data]
+
+        Returns:
+            [numpy.ndarray]: [array of bin centres or sector numbers]
+        """
+        if self.config["categorical_columns"]:
+            return self.data[column].to_numpy(dtype=float, na_value=np.nan)
+        values = self.data[column].to_numpy()
+        if column.endswith("_bins") and self.config["compact_layout"]:
+            bin_size = self.bin_sizes[column[: -len("_bins")]]
+            return (values * bin_size - bin_size / 2).round(4)
+        return values
+
+    def get_categories(self, column):
+        """get_categories [Function to get the bin centres or sector numbers of a "_bins" or "_sectors" column of self.data]
+
+        Args:
+            column ([string]): [header of the "_bins" or "_sectors" column in self.data]
+
+        Returns:
+            [numpy.ndarray]: [array of bin centres or sector numbers, in code order]
+        """
+        header = column.replace("_sectors", "").replace("_bins", "")
+        if column.endswith("_sectors"):
+            setting = [s for s, headers in SECTOR_GROUPS.items() if header in headers][0]
+            return np.arange(self.config[setting]) + 1
+        return self.bins[header]
+
+    def get_codes(self, column):
+        """get_codes [Function to get the position of every value of a "_bins" or "_sectors" column of self.data
+        among its categories (see get_categories), whatever the layout. Computed once per column.]
+
+        Args:
+            column ([string]): [header of the "_bins" or "_sectors" column in self.data]
+
+        Returns:
+            [numpy.ndarray]: [array of integer codes. -1 for values outside the bins or sectors]
+        """
+        if column not in self.codes:
+            n_codes = len(self.get_categories(column))
+            if isinstance(self.data[column].dtype, pd.CategoricalDtype):
+                codes = self.data[column].cat.codes.to_numpy()
+            elif column.endswith("_sectors"):
+                codes = self.sector_numbers(column) - 1
+            else:
+                # Same matching of the bin centres as the comparisons with encode
+                stored = self.encode(column, self.get_categories(column))
+                values = self.data[column].to_numpy(float)
+                codes = np.minimum(np.searchsorted(stored, values), n_codes - 1)
+                codes[stored[codes] != values] = -1
+            codes = np.where((codes >= 0) & (codes < n_codes), codes, -1)
+            self.codes[column] = codes.astype(np.int8 if n_codes < 127 else np.int32)
+        return self.codes[column]
+
+    def get_code(self, column, value):
+        """get_code [Function to get the code of a single bin centre or sector number of a column, as in get_codes]
+
+        Args:
+            column ([string]): [header of the "_bins" or "_sectors" column in self.data]
+            value ([float or int]): [bin centre or sector number]
+
+        Returns:
+            [int]: [code of the value. -1 if it is not one of the categories of the column]
+        """
+        matches = np.flatnonzero(
+            np.asarray(self.get_categories(column)).round(4) == round(float(value), 4)
+        )
+        return int(matches[0]) if len(matches) else -1
+
+    def group_index(self, *columns):
+        """group_index [Function to get the GroupIndex of a combination of "_bins" and "_sectors" columns of self.data.
+        Built once per combination and reused, so that subsets are sliced instead of masking the full dataframe.]
+
+        Args:
+            *columns ([string]): [headers of the "_bins" or "_sectors" columns in self.data]
+
+        Returns:
+            [GroupIndex]: [index of the rows of every combination of codes of the columns]
+        """
+        if columns not in self.group_indices:
+            self.group_indices[columns] = GroupIndex(
+                [self.get_codes(column) for column in columns],
+                [len(self.get_categories(column)) for column in columns],
+                self.backend,
             )
+        return self.group_indices[columns]
 
-        return sector_list
+    def sector_numbers(self, column):
+        """sector_numbers [Function to get the sector numbers of a "_sectors" column of self.data as integers, whatever the layout]
+
+        Args:
+            column ([string]): [header of the "_sectors" column in self.data]
+
+        Returns:
+            [numpy.ndarray]: [array of sector numbers. 0 for missing directions]
+        """
+        return self.data[column].astype("Float64").fillna(0).to_numpy(np.int64)
+
+    def memory_report(self):
+        """memory_report [Function to get the memory used by every column of self.data]
+
+        Returns:
+            [pandas.DataFrame]: [dataframe of dtype and size in MB per column, with the index and a total as the last rows]
+        """
+        usage = self.data.memory_usage(index=True, deep=True)
+        report = pd.DataFrame(
+            {
+                "dtype": [str(self.data.index.dtype)]
+                + [str(dtype) for dtype in self.data.dtypes],
+                "MB": usage.to_numpy() / 1024 ** 2,
+            },
+            index=["Index"] + list(self.data.columns),
+        )
+        report.loc["Total"] = ["", report["MB"].sum()]
+        return report
+
+
+def get_sector_map(resolution, N_Sectors, offset, right):
+    """get_sector_map Returns the sector number of every fine angular bin, using the same centred-on-north logic
+    as MetoceanData.get_sectors, with the sector centres rotated by offset.
+
+    Args:
+        resolution (float): Width of the fine angular bins in degrees.
+        N_Sectors (int): Number of direction sectors.
+        offset (float): Rotation of the sector centres clockwise from north in degrees.
+        right (bool): Indicates if right boundary is closed. If False, left boudnary is closed.
+
+    Returns:
+        [numpy.ndarray]: Array of sector numbers (1 to N_Sectors) indexed by fine bin, with a last sector 0 for the
+            fine bin of missing directions.
+    """
+    n_fine = int(round(360 / resolution))
+    width = 360 / N_Sectors
+    # Every sector boundary must fall on a fine bin boundary
+    for value in [width, width / 2 - offset]:
+        if not np.isclose(value / resolution, round(value / resolution)):
+            sys.exit(
+                f"{N_Sectors} sectors with a {offset} deg offset do not align with the {resolution} deg direction resolution. Check the config file and try again."
+            )
+    # Work in whole fine bins to avoid rounding errors at the sector boundaries
+    fine_width = int(round(width / resolution))
+    fine_start = int(round((width / 2 - offset) / resolution))
+    if right:
+        # Fine bins are closed at their upper edge
+        sectors = -(-(np.arange(n_fine) + 1 + fine_start) // fine_width) - 1
+    else:
+        # Fine bins are closed at their lower edge
+        sectors = (np.arange(n_fine) + fine_start) // fine_width
+    return np.append((sectors % N_Sectors).astype(np.int32) + 1, np.int32(0))
+
+
+class ConfigSheet:
+    """The Config worksheet of a config file, with the cells holding the values of a dictionary by config key. Empty
+    cells have a None value, as in openpyxl."""
+
+    def __init__(self, settings):
+        """__init__ Initialises the ConfigSheet class.
+
+        Args:
+            settings (dict): Config values, by key of CONFIG_CELLS, STATUS_CELLS or SWEEP_CELLS.
+        """
+        self.cells = config_cell_values(settings)
+
+    def __getitem__(self, cell):
+        return SimpleNamespace(value=self.cells.get(cell))
+
+
+def config_cell_values(settings):
+    """config_cell_values Returns the cell values of config settings, as written in a config file: ON or OFF for the
+    data types and comma separated lists. Exits with a message for unknown settings.
+
+    Args:
+        settings (dict): Config values, by key of CONFIG_CELLS, STATUS_CELLS or SWEEP_CELLS. The sweeps are
+            dictionaries of {setting: list}, as in MetoceanData.config, e.g. {"wind_bin_size": [2, 3]}, and set every
+            cell of their sweep: the cells of the settings they leave out are emptied.
+
+    Returns:
+        [dict]: Dictionary of {cell: value}.
+    """
+    unknown = [
+        key
+        for key in settings
+        if key not in CONFIG_CELLS and key not in STATUS_CELLS and key not in SWEEP_CELLS
+    ]
+    unknown += [
+        f"{key} {setting}"
+        for key, sweep in settings.items()
+        if key in SWEEP_CELLS
+        for setting in sweep or {}
+        if setting not in SWEEP_CELLS[key]
+    ]
+    if unknown:
+        sys.exit(f"Unknown config settings {', '.join(unknown)}.")
+    cells = {}
+    for key, value in settings.items():
+        if key in STATUS_CELLS:
+            cells[STATUS_CELLS[key]] = "ON" if value else "OFF"
+        elif key in SWEEP_CELLS:
+            for setting, cell in SWEEP_CELLS[key].items():
+                cells[cell] = config_cell_value((value or {}).get(setting))
+        else:
+            cells[CONFIG_CELLS[key]] = config_cell_value(value)
+    return cells
+
+
+def config_cell_value(value):
+    """config_cell_value Returns the cell value of a config setting, with lists comma separated."""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    return value
+
+
+def ask_data_file(title):
+    """ask_data_file Asks the user for a data .txt file with a dialog.
+
+    Args:
+        title (str): Title of the dialog.
+
+    Returns:
+        [str]: Path of the selected file. Empty if the dialog is cancelled.
+    """
+    # Imported here, so that the module can be used where tkinter is not available
+    from tkinter import filedialog
+
+    return filedialog.askopenfilename(title=title, filetypes=[("Text Files", "*.txt")])
+
+
+def count_fields(df):
+    """count_fields Returns the number of fields of an input read with read_source, counting the YYYYMMDD and HHMM
+    fields of DataFrames with a DatetimeIndex."""
+    return len(df.columns) + (2 if isinstance(df.index, pd.DatetimeIndex) else 0)
+
+
+def code_dtype(n_codes):
+    """code_dtype Returns the smallest unsigned integer dtype holding the codes 0 to n_codes.
+
+    Args:
+        n_codes (int): Largest code.
+
+    Returns:
+        [numpy.dtype]: Integer dtype.
+    """
+    return np.min_scalar_type(int(n_codes))
 
 
-def make_time_index(df):
-    """make_time_index Creates a DateTime index for the dataframes read from the user input .txt files in the YYYY-MM-DD HH:MM format. Deletes the YYMMDD and HHMM string columns.
+def parse_list(value):
+    """parse_list Parses a config cell holding either a single number or a comma separated list of numbers.
 
     Args:
-        df (pandas.Dataframe): [Timeseries DataFrame input by user. Can be wind, wave, current or seawater dataframe.]
+        value (scalar or string): Value of the config cell.
 
     Returns:
-        [pandas.DataFrame]: [Returns the input dataframe with the DateTime index.]
+        [list]: List of floats. Empty if the cell is empty.
     """
-    df.iloc[:, 0] = pd.to_datetime(df.iloc[:, 0], format="%Y%m%d")
-    df.iloc[:, 1] = pd.to_timedelta(df.iloc[:, 1] / 100, unit="hours")
-    df.index = df.iloc[:, 0] + df.iloc[:, 1]
-    df.drop(columns=[0, 1], inplace=True)
-    return df
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [float(x) for x in value.replace(";", ",").split(",") if x.strip()]
+    return [float(value)]
 
 
 def gamma_DNVGL(x):
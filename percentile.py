@@ -0,0 +1,171 @@
+"""
+Module for the Percentile class
+Metocean & Energy Assessment Department
+"""
+
+import numpy as np
+
+from metocean_data import SECTOR_GROUPS
+
+
+class Percentile:
+    """Class to represent a conditional percentile table, e.g. P50/P90/P99 Tp per Hs bin."""
+
+    def __init__(self, met_data, variables, percentiles, key=False):
+        """__init__ Initialises the Percentile class and calculates the percentiles of a variable within every
+        bin of another, omnidirectional and per direction sector.
+
+        The data are sorted once by (sector, bin, value) with np.lexsort. Every group is then a contiguous
+        slice of the sorted values, so all the percentiles of all the groups are read from the group offsets
+        with linear interpolation, as np.percentile does.
+
+        Args:
+            met_data (MetoceanData): MetoceanData object to extract statistics from.
+            variables (list): List of strings. Each string must correspond to a key of the met_data dataframe.
+                First the variable to take the percentiles of (e.g. "Tp"), second the "_bins" variable to condition on (e.g. "Hs_bins").
+            percentiles (list): List of percentiles to calculate, between 0 and 100.
+            key (str, optional): "_sectors" key of the met_data dataframe to split the tables by. Defaults to False (omnidirectional only).
+        """
+        self.var = variables[0]  # Key for the variable to take the percentiles of
+        self.bin_var = variables[1]  # Key for the conditioning bin variable
+        self.key = key  # Key for the sector variable
+        self.percentiles = np.asarray(percentiles, dtype=float)
+        self.bin_type = met_data.config["bin_type"]
+        self.bins = met_data.bins[self.bin_var.replace("_bins", "")]
+
+        values = met_data.data[self.var].to_numpy(float)
+        # Bin codes, matching the bin centres the same way as the Scatter class
+        bin_values = met_data.data[self.bin_var].to_numpy(float)
+        stored_bins = met_data.encode(self.bin_var, self.bins)
+        bin_code = np.searchsorted(stored_bins, bin_values)
+        bin_code = np.minimum(bin_code, len(self.bins) - 1)
+        valid = ~np.isnan(values) & (stored_bins[bin_code] == bin_values)
+
+        if self.key:
+            setting = [
+                s for s, headers in SECTOR_GROUPS.items()
+                if self.key.replace("_sectors", "") in headers
+            ][0]
+            self.sectors = np.arange(met_data.config[setting]) + 1
+            sector = met_data.sector_numbers(self.key)[valid]
+            # Every record belongs to the omnidirectional group 0 and to its sector. Sector 0 has no direction.
+            directional = sector > 0
+            group = np.concatenate([np.zeros(len(sector), dtype=np.int64), sector[directional]])
+            bin_code = np.concatenate([bin_code[valid], bin_code[valid][directional]])
+            values = np.concatenate([values[valid], values[valid][directional]])
+        else:
+            self.sectors = np.array([], dtype=np.int64)
+            group = np.zeros(np.count_nonzero(valid), dtype=np.int64)
+            bin_code = bin_code[valid]
+            values = values[valid]
+
+        n_groups = len(self.sectors) + 1
+        n_bins = len(self.bins)
+        order = np.lexsort((values, bin_code, group))
+        sorted_values = values[order]
+        # Flat group number of every (sector, bin) combination
+        flat = group * n_bins + bin_code
+        self.counts = np.bincount(flat, minlength=n_groups * n_bins)
+        offsets = np.concatenate([[0], np.cumsum(self.counts)[:-1]])
+
+        # Position of every percentile within every group [group, percentile]
+        position = (self.counts[:, None] - 1) * self.percentiles[None, :] / 100
+        lower = np.floor(position).astype(np.int64)
+        fraction = position - lower
+        upper = np.minimum(lower + 1, self.counts[:, None] - 1)
+        empty = self.counts == 0
+        if len(sorted_values):
+            # Empty groups point at an arbitrary value and are set to NaN afterwards
+            last = len(sorted_values) - 1
+            low_value = sorted_values[np.clip(offsets[:, None] + lower, 0, last)]
+            high_value = sorted_values[np.clip(offsets[:, None] + upper, 0, last)]
+            table = low_value + (high_value - low_value) * fraction
+        else:
+            table = np.zeros(position.shape)
+        table[empty] = np.nan
+        self.table = table.reshape(n_groups, n_bins, len(self.percentiles))
+        self.counts = self.counts.reshape(n_groups, n_bins)
+
+        print(f"Percentile table {self.var} per {self.bin_var} complete!")
+
+    def print_table(self, workbook, worksheet, row=0, col=0):
+        """print_table Function to print the percentile tables into an excel sheet. The omnidirectional table is
+        printed first, followed by one table per sector to its right.
+
+        Args:
+            workbook (xlsxwriter.Workbook): xlsxwriter library Workbook class. Excel workbook at which to print the tables.
+            worksheet (xlsxwriter.Worksheet): xlsxwriter library worksheet class. Excel sheet at which to print the tables.
+            row (int, optional): Zero-indexed row number in the excel sheet to place the tables. Refers to the upper-left. Defaults to 0.
+            col (int, optional): Zero-indexed column number in the excel sheet to place the tables. Refers to the upper-left. Defaults to 0.
+        """
+        header_format = workbook.add_format(
+            {
+                "bold": True,
+                "border": 2,
+                "font_color": "#FFFFFF",
+                "bg_color": "072B31",
+                "align": "center",
+            }
+        )
+        index_format = workbook.add_format(
+            {"border": 1, "bold": True, "align": "center", "bg_color": "D9D9D6"}
+        )
+        bounds_format = workbook.add_format(
+            {"border": 1, "align": "center", "bg_color": "D9D9D6"}
+        )
+        data_format = workbook.add_format(
+            {"border": 1, "align": "center", "num_format": "0.00"}
+        )
+        count_format = workbook.add_format({"border": 1, "align": "center"})
+
+        if self.bin_type == "left":
+            bound_headers = ["Lower (>=)", "Upper (<)"]
+        else:
+            bound_headers = ["Lower (>)", "Upper (<=)"]
+        headers = (
+            bound_headers
+            + [f"P{p:g} {self.var}" for p in self.percentiles]
+            + ["Count"]
+        )
+        step = 2 * self.bins[0]
+        width = len(headers)
+
+        for g in range(self.table.shape[0]):
+            start_col = col + g * (width + 1)
+            if g == 0:
+                title = f"{self.var} per {self.bin_var}. OMNI."
+            else:
+                title = f"{self.var} per {self.bin_var}. {self.key} = {self.sectors[g - 1]}."
+            worksheet.merge_range(
+                row, start_col, row, start_col + width - 1, title, header_format
+            )
+            for c, header in enumerate(headers):
+                worksheet.write_string(row + 1, start_col + c, header, index_format)
+            for b, centre in enumerate(self.bins):
+                r = row + 2 + b
+                worksheet.write_number(r, start_col, centre - step / 2, bounds_format)
+                worksheet.write_number(r, start_col + 1, centre + step / 2, bounds_format)
+                for p, value in enumerate(self.table[g, b]):
+                    if np.isnan(value):
+                        worksheet.write_string(r, start_col + 2 + p, "NaN", data_format)
+                    else:
+                        worksheet.write_number(r, start_col + 2 + p, value, data_format)
+                worksheet.write_number(
+                    r, start_col + width - 1, self.counts[g, b], count_format
+                )
+            worksheet.conditional_format(
+                row + 2,
+                start_col + 2,
+                row + 1 + len(self.bins),
+                start_col + width - 2,
+                {
+                    "type": "3_color_scale",
+                    "min_color": "#63BE7B",
+                    "mid_color": "#FFEB84",
+                    "max_color": "#F8696B",
+                    "min_type": "min",
+                    "mid_type": "percentile",
+                    "mid_value": 50,
+                    "max_type": "max",
+                },
+            )
@@ -0,0 +1,270 @@
+"""
+Module for the Persistence class
+Metocean & Energy Assessment Department
+"""
+
+import itertools
+
+import numpy as np
+
+MONTHS = [
+    "Jan",
+    "Feb",
+    "Mar",
+    "Apr",
+    "May",
+    "Jun",
+    "Jul",
+    "Aug",
+    "Sep",
+    "Oct",
+    "Nov",
+    "Dec",
+]
+
+VAR_TITLES = {
+    "WS": "WS @ HH [m/s]",
+    "WS_10": "WS @ 10m [m/s]",
+    "Hs": "Hs [m]",
+    "Hs_W": "Hs Windsea [m]",
+    "Hs_S": "Hs Swell [m]",
+    "Tp": "Tp [s]",
+    "SV": "Srfc Current [m/s]",
+    "DaV": "DpthAvg Current [m/s]",
+}
+
+
+class Persistence:
+    """Class to represent a weather window (persistence) analysis."""
+
+    def __init__(self, met_data, limits, durations):
+        """__init__ Initialises the Persistence class and computes the weather window statistics.
+
+        A weather window is an uninterrupted run of records where every variable in limits is strictly
+        below its threshold. Runs are split wherever the timeseries has a gap longer than its time step.
+        Each window is counted, with its whole duration, in the calendar month in which it starts, while
+        its hours are split across the calendar months it spans for the time availability.
+
+        Args:
+            met_data (MetoceanData): MetoceanData object to extract statistics from.
+            limits (dict): Dictionary of {column: list of thresholds}. Each key must correspond to a key of the
+                met_data dataframe. Every combination of thresholds is evaluated.
+            durations (list): List of minimum window durations in hours.
+        """
+        self.variables = list(limits.keys())
+        self.limits = [np.sort(np.asarray(limits[var], dtype=float)) for var in limits]
+        self.durations = np.sort(np.asarray(durations, dtype=float))
+        # Every combination of thresholds, one row per combination
+        self.grid = np.array(list(itertools.product(*self.limits)))
+
+        index = met_data.data.index
+        self.time_step = get_time_step(index)
+        step_hours = self.time_step / np.timedelta64(1, "h")
+        # gap[i] is True if record i does not directly follow record i - 1
+        gap = np.ones(len(index), dtype=bool)
+        gap[1:] = np.diff(index.values) != self.time_step
+
+        # Boolean matrix of workable records [combination, record]
+        values = np.stack([met_data.data[var].to_numpy(float) for var in self.variables])
+        # Thresholds rounded to the precision of the data, so that float32 data compare as they were read
+        grid = np.stack(
+            [
+                self.grid[:, v].astype(met_data.data[var].dtype).astype(float)
+                for v, var in enumerate(self.variables)
+            ],
+            axis=1,
+        )
+        ok = np.all(values[None, :, :] < grid[:, :, None], axis=1)
+
+        starts, ends = run_bounds(ok, gap)
+        combination = starts[0]
+        length = (ends[1] - starts[1] + 1) * step_hours
+        month = index.month.to_numpy()[starts[1]] - 1
+
+        # Runs meeting each minimum duration [run, duration]
+        run_idx, dur_idx = np.nonzero(length[:, None] >= self.durations[None, :])
+        key = (combination[run_idx] * len(self.durations) + dur_idx) * 12 + month[run_idx]
+        shape = (len(self.grid), len(self.durations), 12)
+        size = int(np.prod(shape))
+        counts = np.bincount(key, minlength=size).reshape(shape)
+        hours = np.bincount(key, weights=length[run_idx], minlength=size).reshape(shape)
+        # Hours of the windows within every calendar month, so that windows over the turn of a month count in both
+        month_number = (index.year * 12 + index.month - 1).to_numpy()
+        part, part_month, records = split_by_month(
+            starts[1][run_idx], ends[1][run_idx], month_number
+        )
+        part_key = (combination[run_idx][part] * len(self.durations) + dur_idx[part]) * 12 + part_month
+        month_window_hours = np.bincount(
+            part_key, weights=records * step_hours, minlength=size
+        ).reshape(shape)
+
+        # Number of each calendar month in the record, used to express results per month
+        periods = index.to_period("M").unique()
+        month_count = np.bincount(periods.month - 1, minlength=12)
+        month_hours = np.bincount(index.month - 1, minlength=12) * step_hours
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Mean number of windows per month
+            self.windows = np.where(month_count > 0, counts / month_count, np.nan)
+            # Mean duration of the windows, in hours
+            self.mean_duration = np.where(counts > 0, hours / counts, np.nan)
+            # Fraction of the time within windows of at least the required duration
+            self.availability = np.where(month_hours > 0, month_window_hours / month_hours, np.nan)
+        print(
+            f"Persistence analysis of {len(self.grid)} threshold combinations and {len(self.durations)} durations complete!"
+        )
+
+    def print_table(self, workbook, worksheet, row=0, col=0):
+        """print_table Function to print the weather window tables into an excel sheet. One block of tables
+        is printed per minimum duration, each block holding the number of windows, their mean duration and
+        the time availability per month.
+
+        Args:
+            workbook (xlsxwriter.Workbook): xlsxwriter library Workbook class. Excel workbook at which to print the tables.
+            worksheet (xlsxwriter.Worksheet): xlsxwriter library worksheet class. Excel sheet at which to print the tables.
+            row (int, optional): Zero-indexed row number in the excel sheet to place the tables. Refers to the upper-left. Defaults to 0.
+            col (int, optional): Zero-indexed column number in the excel sheet to place the tables. Refers to the upper-left. Defaults to 0.
+        """
+        header_format = workbook.add_format(
+            {
+                "bold": True,
+                "border": 2,
+                "font_color": "#FFFFFF",
+                "bg_color": "072B31",
+                "align": "center",
+            }
+        )
+        index_format = workbook.add_format(
+            {"border": 1, "bold": True, "align": "center", "bg_color": "D9D9D6"}
+        )
+        formats = {
+            "windows": workbook.add_format(
+                {"border": 1, "align": "center", "num_format": "0.00"}
+            ),
+            "mean_duration": workbook.add_format(
+                {"border": 1, "align": "center", "num_format": "0.0"}
+            ),
+            "availability": workbook.add_format(
+                {"border": 1, "align": "center", "num_format": "0.00%"}
+            ),
+        }
+        titles = {
+            "windows": "Mean number of windows per month",
+            "mean_duration": "Mean window duration [h]",
+            "availability": "Time within windows [%]",
+        }
+        n_var = len(self.variables)
+        width = n_var + len(MONTHS)
+        worksheet.set_column(col, col + n_var - 1, 16)
+
+        for d, duration in enumerate(self.durations):
+            for t, stat in enumerate(["windows", "mean_duration", "availability"]):
+                start_col = col + t * (width + 1)
+                worksheet.merge_range(
+                    row,
+                    start_col,
+                    row,
+                    start_col + width - 1,
+                    f"{titles[stat]}. Duration >= {duration:g} h.",
+                    header_format,
+                )
+                for v, var in enumerate(self.variables):
+                    worksheet.write_string(
+                        row + 1, start_col + v, f"{VAR_TITLES.get(var, var)} <", index_format
+                    )
+                for m, month in enumerate(MONTHS):
+                    worksheet.write_string(
+                        row + 1, start_col + n_var + m, month, index_format
+                    )
+                data = getattr(self, stat)[:, d, :]
+                for i, limits in enumerate(self.grid):
+                    for v, limit in enumerate(limits):
+                        worksheet.write_number(
+                            row + 2 + i, start_col + v, limit, index_format
+                        )
+                    for m, value in enumerate(data[i]):
+                        if np.isnan(value):
+                            worksheet.write_string(
+                                row + 2 + i, start_col + n_var + m, "NaN", formats[stat]
+                            )
+                        else:
+                            worksheet.write_number(
+                                row + 2 + i, start_col + n_var + m, value, formats[stat]
+                            )
+                worksheet.conditional_format(
+                    row + 2,
+                    start_col + n_var,
+                    row + 1 + len(self.grid),
+                    start_col + width - 1,
+                    {
+                        "type": "3_color_scale",
+                        "min_color": "#F8696B",
+                        "mid_color": "#FFEB84",
+                        "max_color": "#63BE7B",
+                        "min_type": "min",
+                        "mid_type": "percentile",
+                        "mid_value": 50,
+                        "max_type": "max",
+                    },
+                )
+            row += len(self.grid) + 4
+        worksheet.write_string(
+            row,
+            col,
+            "Windows are counted in the month they start in. Their hours are split across the months they span for the time within windows.",
+        )
+
+
+def get_time_step(index):
+    """get_time_step Returns the nominal time step of a DatetimeIndex, taken as its most common spacing.
+
+    Args:
+        index (pandas.DatetimeIndex): Time index of the metocean timeseries.
+
+    Returns:
+        [numpy.timedelta64]: Nominal time step of the timeseries.
+    """
+    steps, counts = np.unique(np.diff(index.values), return_counts=True)
+    return steps[np.argmax(counts)]
+
+
+def split_by_month(starts, ends, month_number):
+    """split_by_month Splits runs of records into their parts within every calendar month.
+
+    Args:
+        starts (numpy.ndarray): First record of every run.
+        ends (numpy.ndarray): Last record of every run.
+        month_number (numpy.ndarray): Calendar month of every record, as year * 12 + month - 1. Increasing.
+
+    Returns:
+        [tuple]: Tuple of (run, month, records) arrays with one item per part: the position of its run in starts,
+            its zero-indexed month of the year and its number of records.
+    """
+    first_month = month_number[starts]
+    span = month_number[ends] - first_month + 1
+    run = np.repeat(np.arange(len(starts)), span)
+    # Calendar month of every part, from the month of the first record of its run
+    month = first_month[run] + np.arange(len(run)) - np.repeat(np.cumsum(span) - span, span)
+    first = np.searchsorted(month_number, month, side="left")
+    last = np.searchsorted(month_number, month, side="right") - 1
+    records = np.minimum(ends[run], last) - np.maximum(starts[run], first) + 1
+    return run, month % 12, records
+
+
+def run_bounds(ok, gap):
+    """run_bounds Run-length encodes every row of a boolean matrix at once.
+
+    Args:
+        ok (numpy.ndarray): 2D boolean array [row, record]. True where the record is workable.
+        gap (numpy.ndarray): 1D boolean array [record]. True where a record does not follow on from the previous one.
+
+    Returns:
+        [tuple]: Tuple of (row, record) index arrays for the first and last record of every run,
+            as returned by numpy.nonzero. Starts and ends are paired in the same order.
+    """
+    follows = ~gap
+    prev_ok = np.zeros_like(ok)
+    prev_ok[:, 1:] = ok[:, :-1] & follows[None, 1:]
+    next_ok = np.zeros_like(ok)
+    next_ok[:, :-1] = ok[:, 1:] & follows[None, 1:]
+    return np.nonzero(ok & ~prev_ok), np.nonzero(ok & ~next_ok)
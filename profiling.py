@@ -0,0 +1,164 @@
+"""
+Module for the Profiler class
+Metocean & Energy Assessment Department
+
+Records nested timing spans of the processing stages (wall time, CPU time, row counts and peak memory),
+optionally with a cProfile dump per stage, and writes them to a machine-readable run summary.
+"""
+
+import contextlib
+import cProfile
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class Profiler:
+    """Class to record nested timing spans of the processing stages."""
+
+    def __init__(self, profile_stages=None, profile_dir="."):
+        """__init__ Initialises an empty Profiler.
+
+        Args:
+            profile_stages (list, optional): Names of the stages to dump a cProfile .prof file for, or ["all"] for
+                every top-level stage. Defaults to None (no cProfile dumps).
+            profile_dir (str, optional): Folder to write the .prof files to. Defaults to the working directory.
+        """
+        self.profile_stages = profile_stages or []
+        self.profile_dir = profile_dir
+        # Top-level spans. Every span is a dictionary with its nested spans under "children".
+        self.spans = []
+        self._stack = []
+        self._profiling = False
+
+    @contextlib.contextmanager
+    def span(self, name, rows=None):
+        """span Context manager recording the wall time, CPU time and peak memory of the code within it.
+        Spans opened within another span are nested in it. The row count can be set on the yielded span
+        when it is only known at the end, e.g. span["rows"] = len(df).
+
+        Args:
+            name (str): Name of the stage.
+            rows (int, optional): Number of data rows processed by the stage. Defaults to None.
+
+        Yields:
+            [dict]: The span record.
+        """
+        record = {"name": name, "rows": rows, "children": []}
+        (self._stack[-1]["children"] if self._stack else self.spans).append(record)
+        self._stack.append(record)
+
+        # cProfile cannot be nested, so stages within a profiled stage are covered by its dump
+        profile = None
+        if not self._profiling and (
+            name in self.profile_stages
+            or ("all" in self.profile_stages and len(self._stack) == 1)
+        ):
+            profile = cProfile.Profile()
+            self._profiling = True
+            profile.enable()
+
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_time"] = time.perf_counter() - wall
+            record["cpu_time"] = time.process_time() - cpu
+            record["peak_rss_mb"] = peak_rss_mb()
+            if profile is not None:
+                profile.disable()
+                self._profiling = False
+                record["profile"] = os.path.join(
+                    self.profile_dir, f"{safe_name(self.path(record))}.prof"
+                )
+                profile.dump_stats(record["profile"])
+            self._stack.pop()
+
+    def path(self, record):
+        """path Returns the '/' separated names of the open spans down to record."""
+        names = [s["name"] for s in self._stack]
+        if self._stack and self._stack[-1] is record:
+            return "/".join(names)
+        return "/".join(names + [record["name"]])
+
+    def flatten(self):
+        """flatten Returns the wall time of every span keyed by its '/' separated path. Spans with the same
+        path, e.g. the same stage run in several reports, are added up.
+
+        Returns:
+            [dict]: Dictionary of {path: wall time in seconds}.
+        """
+        times = {}
+
+        def visit(spans, prefix):
+            for record in spans:
+                path = prefix + record["name"]
+                times[path] = times.get(path, 0) + record.get("wall_time", 0)
+                visit(record["children"], path + "/")
+
+        visit(self.spans, "")
+        return times
+
+    def print_summary(self, max_depth=2):
+        """print_summary Prints the wall time, CPU time and rows of the spans as an indented table.
+
+        Args:
+            max_depth (int, optional): Number of nesting levels to print. Defaults to 2.
+        """
+        print(f"{'Stage':<60}{'Wall [s]':>10}{'CPU [s]':>10}{'Rows':>12}{'RSS [MB]':>10}")
+
+        def visit(spans, depth):
+            for record in spans:
+                rows = "" if record["rows"] is None else record["rows"]
+                print(
+                    f"{'  ' * depth + record['name']:<60}"
+                    f"{record.get('wall_time', 0):>10.2f}"
+                    f"{record.get('cpu_time', 0):>10.2f}"
+                    f"{rows:>12}"
+                    f"{record.get('peak_rss_mb') or 0:>10.0f}"
+                )
+                if depth + 1 < max_depth:
+                    visit(record["children"], depth + 1)
+
+        visit(self.spans, 0)
+
+    def write_summary(self, filepath, **info):
+        """write_summary Writes the spans to a JSON run summary.
+
+        Args:
+            filepath (str): Path of the .json file to write.
+            **info: Additional run information to store, e.g. the project name.
+        """
+        summary = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            **info,
+            "total_wall_time": sum(s.get("wall_time", 0) for s in self.spans),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.spans,
+        }
+        with open(filepath, "w") as f:
+            json.dump(summary, f, indent=2, default=str)
+
+
+def peak_rss_mb():
+    """peak_rss_mb Returns the peak resident memory of the process in MB, or None where it is not available."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    if sys.platform == "darwin":
+        return peak / 1024 ** 2
+    return peak / 1024
+
+
+def safe_name(name):
+    """safe_name Returns name with the characters not allowed in file names replaced by underscores."""
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
@@ -0,0 +1,100 @@
+"""
+Module for the Progress class
+Metocean & Energy Assessment Department
+"""
+
+import sys
+import threading
+import time
+
+
+class Progress:
+    """Class to report the progress of a long calculation on a single, throttled status line."""
+
+    def __init__(self, total, desc="", unit="tables", min_interval=0.5, stream=None):
+        """__init__ Initialises the Progress class.
+
+        Work is counted in units (e.g. tables) that may be completed in fractions (e.g. one table row at a
+        time). The status line is redrawn at most every min_interval seconds, so updating is cheap enough to
+        call from inner loops. When the stream is not a terminal (log files, schedulers) a new line is printed
+        every 30 seconds instead of redrawing.
+
+        Args:
+            total (float): Total number of work units.
+            desc (str, optional): Description printed at the start of the status line. Defaults to "".
+            unit (str, optional): Name of the work units. Defaults to "tables".
+            min_interval (float, optional): Minimum time between redraws in seconds. Defaults to 0.5.
+            stream (file, optional): Stream to print to. Defaults to sys.stderr.
+        """
+        self.total = total
+        self.desc = desc
+        self.unit = unit
+        self.stream = stream or sys.stderr
+        self.interactive = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self.min_interval = min_interval if self.interactive else max(min_interval, 30)
+        self.done = 0.0
+        self.start = time.perf_counter()
+        self.last_print = self.start
+        # Updates may come from worker threads
+        self.lock = threading.Lock()
+
+    def update(self, n=1):
+        """update Adds n completed work units and redraws the status line if the throttle interval has passed.
+        Work completed in other processes is reported by calling update from the parent with their counts.
+
+        Args:
+            n (float, optional): Number of completed work units. Defaults to 1.
+        """
+        with self.lock:
+            self.done += n
+            now = time.perf_counter()
+            if now - self.last_print >= self.min_interval:
+                self.last_print = now
+                self.print_status(now)
+
+    def add_total(self, n):
+        """add_total Adds n work units to the total, for work only known once the calculation is running."""
+        with self.lock:
+            self.total += n
+
+    def close(self):
+        """close Prints the final status line."""
+        with self.lock:
+            self.print_status(time.perf_counter())
+            if self.interactive:
+                self.stream.write("\n")
+            self.stream.flush()
+
+    def print_status(self, now):
+        """print_status Prints the status line with the completed fraction, rate and estimated time remaining."""
+        elapsed = now - self.start
+        fraction = min(self.done / self.total, 1) if self.total else 1
+        if 0 < fraction < 1:
+            eta = format_time(elapsed * (1 - fraction) / fraction)
+        else:
+            eta = "--:--"
+        rate = self.done / elapsed if elapsed > 0 else 0
+        line = (
+            f"{self.desc}: {fraction:6.1%} | {self.done:.0f}/{self.total:.0f} {self.unit} "
+            f"| {format_time(elapsed)} elapsed | ETA {eta} | {rate:.1f} {self.unit}/s"
+        )
+        if self.interactive:
+            self.stream.write("\r" + line.ljust(100))
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def format_time(seconds):
+    """format_time Returns a duration in seconds as H:MM:SS or MM:SS."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
@@ -0,0 +1,658 @@
+"""
+Golden-output regression harness for the Metocean Processing Tool
+Metocean & Energy Assessment Department
+
+Records golden outputs with a port of the original implementation of the tool: the np.digitize bins and centred
+sectors of the first MetoceanData.get_bins and get_sectors, the cell by cell counting of the first Scatter class and
+the per wind speed bin means and medians of the first NSS.calc_table. They are stored as canonical .npz files: the
+timestamps, the bin centres, the bin or sector of every record, every scatter table of the report and the NSS tables.
+The engines of the tool, the default one included, are then run on the same inputs and compared with them cell by
+cell, within a tolerance and with NaN (empty) cells matching exactly, so that performance work can land without
+changing the numbers of the original tool.
+
+The sweep engines re-sectorise the data from other sector counts and re-bin the scatter tables from half the bin
+sizes of the dataset, as the sector and bin size sweeps of the report do, and must give the tables of the dataset.
+The after_sector_sweep engine prints a sector sweep of the report first, which must leave the dataset as it was.
+
+The synthetic datasets cover left and right closed bins, values on the bin and sector edges, directions of 360 deg,
+missing directions, sectors rotated by an offset and empty cells (see synthetic.move_to_edges). Their input files
+are stored next to the outputs, so that the golden outputs do not change with the synthetic module. Recorded
+datasets are referenced by the paths of their config and data files.
+
+Usage:
+    python regression.py record --golden golden
+    python regression.py record --golden golden --dataset hindcast config.xlsx wind=wind.txt wave=wave.txt
+    python regression.py compare --golden golden --engines numba polars compact
+"""
+
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+import kernels
+from benchmark import get_versions
+from metocean_data import CONFIG_CELLS, SECTOR_GROUPS, STATUS_CELLS, SWEEP_CELLS, MetoceanData
+from NSS import NSS
+from progress import Progress
+from scatter_report import (
+    BIN_SIZE_GROUPS,
+    TableFactory,
+    count_tables,
+    get_report_plan,
+    make_sheet_tables,
+    print_sector_sweep,
+)
+from synthetic import update_config, write_synthetic_inputs
+
+# Config of every run, over the config file of every dataset: the default engine of the tool, without sweeps
+REFERENCE = {
+    "dataframe_backend": "pandas",
+    "compact_layout": False,
+    "categorical_columns": False,
+    "median_sketch_error": None,
+    "nss_workers": 0,
+    "bin_size_sweep": None,
+    "sector_sweep": None,
+    # Formatting of the NSS report, which is not compared
+    "report_profile": "fast",
+}
+
+# Engines compared with the golden outputs: config values over REFERENCE, kernels backend, the package they need, the
+# relative tolerance they are compared with, if looser than the one of the comparison, the sweep they run, the report
+# sweep they print before, and the outputs they give, if not all of them
+ENGINES = {
+    "default": {},
+    "numba": {"kernels": "numba", "requires": "numba"},
+    "polars": {"config": {"dataframe_backend": "polars"}, "requires": "polars"},
+    # float32 measurements, so the NSS statistics are exact to float32 precision only
+    "compact": {"config": {"compact_layout": True}, "rtol": 1e-6},
+    "categorical": {"config": {"categorical_columns": True}},
+    "nss_workers": {"config": {"nss_workers": 2}},
+    "sector_sweep": {"sweep": "sector_sweep"},
+    # The sector sweep of the report must restore the sectors of the dataset for the rest of the run
+    "after_sector_sweep": {"sweep": "sector_sweep", "report": "sector_sweep"},
+    # The records are binned at half the bin sizes, so only the re-binned scatter tables are compared
+    "bin_size_sweep": {"sweep": "bin_size_sweep", "outputs": ["index", "bins/", "scatter/"]},
+}
+
+# Synthetic datasets, as write_synthetic_inputs arguments
+SYNTHETIC_DATASETS = {
+    "left": {"bin_type": "left", "method": "median", "peak_enhancement": True},
+    "right": {"bin_type": "right", "method": "mean", "peak_enhancement": True},
+    "edges_left": {
+        "bin_type": "left",
+        "method": "median",
+        "edges": 0.2,
+        "derive_peak_enhancement": True,
+        "current_components": True,
+    },
+    "edges_right": {
+        "bin_type": "right",
+        "method": "mean",
+        "edges": 0.2,
+        "derive_peak_enhancement": True,
+        "current_components": True,
+        "wind_sectors": 16,
+        "wave_sectors": 8,
+    },
+    # Sectors rotated by the offset of the config file, with missing directions in every direction variable
+    "offset": {
+        "bin_type": "left",
+        "method": "median",
+        "edges": 0.2,
+        "current_components": True,
+        "wave_sectors": 16,
+        "sector_offset": 7.5,
+    },
+}
+
+DATA_KINDS = ["wind", "wave", "current", "water"]
+
+
+def run_engine(config_file, data_files, engine="default", workdir="."):
+    """run_engine Runs an engine on a dataset and returns the outputs compared by the harness.
+
+    Args:
+        config_file (str): Path of the config file of the dataset.
+        data_files (dict): Dictionary of {"wind", "wave", "current" or "water": data file path}.
+        engine (str, optional): Engine, one of ENGINES. Defaults to "default".
+        workdir (str, optional): Folder for the modified config file and the reports. Defaults to ".".
+
+    Returns:
+        [dict]: Dictionary of {name: numpy array}. See get_outputs.
+    """
+    settings = ENGINES[engine]
+    config = {**REFERENCE, **settings.get("config", {})}
+    if settings.get("sweep"):
+        config.update(
+            sweep_config(settings["sweep"], read_config_values(config_file), bool(settings.get("report")))
+        )
+    config_file = update_config(config_file, config, os.path.join(workdir, f"config_{engine}.xlsx"))
+    default = kernels.BACKEND
+    kernels.BACKEND = settings.get("kernels", "numpy")
+    cwd = os.getcwd()
+    try:
+        metocean_data = MetoceanData(config_file, dict(data_files), dialogs=False)
+        # The NSS report is written to the working directory
+        os.chdir(workdir)
+        if settings.get("report") == "sector_sweep":
+            print_sector_sweep(metocean_data)
+        outputs = get_outputs(metocean_data, sweeps=not settings.get("report"))
+    finally:
+        os.chdir(cwd)
+        kernels.BACKEND = default
+    return outputs
+
+
+def sweep_config(sweep, values, report=False):
+    """sweep_config Returns the config values of a sweep engine: the sweep gives the sector counts or bin sizes of the
+    dataset from other ones.
+
+    Args:
+        sweep (str): "sector_sweep", from 4 sectors (8 for datasets of 4 sectors), or "bin_size_sweep", from half the
+            bin sizes.
+        values (dict): Config values of the dataset, as returned by read_config_values.
+        report (bool, optional): Keep the sector counts or bin sizes of the dataset in the config and sweep the
+            other ones instead, for engines that print the report sweep before the outputs. Defaults to False.
+
+    Returns:
+        [dict]: Config values, by key of CONFIG_CELLS and SWEEP_CELLS.
+    """
+    config = {sweep: {}}
+    for setting in SWEEP_CELLS[sweep]:
+        value = values.get(setting)
+        if not value:
+            continue
+        if sweep == "sector_sweep":
+            other = 4 if value != 4 else 8
+        else:
+            other = value / 2
+        if report:
+            config[sweep][setting] = [other]
+        else:
+            config[setting] = other
+            config[sweep][setting] = [value]
+    return config
+
+
+def read_config_values(config_file):
+    """read_config_values Returns the values of the cells of a config file, by config key (see CONFIG_CELLS)."""
+    config_sheet = load_workbook(config_file, read_only=True)["Config"]
+    values = {key: config_sheet[cell].value for key, cell in CONFIG_CELLS.items()}
+    values.update({key: config_sheet[cell].value == "ON" for key, cell in STATUS_CELLS.items()})
+    return values
+
+
+def get_outputs(metocean_data, sweeps=True):
+    """get_outputs Calculates the scatter and NSS tables of a MetoceanData object, with the first variant of the sector
+    and bin size sweeps of its config, as the sweeps of the report do.
+
+    Args:
+        metocean_data (MetoceanData): A MetoceanData object from the metocean_data module.
+        sweeps (bool, optional): Use the first variant of the sweeps of the config, or the sectors and bin sizes of
+            the config file. Defaults to True.
+
+    Returns:
+        [dict]: Dictionary of {name: numpy array} with the timestamps ("index"), the bin centres ("bins/<variable>"),
+            the bin centre or sector of every record of every "_bins" and "_sectors" column, rounded to 4 decimals and
+            NaN outside the bins and sectors ("values/<column>"), the dense scatter tables of the report, with NaN for
+            empty cells ("scatter/<sheet>/<table>"), and the NSS tables ("nss/<sea>"). Re-binned reports only give
+            the timestamps, their bin centres and their scatter tables.
+    """
+    config = metocean_data.config
+    if config["sector_sweep"] and sweeps:
+        metocean_data.resectorise(
+            {setting: counts[0] for setting, counts in config["sector_sweep"].items()},
+            config["sector_offset"],
+        )
+    bin_sizes = {}
+    if sweeps:
+        bin_sizes = {setting: sizes[0] for setting, sizes in config["bin_size_sweep"].items()}
+    factory = TableFactory(metocean_data, bin_sizes)
+    outputs = {"index": metocean_data.data.index.asi8}
+    for header, centres in factory.bins.items():
+        outputs[f"bins/{header}"] = np.asarray(centres)
+    if not bin_sizes:
+        for column in metocean_data.data.columns:
+            if column.endswith("_bins") or column.endswith("_sectors"):
+                codes = metocean_data.get_codes(column)
+                categories = np.asarray(metocean_data.get_categories(column), dtype=float).round(4)
+                outputs[f"values/{column}"] = np.where(codes >= 0, categories[codes], np.nan)
+
+    if config["scatter_report"]:
+        plan = [
+            sheet
+            for sheet in get_report_plan(metocean_data, factory.bins)
+            if sheet[1] in ["row", "grid"]
+        ]
+        with Progress(count_tables(plan), "Scatter tables") as progress:
+            factory.progress = progress
+            for sheet in plan:
+                tables = make_sheet_tables(metocean_data, sheet, factory)
+                if sheet[1] == "grid":
+                    tables = [table for row in tables for table in row]
+                for i, table in enumerate(tables):
+                    outputs[f"scatter/{sheet[0]}/{i}"] = table.table
+
+    if config["nss_report"] and config["wind_status"] and config["wave_status"] and not bin_sizes:
+        nss = NSS(metocean_data)
+        outputs["nss/Total"] = nss.Total_tables
+        if nss.wave_spectral:
+            outputs["nss/Wind"] = nss.Wind_tables
+            outputs["nss/Swell"] = nss.Swell_tables
+    return outputs
+
+
+def golden_outputs(config_file, data_files, workdir="."):
+    """golden_outputs Runs the port of the original implementation of the tool on a dataset. The data is read by
+    MetoceanData, and binned, sectorised, counted and aggregated as in the original tool.
+
+    Args:
+        config_file (str): Path of the config file of the dataset.
+        data_files (dict): Dictionary of {"wind", "wave", "current" or "water": data file path}.
+        workdir (str, optional): Folder for the modified config file. Defaults to ".".
+
+    Returns:
+        [dict]: Dictionary of {name: numpy array}, as returned by get_outputs.
+    """
+    config_file = update_config(config_file, REFERENCE, os.path.join(workdir, "config_golden.xlsx"))
+    metocean_data = MetoceanData(config_file, dict(data_files), dialogs=False)
+    config = metocean_data.config
+    right = config["bin_type"] == "right"
+    data = pd.DataFrame(index=metocean_data.data.index)
+    bins = {}
+    outputs = {"index": metocean_data.data.index.asi8}
+    for column in metocean_data.data.columns:
+        header = column.replace("_bins", "").replace("_sectors", "")
+        if column.endswith("_bins"):
+            # Current speeds are the only binned variables without a bin size sweep
+            setting = next(
+                (s for s, headers in BIN_SIZE_GROUPS.items() if header in headers), "current_bin_size"
+            )
+            data[column], bins[header] = original_bins(metocean_data.data[header], config[setting], right)
+            outputs[f"bins/{header}"] = bins[header]
+            centres = bins[header].round(4)
+        elif column.endswith("_sectors"):
+            setting = [s for s, headers in SECTOR_GROUPS.items() if header in headers][0]
+            data[column] = original_sectors(
+                metocean_data.data[header], config[setting], right, config["sector_offset"]
+            )
+            centres = np.arange(config[setting]) + 1
+        else:
+            data[column] = metocean_data.data[column]
+            continue
+        values = data[column].to_numpy(float)
+        outputs[f"values/{column}"] = np.where(np.isin(values, centres), values, np.nan)
+
+    if config["scatter_report"]:
+        plan = [sheet for sheet in get_report_plan(metocean_data, bins) if sheet[1] in ["row", "grid"]]
+        for sheet in plan:
+            contents = sheet[2] if sheet[1] == "row" else [spec for row in sheet[2] for spec in row]
+            for i, spec in enumerate(contents):
+                outputs[f"scatter/{sheet[0]}/{i}"] = original_scatter(data, bins, config, *spec)
+
+    if config["nss_report"] and config["wind_status"] and config["wave_status"]:
+        seas = {"Total": ("WvD_sectors", "Hs", "Tp", "G")}
+        if config["wave_spectral"]:
+            seas["Wind"] = ("WvD_W_sectors", "Hs_W", "Tp_W", "G_W")
+            seas["Swell"] = ("WvD_S_sectors", "Hs_S", "Tp_S", "G_S")
+        for sea, columns in seas.items():
+            outputs[f"nss/{sea}"] = original_nss_tables(data, config, bins["WS"], *columns)
+    return outputs
+
+
+def original_bins(values, bin_size, right):
+    """original_bins Port of the original MetoceanData.get_bins.
+
+    Args:
+        values (pandas.Series): Values to bin.
+        bin_size (float): Bin size.
+        right (bool): Right boundary of the bins closed. If False, the left boundary is closed.
+
+    Returns:
+        [tuple]: Tuple of (bin centre of every value, rounded to 4 decimals, bin centres).
+    """
+    bines = np.arange(0, values.max(), bin_size)
+    bin_list = np.digitize(values, bins=bines, right=right) * bin_size - bin_size / 2
+    return bin_list.round(4), bines + bin_size / 2
+
+
+def original_sectors(directions, n_sectors, right, offset=0):
+    """original_sectors Port of the original MetoceanData.get_sectors, with the sectors rotated by offset. NaN for
+    missing directions, which were missing Int64 values.
+
+    Args:
+        directions (pandas.Series): Directions in degrees.
+        n_sectors (int): Number of sectors.
+        right (bool): Right boundary of the sectors closed. If False, the left boundary is closed.
+        offset (float, optional): Rotation of the sector centres clockwise from north in degrees. Defaults to 0.
+
+    Returns:
+        [numpy.ndarray]: Sector numbers, as floats.
+    """
+    directions = directions.astype(float)
+    if offset:
+        directions = (directions - offset) % 360
+    width = 360 / n_sectors
+    if right:
+        return np.where(directions > (360 - width / 2), 1, np.ceil((directions / width) + 0.5))
+    return np.where(directions >= (360 - width / 2), 1, np.floor(((directions + width / 2) / width) + 1))
+
+
+def original_scatter(data, bins, config, variables, keys=[False, False], x_filt=False, y_filt=False):
+    """original_scatter Port of the original Scatter class: every cell is the share of all the records with its bin
+    centres or sectors, among those of the filters, and NaN if there are none.
+
+    Args:
+        data (pandas.DataFrame): Data with the "_bins" and "_sectors" columns of original_bins and original_sectors.
+        bins (dict): Bin centres of every binned variable.
+        config (dict): MetoceanData.config of the dataset.
+        variables, keys, x_filt, y_filt: Scatter arguments, as in the report plan.
+
+    Returns:
+        [numpy.ndarray]: Scatter table [y bin, x bin].
+    """
+    samples = len(data)
+    if keys[0] and keys[1] and x_filt and y_filt:
+        rows = (data[keys[0]] == x_filt) & (data[keys[1]] == y_filt)
+    elif keys[0] and x_filt:
+        rows = data[keys[0]] == x_filt
+    elif keys[1] and y_filt:
+        rows = data[keys[1]] == y_filt
+    else:
+        rows = np.ones(samples, dtype=bool)
+    x_values = data[variables[0]].to_numpy(float)[np.asarray(rows)]
+    y_values = data[variables[1]].to_numpy(float)[np.asarray(rows)]
+    axes = []
+    for variable in variables:
+        header = variable.replace("_sectors", "").replace("_bins", "")
+        if variable.endswith("_sectors"):
+            setting = [s for s, headers in SECTOR_GROUPS.items() if header in headers][0]
+            axes.append(np.arange(config[setting]) + 1)
+        else:
+            axes.append(bins[header])
+    x_bins, y_bins = axes
+    table = np.full((len(y_bins), len(x_bins)), np.nan)
+    for row in range(len(y_bins)):
+        # Cells of the row at once, with the same matching of the rounded bin centres
+        in_row = x_values[y_values == y_bins[row].round(4)]
+        counts = (in_row[:, None] == x_bins.round(4)[None, :]).sum(axis=0)
+        table[row] = np.where(counts != 0, counts / samples, np.nan)
+    return table
+
+
+def original_nss_tables(data, config, ws_bins, wave_column, hs, tp, g):
+    """original_nss_tables Port of the original NSS.get_NSS_tables and NSS.calc_table for a sea state.
+
+    Args:
+        data (pandas.DataFrame): Data with the "_bins" and "_sectors" columns of original_bins and original_sectors.
+        config (dict): MetoceanData.config of the dataset.
+        ws_bins (numpy.ndarray): Wind speed bin centres.
+        wave_column (str): Wave direction sector column of the sea state.
+        hs, tp, g (str): Hs, Tp and peak enhancement factor columns of the sea state.
+
+    Returns:
+        [numpy.ndarray]: NSS tables [wind sector, wave sector, wind speed bin, (Hs, Tp, G, probability)], with sector
+            0 for omnidirectional tables.
+    """
+    n_wind, n_wave = config["wind_sectors"], config["wave_sectors"]
+    ws = data["WS_bins"].to_numpy(float)
+    wind = data["WnD_sectors"].to_numpy(float)
+    wave = data[wave_column].to_numpy(float)
+    if not config["peak_enhancement"] and not config["derive_peak_enhancement"]:
+        values = [data[hs].to_numpy(float), data[tp].to_numpy(float), np.full(len(data), np.nan)]
+    else:
+        values = [data[column].to_numpy(float) for column in [hs, tp, g]]
+    tables = np.empty((n_wind + 1, n_wave + 1, len(ws_bins), 4))
+    for wind_sector in range(n_wind + 1):
+        for wave_sector in range(n_wave + 1):
+            rows = np.ones(len(data), dtype=bool)
+            if wind_sector:
+                rows &= wind == wind_sector
+            if wave_sector:
+                rows &= wave == wave_sector
+            for i, bin_centre in enumerate(ws_bins):
+                cell = rows & (ws == bin_centre)
+                if not cell.any():
+                    tables[wind_sector, wave_sector, i] = np.nan
+                    continue
+                tables[wind_sector, wave_sector, i, 3] = cell.sum() / len(data)
+                for j, column in enumerate(values):
+                    series = pd.Series(column[cell])
+                    tables[wind_sector, wave_sector, i, j] = (
+                        series.mean() if config["method"] == "mean" else series.median()
+                    )
+    return tables
+
+
+def compare_outputs(golden, outputs, rtol=1e-9, atol=1e-12):
+    """compare_outputs Compares the outputs of an engine with the golden outputs cell by cell.
+
+    Args:
+        golden (dict): Golden outputs, as returned by get_outputs.
+        outputs (dict): Outputs of the engine.
+        rtol (float, optional): Relative tolerance of the floating point cells. Defaults to 1e-9.
+        atol (float, optional): Absolute tolerance of the floating point cells. Defaults to 1e-12.
+
+    Returns:
+        [list]: Description of every difference. Empty if the outputs match.
+    """
+    differences = []
+    for name, expected in golden.items():
+        if name not in outputs:
+            differences.append(f"{name}: missing")
+            continue
+        actual = np.asarray(outputs[name])
+        if actual.shape != expected.shape:
+            differences.append(f"{name}: shape {actual.shape} instead of {expected.shape}")
+            continue
+        if expected.dtype.kind in "fc" or actual.dtype.kind in "fc":
+            # Empty cells are NaN, and must be empty in both
+            differ = ~np.isclose(actual, expected, rtol=rtol, atol=atol, equal_nan=True)
+        else:
+            differ = actual != expected
+        if differ.any():
+            gaps = np.abs(actual[differ].astype(float) - expected[differ].astype(float))
+            gaps = gaps[np.isfinite(gaps)]
+            largest = f", max difference {gaps.max():.3g}" if len(gaps) else ""
+            differences.append(
+                f"{name}: {differ.sum()} of {differ.size} cells differ{largest}"
+                f" ({differ.sum() - len(gaps)} empty in only one)"
+            )
+    for name in outputs.keys() - golden.keys():
+        differences.append(f"{name}: not in the golden outputs")
+    return differences
+
+
+def record(golden, datasets):
+    """record Runs the port of the original implementation on datasets and stores its outputs in the golden folder.
+
+    Args:
+        golden (str): Golden folder. Created if it does not exist.
+        datasets (dict): Dictionary of {name: dataset entry}, with the "config" and "data_files" paths and the
+            "synthetic" arguments of synthetic datasets. Paths are relative to the golden folder.
+    """
+    os.makedirs(golden, exist_ok=True)
+    manifest = load_manifest(golden)
+    for name, dataset in datasets.items():
+        print(f"Recording {name}...")
+        with tempfile.TemporaryDirectory() as workdir:
+            outputs = golden_outputs(
+                os.path.join(golden, dataset["config"]),
+                {kind: os.path.join(golden, path) for kind, path in dataset["data_files"].items()},
+                workdir,
+            )
+        np.savez_compressed(os.path.join(golden, f"{name}.npz"), **outputs)
+        manifest["datasets"][name] = dataset
+        print(f"{name}: {len(outputs)} outputs recorded.")
+    manifest["created"] = datetime.datetime.now().isoformat(timespec="seconds")
+    manifest["versions"] = get_versions()
+    with open(os.path.join(golden, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def compare(golden, engines, names=None, rtol=1e-9, atol=1e-12):
+    """compare Runs engines on the datasets of the golden folder and compares their outputs with the golden ones.
+
+    Args:
+        golden (str): Golden folder, as written by record.
+        engines (list): Engines, any of ENGINES.
+        names (list, optional): Datasets to compare. Defaults to None, for all of them.
+        rtol (float, optional): Relative tolerance of the floating point cells. Defaults to 1e-9. Engines with a looser
+            tolerance in ENGINES are compared with theirs.
+        atol (float, optional): Absolute tolerance of the floating point cells. Defaults to 1e-12.
+
+    Returns:
+        [bool]: True if every output of every engine matches.
+    """
+    datasets = load_manifest(golden)["datasets"]
+    if not datasets:
+        sys.exit(f"No golden outputs in {golden}. Record them first.")
+    unknown = [name for name in names or [] if name not in datasets]
+    if unknown:
+        sys.exit(f"Unknown datasets {', '.join(unknown)}. Recorded: {', '.join(datasets)}.")
+    passed = True
+    results = []
+    for engine in engines:
+        requires = ENGINES[engine].get("requires")
+        if requires and importlib.util.find_spec(requires) is None:
+            print(f"{engine}: skipped, the {requires} package is not installed.")
+            results.append((engine, "all", "skipped"))
+            continue
+        for name in names or datasets:
+            dataset = datasets[name]
+            with np.load(os.path.join(golden, f"{name}.npz")) as f:
+                expected = dict(f)
+            try:
+                with tempfile.TemporaryDirectory() as workdir:
+                    outputs = run_engine(
+                        os.path.join(golden, dataset["config"]),
+                        {kind: os.path.join(golden, path) for kind, path in dataset["data_files"].items()},
+                        engine,
+                        workdir,
+                    )
+            # An engine failing on a dataset fails the comparison, and the other ones still run
+            except (Exception, SystemExit) as error:
+                results.append((engine, name, f"failed: {type(error).__name__} {error}"))
+                passed = False
+                continue
+            # Outputs the engine gives
+            prefixes = ENGINES[engine].get("outputs")
+            if prefixes:
+                expected = {
+                    key: value for key, value in expected.items() if key.startswith(tuple(prefixes))
+                }
+            differences = compare_outputs(
+                expected, outputs, max(rtol, ENGINES[engine].get("rtol", 0)), atol
+            )
+            results.append((engine, name, f"{len(differences)} differences" if differences else "OK"))
+            for difference in differences[:20]:
+                print(f"  {engine} {name} {difference}")
+            if len(differences) > 20:
+                print(f"  ... and {len(differences) - 20} more.")
+            passed &= not differences
+    print()
+    for engine, name, result in results:
+        print(f"{engine:<20} {name:<20} {result}")
+    return passed
+
+
+def synthetic_dataset(golden, name, years, seed=0):
+    """synthetic_dataset Writes the input files of a synthetic dataset to the golden folder.
+
+    Args:
+        golden (str): Golden folder.
+        name (str): Dataset, one of SYNTHETIC_DATASETS.
+        years (float): Length of the timeseries in years.
+        seed (int, optional): Seed of the synthetic data. Defaults to 0.
+
+    Returns:
+        [dict]: Dataset entry of the manifest.
+    """
+    arguments = dict(SYNTHETIC_DATASETS[name], years=years, seed=seed)
+    config_file, data_files = write_synthetic_inputs(os.path.join(golden, name), **arguments)
+    return {
+        "config": os.path.relpath(config_file, golden),
+        "data_files": {kind: os.path.relpath(path, golden) for kind, path in data_files.items()},
+        "synthetic": arguments,
+    }
+
+
+def recorded_dataset(arguments):
+    """recorded_dataset Returns the manifest entry of a recorded dataset from its --dataset arguments.
+
+    Args:
+        arguments (list): Name, config file path and "kind=path" data files, e.g. ["site", "config.xlsx", "wind=wind.txt"].
+
+    Returns:
+        [tuple]: Tuple of (name, dataset entry of the manifest). Paths are absolute.
+    """
+    if len(arguments) < 3:
+        sys.exit("--dataset takes a name, a config file and at least one kind=path data file.")
+    name, config_file, *files = arguments
+    data_files = {}
+    for item in files:
+        kind, _, path = item.partition("=")
+        if kind not in DATA_KINDS or not path:
+            sys.exit(f"Data file {item} is not one of {', '.join(DATA_KINDS)} followed by =path.")
+        data_files[kind] = os.path.abspath(path)
+    return name, {"config": os.path.abspath(config_file), "data_files": data_files, "synthetic": None}
+
+
+def load_manifest(golden):
+    """load_manifest Returns the manifest of a golden folder, or an empty one."""
+    filepath = os.path.join(golden, "manifest.json")
+    if not os.path.exists(filepath):
+        return {"datasets": {}}
+    with open(filepath) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Golden-output regression harness of the scatter and NSS tables.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    record_parser = subparsers.add_parser("record", help="Store the outputs of the original implementation.")
+    record_parser.add_argument("--golden", default="golden", help="Folder of the golden outputs.")
+    record_parser.add_argument("--years", type=float, default=1, help="Length of the synthetic datasets.")
+    record_parser.add_argument(
+        "--dataset",
+        nargs="+",
+        action="append",
+        default=[],
+        metavar="ARG",
+        help="Recorded dataset: name, config file and kind=path data files. Repeat for more datasets.",
+    )
+    record_parser.add_argument("--no-synthetic", action="store_true", help="Only record the --dataset datasets.")
+    compare_parser = subparsers.add_parser("compare", help="Compare engines with the golden outputs.")
+    compare_parser.add_argument("--golden", default="golden", help="Folder of the golden outputs.")
+    compare_parser.add_argument(
+        "--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES)
+    )
+    compare_parser.add_argument("--datasets", nargs="+", help="Datasets to compare. Defaults to all of them.")
+    compare_parser.add_argument("--rtol", type=float, default=1e-9)
+    compare_parser.add_argument("--atol", type=float, default=1e-12)
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        datasets = {}
+        if not args.no_synthetic:
+            for name in SYNTHETIC_DATASETS:
+                datasets[name] = synthetic_dataset(args.golden, name, args.years)
+        for arguments in args.dataset:
+            name, dataset = recorded_dataset(arguments)
+            datasets[name] = dataset
+        record(args.golden, datasets)
+    elif not compare(args.golden, args.engines, args.datasets, args.rtol, args.atol):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,52 @@
 import numpy as np
 import pandas as pd
 
-import time
+import copy
 import xlsxwriter
-from tqdm import tqdm
+from xlsxwriter.utility import xl_range
+
+
+# Titles of the table variables in the reports
+VAR_TITLES = {
+    "WS_bins": "Wind Speed @ Hub Height, [m/s]",
+    "WnD_sectors": "Wind Direction @ Hub Height, [degN]",
+    "WS_10_bins": "Wind Speed @ 10m MSL, [m/s]",
+    "WnD_10_sectors": "Wind Direction @ 10m MSL, [degN]",
+    "Hs_bins": "Significant Wave Height (Totalsea), Hm0 [m]",
+    "Tp_bins": "Peak Wave Period (Totalsea), Tp [s]",
+    "Tz_bins": "Zero-Crossing Period (Totalsea), Tz [s]",
+    "WvD_sectors": "Mean Wave Direction (Totalsea), [degN]",
+    "Hs_W_bins": "Significant Wave height (Windsea), Hm0 [m]",
+    "Tp_W_bins": "Peak Wave Period (Windsea), Tp [s]",
+    "Tz_W_bins": "Zero-Crossing Wave Period (Windsea), Tz [s]",
+    "WvD_W_sectors": "Mean Wave Direction (Windsea), [degN]",
+    "Hs_S_bins": "Significant Wave Height (Swell), Hm0 [m]",
+    "Tp_S_bins": "Peak Wave Period (Swell), Tp [s]",
+    "Tz_S_bins": "Zero-Crossing Wave Period (Swell), Tz [s]",
+    "WvD_S_sectors": "Mean Wave Direction (Swell), [degN]",
+    "SV_bins": "Current Surface Speed (Total), [m/s]",
+    "DaV_bins": "Current Depth Averaged Speed (Total), [m/s]",
+    "CD_sectors": "Mean Current Direction (Total), [DegN, going]",
+    "SV_Tid_bins": "Current Surface Speed (Tidal), [m/s]",
+    "DaV_Tid_bins": "Current Depth Averaged Speed (Tidal), [m/s]",
+    "CD_Tid_sectors": "Mean Current Direction (Tidal), [degN, going]",
+    "SV_Res_bins": "Current Surface Speed (Residual), [m/s]",
+    "DaV_Res_bins": "Current Depth Averaged Speed (Residual), [m/s]",
+    "CD_Res_sectors": "Mean Current Direction (Residual), [degN, going]",
+}
 
 
 class Scatter:
     """Class to represent a scatter table."""
 
     def __init__(
-        self, met_data, variables, keys=[False, False], x_filt=False, y_filt=False
+        self,
+        met_data,
+        variables,
+        keys=[False, False],
+        x_filt=False,
+        y_filt=False,
+        progress=None,
     ):
         """__init__ Initialises the Scatter class.
 
@@ -21,6 +57,8 @@ class Scatter:
             keys (list, optional): List of strings. Each string must correspond to a key of the met_data dataframe. Defaults to [False, False].
             x_filt (int or float, optional): Value by which to filter the first key in keys. Defaults to False.
             y_filt (int or float, optional): Value by which to filter the second key in keys. Defaults to False.
+            progress (Progress, optional): Progress object to report the completed rows to, as a fraction of one table.
+                Defaults to None, which prints a message when the table is complete.
         """
         self.samples = len(met_data.data)  # Total number of samples
         self.x_var = variables[0]  # Key for the horizontal variable
@@ -30,23 +68,10 @@ class Scatter:
         self.x_filt = x_filt  # Sector number of the horizontal varaible
         self.y_filt = y_filt  # Sector number of the vertical variable
         self.bin_type = met_data.config["bin_type"]  # Variable bin discretisation logic
+        self.sector_offset = met_data.config.get("sector_offset", 0)  # Rotation of the sectors
+        self.note = ""  # Text appended to the table header, e.g. the bound of a bootstrap table
 
-        # Check if the user has set sectors for both variables to filter by
-        if self.x_key and self.y_key and self.x_filt and self.y_filt:
-            # Create a filter so only rows with both variables are filtered per their corresponding sector
-            filt = (met_data.data[self.x_key] == self.x_filt) & (
-                met_data.data[self.y_key] == self.y_filt
-            )
-            # Create a reduced dataframe only of the 2 filtered varaibles
-            temp_data = met_data.data[filt].loc[:, [self.x_var, self.y_var]]
-        elif self.x_key and self.x_filt:
-            filt = met_data.data[self.x_key] == self.x_filt
-            temp_data = met_data.data[filt].loc[:, [self.x_var, self.y_var]]
-        elif self.y_key and self.y_filt:
-            filt = met_data.data[self.y_key] == self.y_filt
-            temp_data = met_data.data[filt].loc[:, [self.x_var, self.y_var]]
-        else:
-            temp_data = met_data.data.loc[:, [self.x_var, self.y_var]]
+        rows = self.get_rows(met_data)
 
         if self.x_var in ["WnD_sectors", "WnD_10_sectors"]:
             self.x_bins = np.arange(met_data.config["wind_sectors"]) + 1
@@ -66,167 +91,161 @@ class Scatter:
         else:
             self.y_bins = met_data.bins[self.y_var.replace("_bins", "")]
 
-        # Initialise the empty table and fill with nan
-        self.table = np.empty([len(self.y_bins), len(self.x_bins)]) * np.nan
-
-        start = time.perf_counter()
-        # Loop through the entire table and calculate the probability
-        for row in tqdm(
-            range(len(self.y_bins)),
-            leave=False,
-            desc=f"Calculating table: {self.y_var} Vs. {self.x_var}",
-        ):
-            for col in tqdm(
-                range(len(self.x_bins)),
-                leave=False,
-                desc=f"Row {row} of {len(self.y_bins)}",
-            ):
-                prob = (
-                    len(
-                        temp_data[
-                            (temp_data[self.x_var] == self.x_bins[col].round(4))
-                            & (temp_data[self.y_var] == self.y_bins[row].round(4))
-                        ]
-                    )
-                    / self.samples
-                )
-                if prob != 0:
-                    self.table[row][col] = prob
-        finish = time.perf_counter()
-        elapsed = finish - start
+        shape = (len(self.y_bins), len(self.x_bins))
+        if rows is None:
+            # Unfiltered tables are the counts of the group index of the two variables
+            counts = met_data.group_index(self.y_var, self.x_var).counts.ravel()
+            cells = np.flatnonzero(counts)
+            counts = counts[cells]
+        else:
+            # Only the occupied cells of the subset are kept
+            counts = met_data.backend.count_cells(
+                met_data.get_codes(self.y_var), met_data.get_codes(self.x_var), shape, rows
+            )
+            cells = np.flatnonzero(counts)
+            counts = counts[cells]
+        # Probability of every occupied cell. Empty cells are not stored.
+        self.sparse = SparseTable(
+            shape, cells // shape[1], cells % shape[1], counts / self.samples
+        )
+        if progress is not None:
+            progress.update(1)
+            return
 
         if self.x_key and self.x_filt and self.y_key and self.y_filt:
             print(
-                f"Table {self.y_var} Vs. {self.x_var} [{self.x_key} = {self.x_filt}] [{self.y_key} = {self.y_filt}] complete! Time taken: {round(elapsed, 2)} seconds."
+                f"Table {self.y_var} Vs. {self.x_var} [{self.x_key} = {self.x_filt}] [{self.y_key} = {self.y_filt}] complete!"
             )
         elif self.x_key and self.x_filt:
             print(
-                f"Table {self.y_var} Vs. {self.x_var} [{self.x_key} = {self.x_filt}] complete! Time taken: {round(elapsed, 2)} seconds."
+                f"Table {self.y_var} Vs. {self.x_var} [{self.x_key} = {self.x_filt}] complete!"
             )
         elif self.y_key and self.y_filt:
             print(
-                f"Table {self.y_var} Vs. {self.x_var} [{self.y_key} = {self.y_filt}] complete! Time taken: {round(elapsed, 2)} seconds."
+                f"Table {self.y_var} Vs. {self.x_var} [{self.y_key} = {self.y_filt}] complete!"
             )
         else:
             print(
-                f"Table {self.y_var} Vs. {self.x_var} complete! Time taken: {round(elapsed, 2)} seconds."
+                f"Table {self.y_var} Vs. {self.x_var} complete!"
             )
 
-    def print_table(self, workbook, worksheet, row=0, col=0):
-        """print_table Function to print the scatter table into an excel file with all the pretty formatting.
+    def get_rows(self, met_data):
+        """get_rows Returns the rows of the data in the filtered subset of the table, sliced from the shared group
+        index of the filter columns.
 
         Args:
-            workbook (xlsxwriter.Workbook): xlsxwriter library Workbook class. Excel workbook at which to print the scatter table.
-            worksheet (xlsxwriter.Worksheet): xlsxwriter library worksheet class. Excel sheet at which to print the sactter table.
-            row (int, optional): Zero-indexed row number in the excel sheet to place the table. Refers to the upper-left. Defaults to 0.
-            col (int, optional): Zero-indexed column number in the excel sheet to place the table. Refers to the upper-left. Defaults to 0.. Defaults to 0.
+            met_data (MetoceanData): MetoceanData object the table is calculated from.
+
+        Returns:
+            [numpy.ndarray]: Row positions in met_data.data. None if the table is not filtered.
         """
+        if self.x_key and self.y_key and self.x_filt and self.y_filt:
+            # Only rows with both variables in their corresponding sector
+            return met_data.group_index(self.x_key, self.y_key).rows(
+                met_data.get_code(self.x_key, self.x_filt),
+                met_data.get_code(self.y_key, self.y_filt),
+            )
+        if self.x_key and self.x_filt:
+            return met_data.group_index(self.x_key).rows(
+                met_data.get_code(self.x_key, self.x_filt)
+            )
+        if self.y_key and self.y_filt:
+            return met_data.group_index(self.y_key).rows(
+                met_data.get_code(self.y_key, self.y_filt)
+            )
+        return None
 
-        VAR_TITLES = {
-            "WS_bins": "Wind Speed @ Hub Height, [m/s]",
-            "WnD_sectors": "Wind Direction @ Hub Height, [degN]",
-            "WS_10_bins": "Wind Speed @ 10m MSL, [m/s]",
-            "WnD_10_sectors": "Wind Direction @ 10m MSL, [degN]",
-            "Hs_bins": "Significant Wave Height (Totalsea), Hm0 [m]",
-            "Tp_bins": "Peak Wave Period (Totalsea), Tp [s]",
-            "Tz_bins": "Zero-Crossing Period (Totalsea), Tz [s]",
-            "WvD_sectors": "Mean Wave Direction (Totalsea), [degN]",
-            "Hs_W_bins": "Significant Wave height (Windsea), Hm0 [m]",
-            "Tp_W_bins": "Peak Wave Period (Windsea), Tp [s]",
-            "Tz_W_bins": "Zero-Crossing Wave Period (Windsea), Tz [s]",
-            "WvD_W_sectors": "Mean Wave Direction (Windsea), [degN]",
-            "Hs_S_bins": "Significant Wave Height (Swell), Hm0 [m]",
-            "Tp_S_bins": "Peak Wave Period (Swell), Tp [s]",
-            "Tz_S_bins": "Zero-Crossing Wave Period (Swell), Tz [s]",
-            "WvD_S_sectors": "Mean Wave Direction (Swell), [degN]",
-            "SV_bins": "Current Surface Speed (Total), [m/s]",
-            "DaV_bins": "Current Depth Averaged Speed (Total), [m/s]",
-            "CD_sectors": "Mean Current Direction (Total), [DegN, going]",
-            "SV_Tid_bins": "Current Surface Speed (Tidal), [m/s]",
-            "DaV_Tid_bins": "Current Depth Averaged Speed (Tidal), [m/s]",
-            "CD_Tid_sectors": "Mean Current Direction (Tidal), [degN, going]",
-            "SV_Res_bins": "Current Surface Speed (Residual), [m/s]",
-            "DaV_Res_bins": "Current Depth Averaged Speed (Residual), [m/s]",
-            "CD_Res_sectors": "Mean Current Direction (Residual), [degN, going]",
-        }
-        # Creates lists of the y lower and upper bounds
-        # If the y variable is direction sectors
-        if "sectors" in self.y_var:
-            n_sect = len(self.y_bins)
-            sector_width = 360 / n_sect
-            y_lower_bound = []
-            y_upper_bound = []
-            for i in range(n_sect):
-                # The first sector has different logic
-                if i == 0:
-                    y_lower_bound.append(360 - sector_width / 2)
-                    y_upper_bound.append(sector_width / 2)
-                else:
-                    y_lower_bound.append((sector_width / 2) + ((i - 1) * sector_width))
-                    y_upper_bound.append((sector_width / 2) + (i * sector_width))
-        # For all other non-direction variables
-        else:
-            # Find step between bins
-            step = self.y_bins[1] - self.y_bins[0]
-            # List comprehension for the lower and upper limit lists
-            y_lower_bound = [x - step / 2 for x in self.y_bins]
-            y_upper_bound = [x + step / 2 for x in self.y_bins]
+    @property
+    def table(self):
+        """table Returns the scatter table as a dense 2D array. Empty cells are NaN."""
+        return self.sparse.toarray()
+
+    @property
+    def shape(self):
+        """shape Returns the (rows, columns) shape of the scatter table."""
+        return self.sparse.shape
 
-        # Creates lists for the x lower and upper bounds
-        # If the x variable is direction sectors
-        if "sectors" in self.x_var:
-            n_sect = len(self.x_bins)
+    def rebin(self, x_factor=1, y_factor=1):
+        """rebin Creates a coarser copy of the scatter table by aggregating adjacent bins. Gives the same table as
+        counting the data with bin sizes x_factor and y_factor times larger, without scanning the data again.
+
+        Args:
+            x_factor (int, optional): Number of adjacent horizontal bins to merge into one. Defaults to 1.
+            y_factor (int, optional): Number of adjacent vertical bins to merge into one. Defaults to 1.
+
+        Returns:
+            [Scatter]: New Scatter object with the aggregated table and bins.
+        """
+        table = copy.copy(self)
+        if x_factor != 1:
+            if "sectors" in self.x_var:
+                raise ValueError(f"Cannot re-bin the direction sectors of {self.x_var}.")
+            table.x_bins, table.sparse = rebin_axis(self.x_bins, self.sparse, x_factor, 1)
+        if y_factor != 1:
+            if "sectors" in self.y_var:
+                raise ValueError(f"Cannot re-bin the direction sectors of {self.y_var}.")
+            table.y_bins, table.sparse = rebin_axis(
+                self.y_bins, table.sparse, y_factor, 0
+            )
+        return table
+
+    def get_bounds(self, variable, bins):
+        """get_bounds Returns the lower and upper bounds of the bins or direction sectors of an axis of the table.
+
+        Args:
+            variable (str): Key of the variable of the axis, i.e. self.x_var or self.y_var.
+            bins (numpy.ndarray): Bin centres or sector numbers of the axis, i.e. self.x_bins or self.y_bins.
+
+        Returns:
+            [tuple]: Tuple of (lower bounds, upper bounds) lists.
+        """
+        offset = self.sector_offset
+        # If the variable is direction sectors
+        if "sectors" in variable:
+            n_sect = len(bins)
             sector_width = 360 / n_sect
-            x_lower_bound = []
-            x_upper_bound = []
+            lower_bound = []
+            upper_bound = []
             for i in range(n_sect):
                 # The first sector has different logic
                 if i == 0:
-                    x_lower_bound.append(360 - sector_width / 2)
-                    x_upper_bound.append(sector_width / 2)
+                    lower_bound.append((offset - sector_width / 2) % 360)
+                    upper_bound.append((offset + sector_width / 2) % 360)
                 else:
-                    x_lower_bound.append((sector_width / 2) + ((i - 1) * sector_width))
-                    x_upper_bound.append((sector_width / 2) + (i * sector_width))
+                    lower_bound.append(
+                        (offset + (sector_width / 2) + ((i - 1) * sector_width)) % 360
+                    )
+                    upper_bound.append(
+                        (offset + (sector_width / 2) + (i * sector_width)) % 360
+                    )
         # For all other non-direction variables
         else:
-            # Find step between bins
-            step = self.x_bins[1] - self.x_bins[0]
+            # Find step between bins. Bins start at zero, so it is twice the first centre (also with a single bin).
+            step = 2 * bins[0]
             # List comprehension for the lower and upper limit lists
-            x_lower_bound = [x - step / 2 for x in self.x_bins]
-            x_upper_bound = [x + step / 2 for x in self.x_bins]
-
-        # Define formats of different parts of the table
-        # Table header format
-        header_format = workbook.add_format(
-            {
-                "bold": True,
-                "border": 2,
-                "font_color": "#FFFFFF",
-                "bg_color": "072B31",
-                "align": "center",
-            }
-        )
-        # y Header Format
-        y_header_format = workbook.add_format(
-            {
-                "border": 2,
-                "bold": True,
-                "valign": "vcenter",
-                "align": "center",
-                "bg_color": "D9D9D6",
-                "rotation": 90,
-            }
-        )
-        # X Header Format
-        x_header_format = workbook.add_format(
-            {"border": 2, "bold": True, "align": "center", "bg_color": "D9D9D6"}
-        )
-        # Upper and lower bound format
-        bounds_format = workbook.add_format(
-            {"border": 1, "align": "center", "bg_color": "D9D9D6"}
-        )
-        # Main data format
-        data_format = workbook.add_format({"border": 1, "align": "center"})
+            lower_bound = [x - step / 2 for x in bins]
+            upper_bound = [x + step / 2 for x in bins]
+        return lower_bound, upper_bound
+
+    def print_table(self, workbook, worksheet, row=0, col=0, sheet=None):
+        """print_table Function to print the scatter table into an excel file with all the pretty formatting.
+
+        Args:
+            workbook (xlsxwriter.Workbook): xlsxwriter library Workbook class. Excel workbook at which to print the scatter table.
+            worksheet (xlsxwriter.Worksheet): xlsxwriter library worksheet class. Excel sheet at which to print the sactter table.
+            row (int, optional): Zero-indexed row number in the excel sheet to place the table. Refers to the upper-left. Defaults to 0.
+            col (int, optional): Zero-indexed column number in the excel sheet to place the table. Refers to the upper-left. Defaults to 0.. Defaults to 0.
+            sheet (ScatterSheet, optional): Formats and colour scales shared by the tables of the worksheet. Defaults to None,
+                which formats the table on its own in the full report profile.
+        """
+        single = sheet is None
+        if single:
+            sheet = ScatterSheet(workbook, worksheet)
+        formats = sheet.formats
+
+        # Lower and upper bounds of the bins or sectors of both axes
+        y_lower_bound, y_upper_bound = self.get_bounds(self.y_var, self.y_bins)
+        x_lower_bound, x_upper_bound = self.get_bounds(self.x_var, self.x_bins)
 
         # Create table header text
         # If both x and y filter are applied
@@ -241,25 +260,27 @@ class Scatter:
         # If no filters are applied
         else:
             header_text = f"{VAR_TITLES[self.x_var]} Vs. {VAR_TITLES[self.y_var]}"
+        if self.note:
+            header_text += f" {self.note}"
 
         # Create table header merged range
         worksheet.merge_range(
             row,
             col,
             row,
-            col + self.table.shape[1] + 3,
+            col + self.shape[1] + 3,
             header_text,
-            header_format,
+            formats["header"],
         )
 
         # Create Y header merged range
         worksheet.merge_range(
             row + 2,
             col,
-            row + 4 + self.table.shape[0],
+            row + 4 + self.shape[0],
             col,
             f"{VAR_TITLES[self.y_var]}",
-            y_header_format,
+            formats["y_header"],
         )
 
         # Adjust columns widths to fit contents
@@ -270,15 +291,13 @@ class Scatter:
             row + 1,
             col + 1,
             row + 1,
-            col + 3 + self.table.shape[1],
+            col + 3 + self.shape[1],
             f"{VAR_TITLES[self.x_var]}",
-            x_header_format,
+            formats["x_header"],
         )
 
         # Fill in that awkward square between x and y headers
-        worksheet.write(
-            row + 1, col, None, workbook.add_format({"bg_color": "D9D9D6", "border": 2})
-        )
+        worksheet.write(row + 1, col, None, formats["corner"])
 
         # Fill in the Lower and Upper headers for the bins
         if self.bin_type == "left":
@@ -292,183 +311,356 @@ class Scatter:
             row + 2,
             col + 1,
             lower_msg,
-            workbook.add_format(
-                {"bg_color": "D9D9D6", "border": 1, "align": "center", "bold": True}
-            ),
-        )
-        worksheet.write(
-            row + 2,
-            col + 2,
-            None,
-            workbook.add_format({"bg_color": "D9D9D6", "border": 1}),
-        )
-        worksheet.write(
-            row + 3,
-            col + 1,
-            None,
-            workbook.add_format({"bg_color": "D9D9D6", "border": 1}),
-        )
-        worksheet.write_string(
-            row + 3,
-            col + 2,
-            upper_msg,
-            workbook.add_format(
-                {"bg_color": "D9D9D6", "border": 1, "align": "center", "bold": True}
-            ),
+            formats["bounds_header"],
         )
+        worksheet.write(row + 2, col + 2, None, formats["bounds_blank"])
+        worksheet.write(row + 3, col + 1, None, formats["bounds_blank"])
+        worksheet.write_string(row + 3, col + 2, upper_msg, formats["bounds_header"])
 
         # Prints the contents of the table and formats cells
-        for row_num, line in enumerate(self.table):
-            for col_num, data in enumerate(line):
-                if np.isnan(data):
-                    worksheet.write_string(
-                        row + 4 + row_num, col + 3 + col_num, "NaN", data_format
-                    )
-                else:
-                    worksheet.write_number(
-                        row + 4 + row_num, col + 3 + col_num, data, data_format
-                    )
+        for row_num, col_num, data in zip(
+            self.sparse.rows, self.sparse.cols, self.sparse.values
+        ):
+            worksheet.write_number(
+                row + 4 + row_num, col + 3 + col_num, data, formats["data"]
+            )
+        body = (row + 4, col + 3, row + 3 + self.shape[0], col + 2 + self.shape[1])
+        if sheet.profile == "compact":
+            # Empty cells are left blank and get their borders from a single sheet-level rule
+            sheet.add_blanks(*body)
+        else:
+            for row_num, col_num in zip(*np.nonzero(~self.sparse.occupied())):
+                worksheet.write_string(
+                    row + 4 + row_num, col + 3 + col_num, "NaN", formats["data"]
+                )
         # Applied conditional formatting to the main table body
-        worksheet.conditional_format(
-            row + 4,
-            col + 3,
-            row + 3 + self.table.shape[0],
-            col + 2 + self.table.shape[1],
-            {
-                "type": "3_color_scale",
-                "min_color": "#63BE7B",
-                "mid_color": "#FFEB84",
-                "max_color": "#F8696B",
-                "min_type": "min",
-                "mid_type": "percentile",
-                "mid_value": 50,
-                "max_type": "max",
-            },
-        )
+        sheet.add_color_scale("body", *body)
 
         # Print the upper and lower bounds for the x and y variables
         for i in range(len(x_lower_bound)):
             worksheet.write_number(
-                row + 2, col + 3 + i, x_lower_bound[i], bounds_format
+                row + 2, col + 3 + i, x_lower_bound[i], formats["bounds"]
             )
             worksheet.write_number(
-                row + 3, col + 3 + i, x_upper_bound[i], bounds_format
+                row + 3, col + 3 + i, x_upper_bound[i], formats["bounds"]
             )
 
         for i in range(len(y_lower_bound)):
             worksheet.write_number(
-                row + 4 + i, col + 1, y_lower_bound[i], bounds_format
+                row + 4 + i, col + 1, y_lower_bound[i], formats["bounds"]
             )
             worksheet.write_number(
-                row + 4 + i, col + 2, y_upper_bound[i], bounds_format
+                row + 4 + i, col + 2, y_upper_bound[i], formats["bounds"]
             )
 
         # Print Sum headers at the bottom and right of the main table
-        # SUM header cell format
-        sum_format = workbook.add_format(
-            {
-                "bold": True,
-                "border": 2,
-                "align": "center",
-                "valign": "vcenter",
-                "bg_color": "D9D9D6",
-            }
-        )
         # Print bottom SUM header
         worksheet.merge_range(
-            row + 4 + self.table.shape[0],
+            row + 4 + self.shape[0],
             col + 1,
-            row + 4 + self.table.shape[0],
+            row + 4 + self.shape[0],
             col + 2,
             "SUM",
-            sum_format,
+            formats["sum"],
         )
         # Print right SUM header
         worksheet.merge_range(
             row + 2,
-            col + 3 + self.table.shape[1],
+            col + 3 + self.shape[1],
             row + 3,
-            col + 3 + self.table.shape[1],
+            col + 3 + self.shape[1],
             "SUM",
-            sum_format,
+            formats["sum"],
         )
 
         # Calculate Row and Column sum totals
-        col_totals = np.nansum(self.table, axis=0)
-        row_totals = np.nansum(self.table, axis=1)
+        col_totals = self.sparse.sum(axis=0)
+        row_totals = self.sparse.sum(axis=1)
 
         # Print columns sum totals.
         for i, total in enumerate(col_totals):
             worksheet.write_number(
-                row + 4 + self.table.shape[0],
+                row + 4 + self.shape[0],
                 col + 3 + i,
                 total,
-                workbook.add_format(
-                    {
-                        "bold": True,
-                        "align": "center",
-                        "border": 1,
-                        "bottom": 2,
-                        "top": 2,
-                    }
-                ),
+                formats["col_total"],
             )
 
-        worksheet.conditional_format(
-            row + 4 + self.table.shape[0],
+        sheet.add_color_scale(
+            "col_totals",
+            row + 4 + self.shape[0],
             col + 3,
-            row + 4 + self.table.shape[0],
-            col + 2 + self.table.shape[1],
-            {
-                "type": "3_color_scale",
-                "min_color": "#63BE7B",
-                "mid_color": "#FFEB84",
-                "max_color": "#F8696B",
-                "min_type": "min",
-                "mid_type": "percentile",
-                "mid_value": 50,
-                "max_type": "max",
-            },
+            row + 4 + self.shape[0],
+            col + 2 + self.shape[1],
         )
 
         # Print row sum totals
         for i, total in enumerate(row_totals):
             worksheet.write_number(
                 row + 4 + i,
-                col + 3 + self.table.shape[1],
+                col + 3 + self.shape[1],
                 total,
-                workbook.add_format(
-                    {
-                        "bold": True,
-                        "align": "center",
-                        "border": 1,
-                        "right": 2,
-                        "left": 2,
-                    }
-                ),
+                formats["row_total"],
             )
 
-        worksheet.conditional_format(
+        sheet.add_color_scale(
+            "row_totals",
             row + 4,
-            col + 3 + self.table.shape[1],
-            row + 3 + self.table.shape[0],
-            col + 3 + self.table.shape[1],
-            {
-                "type": "3_color_scale",
-                "min_color": "#63BE7B",
-                "mid_color": "#FFEB84",
-                "max_color": "#F8696B",
-                "min_type": "min",
-                "mid_type": "percentile",
-                "mid_value": 50,
-                "max_type": "max",
-            },
+            col + 3 + self.shape[1],
+            row + 3 + self.shape[0],
+            col + 3 + self.shape[1],
         )
 
         # Print full table sum total
         worksheet.write_number(
-            row + 4 + self.table.shape[0],
-            col + 3 + self.table.shape[1],
-            np.nansum(self.table),
-            workbook.add_format({"bold": True, "border": 2, "align": "center"}),
+            row + 4 + self.shape[0],
+            col + 3 + self.shape[1],
+            self.sparse.sum(),
+            formats["total"],
+        )
+        if single:
+            sheet.close()
+
+
+# Green-yellow-red colour scale of the table bodies and totals
+COLOR_SCALE = {
+    "type": "3_color_scale",
+    "min_color": "#63BE7B",
+    "mid_color": "#FFEB84",
+    "max_color": "#F8696B",
+    "min_type": "min",
+    "mid_type": "percentile",
+    "mid_value": 50,
+    "max_type": "max",
+}
+
+# Report profiles selectable in the config file
+REPORT_PROFILES = ["full", "compact", "fast"]
+
+
+class ScatterSheet:
+    """Class holding the cell formats and conditional formatting of the scatter tables of one worksheet.
+
+    In the full report profile every table gets its own colour scales and its empty cells are written as "NaN".
+    In the compact profile empty cells are left blank and the colour scales of all the tables of the sheet are
+    merged into one rule per kind (table bodies, column totals, row totals), applied when the sheet is closed.
+    The colours of the compact profile are therefore scaled across all the tables of the sheet.
+    The fast profile prints like the full profile, to a worksheet that drops all of the styling (see
+    scatter_report.PlainSheet)."""
+
+    def __init__(self, workbook, worksheet, profile="full"):
+        """__init__ Initialises the ScatterSheet class and adds the cell formats to the workbook.
+
+        Args:
+            workbook (xlsxwriter.Workbook): xlsxwriter library Workbook class. Excel workbook of the worksheet.
+            worksheet (xlsxwriter.Worksheet): xlsxwriter library worksheet class. Excel sheet the tables are printed to.
+            profile (str, optional): Report profile, one of REPORT_PROFILES. Defaults to "full".
+        """
+        if profile not in REPORT_PROFILES:
+            raise ValueError(f"Unknown report profile {profile}.")
+        self.worksheet = worksheet
+        self.profile = profile
+        # Cell ranges of the merged rules of the compact profile, by kind
+        self.ranges = {"body": [], "col_totals": [], "row_totals": [], "blanks": []}
+        self.formats = {
+            # Table header format
+            "header": workbook.add_format(
+                {
+                    "bold": True,
+                    "border": 2,
+                    "font_color": "#FFFFFF",
+                    "bg_color": "072B31",
+                    "align": "center",
+                }
+            ),
+            # y Header Format
+            "y_header": workbook.add_format(
+                {
+                    "border": 2,
+                    "bold": True,
+                    "valign": "vcenter",
+                    "align": "center",
+                    "bg_color": "D9D9D6",
+                    "rotation": 90,
+                }
+            ),
+            # X Header Format
+            "x_header": workbook.add_format(
+                {"border": 2, "bold": True, "align": "center", "bg_color": "D9D9D6"}
+            ),
+            # Square between the x and y headers
+            "corner": workbook.add_format({"bg_color": "D9D9D6", "border": 2}),
+            # Lower and Upper headers of the bounds
+            "bounds_header": workbook.add_format(
+                {"bg_color": "D9D9D6", "border": 1, "align": "center", "bold": True}
+            ),
+            "bounds_blank": workbook.add_format({"bg_color": "D9D9D6", "border": 1}),
+            # Upper and lower bound format
+            "bounds": workbook.add_format(
+                {"border": 1, "align": "center", "bg_color": "D9D9D6"}
+            ),
+            # Main data format
+            "data": workbook.add_format({"border": 1, "align": "center"}),
+            # SUM header cell format
+            "sum": workbook.add_format(
+                {
+                    "bold": True,
+                    "border": 2,
+                    "align": "center",
+                    "valign": "vcenter",
+                    "bg_color": "D9D9D6",
+                }
+            ),
+            "col_total": workbook.add_format(
+                {"bold": True, "align": "center", "border": 1, "bottom": 2, "top": 2}
+            ),
+            "row_total": workbook.add_format(
+                {"bold": True, "align": "center", "border": 1, "right": 2, "left": 2}
+            ),
+            "total": workbook.add_format({"bold": True, "border": 2, "align": "center"}),
+            # Borders of the blank cells of the compact profile, as a conditional format
+            "blank": workbook.add_format({"border": 1}),
+        }
+
+    def add_color_scale(self, kind, first_row, first_col, last_row, last_col):
+        """add_color_scale Adds the colour scale to a cell range. Applied straight away, except in the compact profile
+        where it is merged with the ranges of the same kind.
+
+        Args:
+            kind (str): Kind of range, one of "body", "col_totals" or "row_totals".
+            first_row (int): Zero-indexed first row of the range.
+            first_col (int): Zero-indexed first column of the range.
+            last_row (int): Zero-indexed last row of the range.
+            last_col (int): Zero-indexed last column of the range.
+        """
+        if self.profile != "compact":
+            self.worksheet.conditional_format(
+                first_row, first_col, last_row, last_col, dict(COLOR_SCALE)
+            )
+        else:
+            self.ranges[kind].append((first_row, first_col, last_row, last_col))
+
+    def add_blanks(self, first_row, first_col, last_row, last_col):
+        """add_blanks Adds a table body to the range whose blank cells get the data borders."""
+        self.ranges["blanks"].append((first_row, first_col, last_row, last_col))
+
+    def close(self):
+        """close Applies the merged conditional formats of the compact profile to the worksheet."""
+        for kind, ranges in self.ranges.items():
+            if not ranges:
+                continue
+            if kind == "blanks":
+                options = {"type": "blanks", "format": self.formats["blank"]}
+            else:
+                options = dict(COLOR_SCALE)
+            options["multi_range"] = " ".join(xl_range(*r) for r in ranges)
+            self.worksheet.conditional_format(*ranges[0], options)
+            ranges.clear()
+
+
+def rebin_axis(bins, table, factor, axis):
+    """rebin_axis Aggregates groups of factor adjacent bins along one axis of a scatter table.
+
+    Bins are the centres produced by MetoceanData.get_bins, so the base bin size is twice the first centre.
+    The last coarse bin collects any remaining fine bins, as np.digitize does with the open upper bin.
+
+    Args:
+        bins (numpy.ndarray): Bin centres of the axis at the base resolution.
+        table (SparseTable): Scatter table.
+        factor (int): Number of adjacent bins to merge into one.
+        axis (int): Axis of the table the bins belong to. 0 for rows, 1 for columns.
+
+    Returns:
+        [tuple]: Tuple of (coarse bin centres, aggregated SparseTable).
+    """
+    base_size = 2 * bins[0]
+    bin_size = base_size * factor
+    n_coarse = int(np.ceil(len(bins) / factor))
+    if axis == 0:
+        coarse = SparseTable(
+            (n_coarse, table.shape[1]), table.rows // factor, table.cols, table.values
         )
+    else:
+        coarse = SparseTable(
+            (table.shape[0], n_coarse), table.rows, table.cols // factor, table.values
+        )
+    return np.arange(n_coarse) * bin_size + bin_size / 2, coarse
+
+
+def merge_tables(tables):
+    """merge_tables Adds up scatter tables of the same shape into a copy of the first one.
+
+    Args:
+        tables (list): List of Scatter objects with the same variables and bins.
+
+    Returns:
+        [Scatter]: New Scatter object holding the sum of the tables.
+    """
+    table = copy.copy(tables[0])
+    table.sparse = SparseTable(
+        tables[0].shape,
+        np.concatenate([t.sparse.rows for t in tables]),
+        np.concatenate([t.sparse.cols for t in tables]),
+        np.concatenate([t.sparse.values for t in tables]),
+    )
+    return table
+
+
+class SparseTable:
+    """Class to represent a scatter table in coordinate (COO) format. Only the occupied cells are stored, so the
+    memory of a table scales with its occupied cells and not with its number of bins."""
+
+    def __init__(self, shape, rows, cols, values):
+        """__init__ Initialises the SparseTable class. Values of repeated cells are added up, in the order given.
+
+        Args:
+            shape (tuple): (rows, columns) shape of the table.
+            rows (numpy.ndarray): Row of every value.
+            cols (numpy.ndarray): Column of every value.
+            values (numpy.ndarray): Values. Zero values are dropped.
+        """
+        self.shape = tuple(shape)
+        flat = np.asarray(rows, dtype=np.int64) * self.shape[1] + np.asarray(cols, dtype=np.int64)
+        values = np.asarray(values, dtype=float)
+        cells, inverse = np.unique(flat, return_inverse=True)
+        if len(cells) < len(flat):
+            values = np.bincount(inverse, weights=values, minlength=len(cells))
+        else:
+            values = values[np.argsort(flat, kind="stable")]
+        keep = values != 0
+        index_dtype = np.int32 if max(self.shape) < 2 ** 31 else np.int64
+        self.rows = (cells[keep] // self.shape[1]).astype(index_dtype)
+        self.cols = (cells[keep] % self.shape[1]).astype(index_dtype)
+        self.values = values[keep]
+
+    @property
+    def nnz(self):
+        """nnz Returns the number of occupied cells."""
+        return len(self.values)
+
+    def occupied(self):
+        """occupied Returns a boolean 2D array, True for the occupied cells."""
+        mask = np.zeros(self.shape, dtype=bool)
+        mask[self.rows, self.cols] = True
+        return mask
+
+    def toarray(self):
+        """toarray Returns the table as a dense 2D array. Empty cells are NaN."""
+        dense = np.full(self.shape, np.nan)
+        dense[self.rows, self.cols] = self.values
+        return dense
+
+    def sum(self, axis=None):
+        """sum Returns the sum of the table, or of its columns (axis=0) or rows (axis=1). Empty cells count as 0.
+
+        Args:
+            axis (int, optional): Axis to sum along. Defaults to None (sum of all the cells).
+
+        Returns:
+            [float or numpy.ndarray]: Sum.
+        """
+        if axis is None:
+            return self.values.sum()
+        if axis == 0:
+            return np.bincount(self.cols, weights=self.values, minlength=self.shape[1])
+        return np.bincount(self.rows, weights=self.values, minlength=self.shape[0])
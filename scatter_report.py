@@ -1,886 +1,767 @@
+import itertools
+import os
+import sys
 import time
 import xlsxwriter
 
-from scatter import Scatter
+import numpy as np
 
+from export import export_scatter_tables
+from metocean_data import SECTOR_GROUPS
+from scatter import Scatter, ScatterSheet, merge_tables
+from percentile import Percentile
+from persistence import Persistence
+from profiling import safe_name
+from progress import Progress
+from weibull import Weibull
 
-def print_scatter_report(metocean_data):
+# Bin variables affected by each of the bin size settings of the config file
+BIN_SIZE_GROUPS = {
+    "wind_bin_size": ["WS", "WS_10"],
+    "wave_height_bin_size": ["Hs", "Hs_W", "Hs_S"],
+    "wave_period_bin_size": ["Tp", "Tz", "Tp_W", "Tz_W", "Tp_S", "Tz_S"],
+}
+
+
+class TableFactory:
+    """Class to create the Scatter tables of a report, at the config bin sizes or re-binned from them."""
+
+    def __init__(self, metocean_data, bin_sizes=None, cache=None):
+        """__init__ Initialises the TableFactory class.
+
+        Args:
+            metocean_data (MetoceanData): A MetoceanData object from the metocean_data module.
+            bin_sizes (dict, optional): Dictionary of {bin size setting: bin size} to re-bin the tables to, e.g. {"wind_bin_size": 2}.
+                Bin sizes must be integer multiples of the ones in the config file. Defaults to None (config bin sizes).
+            cache (dict, optional): Dictionary of tables counted at the config bin sizes. Share it between factories so that
+                every bin size variant comes out of the same counting pass. Defaults to None.
+        """
+        self.metocean_data = metocean_data
+        self.cache = {} if cache is None else cache
+        # Progress object the completed tables are reported to. None to print a message per table instead.
+        self.progress = None
+        self.factors = get_bin_factors(metocean_data, bin_sizes)
+        # Bin centres of the report, coarser than metocean_data.bins if re-binned
+        self.bins = {}
+        for header, centres in metocean_data.bins.items():
+            if self.factors.get(header, 1) == 1:
+                self.bins[header] = centres
+            else:
+                size = 2 * centres[0] * self.factors[header]
+                n_bins = int(np.ceil(len(centres) / self.factors[header]))
+                self.bins[header] = np.arange(n_bins) * size + size / 2
+
+    def scatter(self, variables, keys=[False, False], x_filt=False, y_filt=False):
+        """scatter Returns the Scatter table at the report bin sizes, re-binned from the cached table at the
+        config bin sizes. Same arguments as Scatter.__init__.
+
+        Returns:
+            [Scatter]: Scatter table.
+        """
+        x_factor = self.factors.get(variables[0].replace("_bins", ""), 1)
+        y_factor = self.factors.get(variables[1].replace("_bins", ""), 1)
+        # Tables filtered by a re-binned variable are the sum of the tables of the fine bins within it
+        filt_factor = self.factors.get(str(keys[0]).replace("_bins", ""), 1)
+        if keys[0] and "_bins" in keys[0] and filt_factor != 1:
+            fine = get_fine_bins(
+                self.metocean_data.bins[keys[0].replace("_bins", "")],
+                x_filt,
+                filt_factor,
+            )
+            if len(fine) == 0:
+                # Coarse bins beyond the range of the filter variable hold no data
+                fine = [x_filt]
+            # Each of the fine tables is a unit of work of its own
+            if self.progress is not None:
+                self.progress.add_total(len(fine) - 1)
+            table = merge_tables(
+                [self.cached(variables, keys, b, y_filt) for b in fine]
+            )
+            table.x_filt = x_filt
+        else:
+            table = self.cached(variables, keys, x_filt, y_filt)
+        return table.rebin(x_factor, y_factor)
+
+    def cached(self, variables, keys, x_filt, y_filt):
+        """cached Returns the Scatter table at the config bin sizes, counting it only once."""
+        key = (tuple(variables), tuple(keys), x_filt, y_filt)
+        if key not in self.cache:
+            self.cache[key] = Scatter(
+                self.metocean_data, variables, keys, x_filt, y_filt, self.progress
+            )
+        elif self.progress is not None:
+            self.progress.update(1)
+        return self.cache[key]
+
+
+def print_scatter_report(metocean_data, bin_sizes=None, cache=None, suffix=""):
     """print_scatter_report Function that takes the metocean_data object and creates all the necessary
     scatter tables and prints them into an excel .xlsx scatter table report.
 
     Args:
         metocean_data (MetoceanData): A MetoceanData object from the metocean_data module.
+        bin_sizes (dict, optional): Dictionary of {bin size setting: bin size} to re-bin the report to, e.g. {"wind_bin_size": 2}.
+            Bin sizes must be integer multiples of the ones in the config file. Defaults to None (config bin sizes).
+        cache (dict, optional): Dictionary of tables counted at the config bin sizes. Share it between calls so that
+            every bin size variant comes out of the same counting pass. Defaults to None.
+        suffix (str, optional): Text appended to the report file name. Defaults to "".
+
+    With report_workers set in the config file, every grid sheet is written to a workbook of its own by a pool of
+    worker processes as soon as its tables are calculated. The report workbook then holds the other sheets and an
+    Index sheet linking to every sheet.
     """
 
-    start_time = time.perf_counter()
-
-    with xlsxwriter.Workbook(
-        f"{metocean_data.config['project']}_Metocean_Scatter_Tables.xlsx"
-    ) as wb:
-        tables = []
-        # -----------------------------------------------------------------------------------------
-        # ------------------------Wind Speed Vs Wind Direction Tables (Omni)-----------------------
-        # -----------------------------------------------------------------------------------------
-        # If wind data has been input
-        if metocean_data.config["wind_status"]:
-            # Make Wind Speed Vs Wind Direction Scatter Tables
-            table = Scatter(metocean_data, ["WnD_sectors", "WS_bins"])
-            ws = wb.add_worksheet("WndSpd-WndDir (@HH)")
-            ws.hide_gridlines(2)
-            table.print_table(wb, ws, row=1, col=1)
-            # If wind @ 10m MSL has been input
-            if metocean_data.config["10m"]:
-                table = Scatter(metocean_data, ["WnD_10_sectors", "WS_10_bins"])
-                ws = wb.add_worksheet("WndSpd-WndDir (@10m)")
-                ws.hide_gridlines(2)
-                table.print_table(wb, ws, row=1, col=1)
-        # -----------------------------------------------------------------------------------------
-        # ---------------------------Hs Vs Wave Direction Tables (Omni)----------------------------
-        # -----------------------------------------------------------------------------------------
-        # If wave data has been input
-        if metocean_data.config["wave_status"]:
-            table = Scatter(metocean_data, ["WvD_sectors", "Hs_bins"])
-            tables.append(table)
-            # If spectral wave components have been input
-            if metocean_data.config["wave_spectral"]:
-                table = Scatter(metocean_data, ["WvD_S_sectors", "Hs_S_bins"])
-                tables.append(table)
-                table = Scatter(metocean_data, ["WvD_W_sectors", "Hs_W_bins"])
-                tables.append(table)
-            ws = wb.add_worksheet("Hs-WaveDir")
-            ws.hide_gridlines(2)
-            for i, table in enumerate(tables):
-                table.print_table(
-                    wb,
-                    ws,
-                    row=1,
-                    col=(1 + i * (5 + table.table.shape[1])),
+    profiler = metocean_data.profiler
+    factory = TableFactory(metocean_data, bin_sizes, cache)
+    if bin_sizes:
+        suffix += "_" + "_".join(
+            f"{setting.replace('_bin_size', '')}{size:g}"
+            for setting, size in bin_sizes.items()
+        )
+
+    basename = f"{metocean_data.config['project']}_Metocean_Scatter_Tables{suffix}"
+    filename = basename + ".xlsx"
+    exports = metocean_data.config.get("table_exports")
+    # Scatter tables of every sheet, kept for the table exports
+    scatter_sheets = []
+    profile = metocean_data.config.get("report_profile", "full")
+    constant_memory = metocean_data.config.get("constant_memory", False)
+    workers = metocean_data.config.get("report_workers")
+    write_time = 0
+    with profiler.span(f"scatter_report{suffix}") as report_span:
+        wb = xlsxwriter.Workbook(filename, {"constant_memory": constant_memory})
+        plan = get_report_plan(metocean_data, factory.bins)
+        if workers:
+            # Added first so that it is the first sheet, written once the workers are done
+            index = wb.add_worksheet("Index")
+            pool = metocean_data.backend.process_pool(workers)
+        # (sheet name, workbook, number of tables, future of the worker writing it) of every sheet
+        parts = []
+        with Progress(count_tables(plan), f"Scatter report{suffix}") as progress:
+            factory.progress = progress
+            for sheet in plan:
+                with profiler.span(sheet[0]):
+                    with profiler.span("compute", rows=metocean_data.data.shape[0]):
+                        tables = make_sheet_tables(metocean_data, sheet, factory)
+                    if workers and sheet[1] == "grid":
+                        sheet_name = "_".join(filter(None, safe_name(sheet[0]).split("_")))
+                        part = f"{basename}_{sheet_name}.xlsx"
+                        with profiler.span("submit") as write_span:
+                            future = pool.submit(
+                                write_workbook, part, [(sheet, tables)], profile, constant_memory
+                            )
+                    else:
+                        part, future = filename, None
+                        with profiler.span("write") as write_span:
+                            write_sheet(wb, sheet, tables, profile)
+                    write_time += write_span["wall_time"]
+                    parts.append((sheet[0], part, count_tables([sheet]), future))
+                    if exports and sheet[1] in ["row", "grid"]:
+                        if sheet[1] == "grid":
+                            tables = [table for row in tables for table in row]
+                        scatter_sheets.append((sheet[0], tables))
+        if workers:
+            with profiler.span("workers") as workers_span:
+                # Time taken by the worker writing every sheet
+                workers_span["sheets"] = {
+                    name: future.result()
+                    for name, part, n_tables, future in parts
+                    if future is not None
+                }
+                pool.shutdown()
+            write_time += workers_span["wall_time"]
+            write_index(wb, index, parts)
+        with profiler.span("save") as save_span:
+            wb.close()
+        write_time += save_span["wall_time"]
+        report_span["profile"] = profile
+        report_span["workbooks"] = list(
+            dict.fromkeys([filename] + [part for name, part, n_tables, future in parts])
+        )
+        report_span["file_size_mb"] = (
+            sum(os.path.getsize(part) for part in report_span["workbooks"]) / 1024 ** 2
+        )
+        report_span["write_time"] = write_time
+        if exports:
+            with profiler.span("export"):
+                export_scatter_tables(scatter_sheets, basename, exports)
+
+    print(f"Report Finished in {round(report_span['wall_time']/60, 2)} minutes.")
+    if len(report_span["workbooks"]) > 1:
+        filename += f" and {len(report_span['workbooks']) - 1} linked workbooks"
+    print(
+        f"{filename}: {report_span['file_size_mb']:.1f} MB, written in {write_time:.1f} s "
+        f"({profile} profile)."
+    )
+
+
+def get_report_plan(metocean_data, bins):
+    """get_report_plan Lists the sheets of the scatter table report and the tables within them, in order.
+
+    Each sheet is a tuple of (sheet name, kind, contents):
+        "row": contents is a list of Scatter arguments (variables, keys, x_filt, y_filt), printed side by side.
+        "grid": contents is a list of rows of Scatter arguments, printed as a grid.
+        "weibull": contents is a list of [wind speed, wind direction sector] variables.
+        "percentile": contents is a list of (variables, percentiles, key) arguments.
+        "persistence": contents is a (limits, durations) tuple.
+
+    Args:
+        metocean_data (MetoceanData): A MetoceanData object from the metocean_data module.
+        bins (dict): Bin centres of the report, as in TableFactory.bins.
+
+    Returns:
+        [list]: List of sheets.
+    """
+    config = metocean_data.config
+    sheets = []
+
+    def omni(variables):
+        return (variables, [False, False], False, False)
+
+    def misalignment(x_var, y_var, wave_key, wind_key):
+        # Omnidirectional table first
+        rows = [[omni([x_var, y_var])]]
+        # Omnidirectional wind, directional wave tables
+        rows.append(
+            [
+                ([x_var, y_var], [wave_key, False], wave_sect + 1, False)
+                for wave_sect in range(config["wave_sectors"])
+            ]
+        )
+        # Omnidirecitonal wave, directional wind tables
+        rows.append(
+            [
+                ([x_var, y_var], [False, wind_key], False, wind_sect + 1)
+                for wind_sect in range(config["wind_sectors"])
+            ]
+        )
+        # Wind-wave misalignment tables
+        for wind_sect in range(config["wind_sectors"]):
+            rows.append(
+                [
+                    ([x_var, y_var], [wave_key, wind_key], wind_sect + 1, wave_sect + 1)
+                    for wave_sect in range(config["wave_sectors"])
+                ]
+            )
+        return rows
+
+    def by_wind_speed(wind_bins, sectors, ws_key):
+        rows = []
+        for wind_bin in wind_bins:
+            row = [(["WvD_sectors", sectors], [ws_key, False], wind_bin, False)]
+            # If Spectral wave components have been input
+            if config["wave_spectral"]:
+                row.append((["WvD_S_sectors", sectors], [ws_key, False], wind_bin, False))
+                row.append((["WvD_W_sectors", sectors], [ws_key, False], wind_bin, False))
+            rows.append(row)
+        return rows
+
+    # Spectral wave components, in print order
+    seas = [("", "Totalsea")]
+    if config["wave_status"] and config["wave_spectral"]:
+        seas += [("_S", "Swell"), ("_W", "Windsea")]
+
+    # -----------------------------------------------------------------------------------------
+    # ------------------------Wind Speed Vs Wind Direction Tables (Omni)-----------------------
+    # -----------------------------------------------------------------------------------------
+    if config["wind_status"]:
+        sheets.append(
+            ("WndSpd-WndDir (@HH)", "row", [omni(["WnD_sectors", "WS_bins"])])
+        )
+        if config["10m"]:
+            sheets.append(
+                ("WndSpd-WndDir (@10m)", "row", [omni(["WnD_10_sectors", "WS_10_bins"])])
+            )
+        # Directional Weibull fits of the wind speed
+        weibulls = [["WS", "WnD_sectors"]]
+        if config["10m"]:
+            weibulls.append(["WS_10", "WnD_10_sectors"])
+        sheets.append(("Weibull", "weibull", weibulls))
+    # -----------------------------------------------------------------------------------------
+    # ---------------------------Hs Vs Wave Direction Tables (Omni)----------------------------
+    # -----------------------------------------------------------------------------------------
+    if config["wave_status"]:
+        sheets.append(
+            (
+                "Hs-WaveDir",
+                "row",
+                [omni([f"WvD{s}_sectors", f"Hs{s}_bins"]) for s, _ in seas],
+            )
+        )
+
+    # If both wind and wave data have been input
+    if config["wind_status"] and config["wave_status"]:
+        # -------------------------------Hs vs Wind Direction Tables (Omni)------------------------
+        heights = ["HH", "10m"] if config["10m"] else ["HH"]
+        for height in heights:
+            wind = "" if height == "HH" else "_10"
+            sheets.append(
+                (
+                    f"Hs-WindDir (@{height})",
+                    "row",
+                    [omni([f"WnD{wind}_sectors", f"Hs{s}_bins"]) for s, _ in seas],
                 )
-            tables.clear()
-
-        # If both wind and wave data have been input
-        if metocean_data.config["wind_status"] and metocean_data.config["wave_status"]:
-            # -----------------------------------------------------------------------------------------
-            # -------------------------Hs vs Wind Direction (@HH) Tables (Omni)------------------------
-            # -----------------------------------------------------------------------------------------
-            table = Scatter(metocean_data, ["WnD_sectors", "Hs_bins"])
-            tables.append(table)
-            # If spectral wave components have been input
-            if metocean_data.config["wave_spectral"]:
-                table = Scatter(metocean_data, ["WnD_sectors", "Hs_S_bins"])
-                tables.append(table)
-                table = Scatter(metocean_data, ["WnD_sectors", "Hs_W_bins"])
-                tables.append(table)
-            ws = wb.add_worksheet("Hs-WindDir (@HH)")
-            ws.hide_gridlines(2)
-            for i, table in enumerate(tables):
-                table.print_table(
-                    wb,
-                    ws,
-                    row=1,
-                    col=(1 + i * (5 + table.table.shape[1])),
+            )
+        # ---------------------------Wind Speed vs Hs Tables (misalignments)-----------------------
+        for height in heights:
+            wind = "" if height == "HH" else "_10"
+            for s, sea in seas:
+                sheets.append(
+                    (
+                        f"WndSpd (@{height})-Hs ({sea})",
+                        "grid",
+                        misalignment(
+                            f"Hs{s}_bins",
+                            f"WS{wind}_bins",
+                            f"WvD{s}_sectors",
+                            f"WnD{wind}_sectors",
+                        ),
+                    )
                 )
-            tables.clear()
-            if metocean_data.config["10m"]:
-                # -----------------------------------------------------------------------------------------
-                # -------------------------Hs vs Wind Direction (@10m) Tables (Omni)-----------------------
-                # -----------------------------------------------------------------------------------------
-                table = Scatter(metocean_data, ["WnD_10_sectors", "Hs_bins"])
-                tables.append(table)
-                # If spectral wave components have been input
-                if metocean_data.config["wave_spectral"]:
-                    table = Scatter(metocean_data, ["WnD_10_sectors", "Hs_S_bins"])
-                    tables.append(table)
-                    table = Scatter(metocean_data, ["WnD_10_sectors", "Hs_W_bins"])
-                    tables.append(table)
-                ws = wb.add_worksheet("Hs-WindDir (@10m)")
-                ws.hide_gridlines(2)
-                for i, table in enumerate(tables):
-                    table.print_table(
-                        wb,
-                        ws,
-                        row=1,
-                        col=(1 + i * (5 + table.table.shape[1])),
+        # ------------------------------Hs Vs Tp Tables (misalignments)----------------------------
+        for height in heights:
+            wind = "" if height == "HH" else "_10"
+            for s, sea in seas:
+                sheets.append(
+                    (
+                        f"Hs-Tp ({sea}) (Wind @{height})",
+                        "grid",
+                        misalignment(
+                            f"Tp{s}_bins",
+                            f"Hs{s}_bins",
+                            f"WvD{s}_sectors",
+                            f"WnD{wind}_sectors",
+                        ),
                     )
-                tables.clear()
-            # -----------------------------------------------------------------------------------------
-            # ----------------Wind Speed (@HH) vs Hs (Totalsea) Tables (misalignments)-----------------
-            # -----------------------------------------------------------------------------------------
-            # Omnidirectional table first
-            tables.append([])
-            table = Scatter(metocean_data, ["Hs_bins", "WS_bins"])
-            tables[0].append(table)
-            tables.append([])
-            # Omnidirectional wind, directional wave tables
-            for wave_sect in range(metocean_data.config["wave_sectors"]):
-                table = Scatter(
-                    metocean_data,
-                    ["Hs_bins", "WS_bins"],
-                    keys=["WvD_sectors", False],
-                    x_filt=wave_sect + 1,
                 )
-                tables[1].append(table)
-            tables.append([])
-            # Omnidirecitonal wave, directional wind tables
-            for wind_sect in range(metocean_data.config["wind_sectors"]):
-                table = Scatter(
-                    metocean_data,
-                    ["Hs_bins", "WS_bins"],
-                    keys=[False, "WnD_sectors"],
-                    y_filt=wind_sect + 1,
+        # ----------------------------Wind Direction vs Wave Direction Tables----------------------
+        sheets.append(
+            (
+                "WindDir-WaveDir (@HH)",
+                "row",
+                [omni([f"WvD{s}_sectors", "WnD_sectors"]) for s, _ in seas],
+            )
+        )
+        sheets.append(
+            (
+                "WindDir-WaveDir by WndSpd (@HH)",
+                "grid",
+                by_wind_speed(bins["WS"], "WnD_sectors", "WS_bins"),
+            )
+        )
+        if config["10m"]:
+            sheets.append(
+                (
+                    "WindDir-WaveDir (@10m)",
+                    "row",
+                    [omni([f"WvD{s}_sectors", "WnD_10_sectors"]) for s, _ in seas],
                 )
-                tables[2].append(table)
-            # 144 wind-wave misalignment tables
-            for wind_sect in range(metocean_data.config["wind_sectors"]):
-                tables.append([])
-                for wave_sect in range(metocean_data.config["wave_sectors"]):
-                    table = Scatter(
-                        metocean_data,
-                        ["Hs_bins", "WS_bins"],
-                        ["WvD_sectors", "WnD_sectors"],
-                        x_filt=wind_sect + 1,
-                        y_filt=wave_sect + 1,
-                    )
-                    tables[3 + wind_sect].append(table)
-            ws = wb.add_worksheet("WndSpd (@HH)-Hs (Totalsea)")
-            ws.hide_gridlines(2)
-            for i, row in enumerate(tables):
-                for j, table in enumerate(row):
-                    table.print_table(
-                        wb,
-                        ws,
-                        row=(1 + i * (6 + table.table.shape[0])),
-                        col=(1 + j * (5 + table.table.shape[1])),
-                    )
-            tables.clear()
-            if metocean_data.config["wave_spectral"]:
-                # -----------------------------------------------------------------------------------------
-                # -----------------Wind Speed (@HH) vs Hs (Swell) Tables (misalignments)-------------------
-                # -----------------------------------------------------------------------------------------
-                # Omnidirectional table first
-                tables.append([])
-                table = Scatter(metocean_data, ["Hs_S_bins", "WS_bins"])
-                tables[0].append(table)
-                tables.append([])
-                # Omnidirectional wind, directional wave tables
-                for wave_sect in range(metocean_data.config["wave_sectors"]):
-                    table = Scatter(
-                        metocean_data,
-                        ["Hs_S_bins", "WS_bins"],
-                        keys=["WvD_S_sectors", False],
-                        x_filt=wave_sect + 1,
-                    )
-                    tables[1].append(table)
-                tables.append([])
-                # Omnidirecitonal wave, directional wind tables
-                for wind_sect in range(metocean_data.config["wind_sectors"]):
-                    table = Scatter(
-                        metocean_data,
-                        ["Hs_S_bins", "WS_bins"],
-                        keys=[False, "WnD_sectors"],
-                        y_filt=wind_sect + 1,
-                    )
-                    tables[2].append(table)
-                # 144 wind-wave misalignment tables
-                for wind_sect in range(metocean_data.config["wind_sectors"]):
-                    tables.append([])
-                    for wave_sect in range(metocean_data.config["wave_sectors"]):
-                        table = Scatter(
-                            metocean_data,
-                            ["Hs_S_bins", "WS_bins"],
-                            ["WvD_S_sectors", "WnD_sectors"],
-                            x_filt=wind_sect + 1,
-                            y_filt=wave_sect + 1,
-                        )
-                        tables[3 + wind_sect].append(table)
-                ws = wb.add_worksheet("WndSpd (@HH)-Hs (Swell)")
-                ws.hide_gridlines(2)
-                for i, row in enumerate(tables):
-                    for j, table in enumerate(row):
-                        table.print_table(
-                            wb,
-                            ws,
-                            row=(1 + i * (6 + table.table.shape[0])),
-                            col=(1 + j * (5 + table.table.shape[1])),
-                        )
-                tables.clear()
-                # -----------------------------------------------------------------------------------------
-                # -----------------Wind Speed (@HH) vs Hs (Windsea) Tables (misalignments)-----------------
-                # -----------------------------------------------------------------------------------------
-                # Omnidirectional table first
-                tables.append([])
-                table = Scatter(metocean_data, ["Hs_W_bins", "WS_bins"])
-                tables[0].append(table)
-                tables.append([])
-                # Omnidirectional wind, directional wave tables
-                for wave_sect in range(metocean_data.config["wave_sectors"]):
-                    table = Scatter(
-                        metocean_data,
-                        ["Hs_W_bins", "WS_bins"],
-                        keys=["WvD_W_sectors", False],
-                        x_filt=wave_sect + 1,
-                    )
-                    tables[1].append(table)
-                tables.append([])
-                # Omnidirecitonal wave, directional wind tables
-                for wind_sect in range(metocean_data.config["wind_sectors"]):
-                    table = Scatter(
-                        metocean_data,
-                        ["Hs_W_bins", "WS_bins"],
-                        keys=[False, "WnD_sectors"],
-                        y_filt=wind_sect + 1,
-                    )
-                    tables[2].append(table)
-                # 144 wind-wave misalignment tables
-                for wind_sect in range(metocean_data.config["wind_sectors"]):
-                    tables.append([])
-                    for wave_sect in range(metocean_data.config["wave_sectors"]):
-                        table = Scatter(
-                            metocean_data,
-                            ["Hs_W_bins", "WS_bins"],
-                            ["WvD_W_sectors", "WnD_sectors"],
-                            x_filt=wind_sect + 1,
-                            y_filt=wave_sect + 1,
-                        )
-                        tables[3 + wind_sect].append(table)
-                ws = wb.add_worksheet("WndSpd (@HH)-Hs (Windsea)")
-                ws.hide_gridlines(2)
-                for i, row in enumerate(tables):
-                    for j, table in enumerate(row):
-                        table.print_table(
-                            wb,
-                            ws,
-                            row=(1 + i * (6 + table.table.shape[0])),
-                            col=(1 + j * (5 + table.table.shape[1])),
-                        )
-                tables.clear()
-            if metocean_data.config["10m"]:
-                # -----------------------------------------------------------------------------------------
-                # ----------------Wind Speed (@10m) vs Hs (Totalsea) Tables (misalignments)----------------
-                # -----------------------------------------------------------------------------------------
-                # Omnidirectional table first
-                tables.append([])
-                table = Scatter(metocean_data, ["Hs_bins", "WS_10_bins"])
-                tables[0].append(table)
-                tables.append([])
-                # Omnidirectional wind, directional wave tables
-                for wave_sect in range(metocean_data.config["wave_sectors"]):
-                    table = Scatter(
-                        metocean_data,
-                        ["Hs_bins", "WS_10_bins"],
-                        keys=["WvD_sectors", False],
-                        x_filt=wave_sect + 1,
-                    )
-                    tables[1].append(table)
-                tables.append([])
-                # Omnidirecitonal wave, directional wind tables
-                for wind_sect in range(metocean_data.config["wind_sectors"]):
-                    table = Scatter(
-                        metocean_data,
-                        ["Hs_bins", "WS_10_bins"],
-                        keys=[False, "WnD_10_sectors"],
-                        y_filt=wind_sect + 1,
-                    )
-                    tables[2].append(table)
-                # 144 wind-wave misalignment tables
-                for wind_sect in range(metocean_data.config["wind_sectors"]):
-                    tables.append([])
-                    for wave_sect in range(metocean_data.config["wave_sectors"]):
-                        table = Scatter(
-                            metocean_data,
-                            ["Hs_bins", "WS_10_bins"],
-                            ["WvD_sectors", "WnD_10_sectors"],
-                            x_filt=wind_sect + 1,
-                            y_filt=wave_sect + 1,
-                        )
-                        tables[3 + wind_sect].append(table)
-                ws = wb.add_worksheet("WndSpd (@10m)-Hs (Totalsea)")
-                ws.hide_gridlines(2)
-                for i, row in enumerate(tables):
-                    for j, table in enumerate(row):
-                        table.print_table(
-                            wb,
-                            ws,
-                            row=(1 + i * (6 + table.table.shape[0])),
-                            col=(1 + j * (5 + table.table.shape[1])),
-                        )
-                tables.clear()
-                if metocean_data.config["wave_spectral"]:
-                    # -----------------------------------------------------------------------------------------
-                    # -----------------Wind Speed (@10m) vs Hs (Swell) Tables (misalignments)------------------
-                    # -----------------------------------------------------------------------------------------
-                    # Omnidirectional table first
-                    tables.append([])
-                    table = Scatter(metocean_data, ["Hs_S_bins", "WS_10_bins"])
-                    tables[0].append(table)
-                    tables.append([])
-                    # Omnidirectional wind, directional wave tables
-                    for wave_sect in range(metocean_data.config["wave_sectors"]):
-                        table = Scatter(
-                            metocean_data,
-                            ["Hs_S_bins", "WS_10_bins"],
-                            keys=["WvD_S_sectors", False],
-                            x_filt=wave_sect + 1,
-                        )
-                        tables[1].append(table)
-                    tables.append([])
-                    # Omnidirecitonal wave, directional wind tables
-                    for wind_sect in range(metocean_data.config["wind_sectors"]):
-                        table = Scatter(
-                            metocean_data,
-                            ["Hs_S_bins", "WS_10_bins"],
-                            keys=[False, "WnD_10_sectors"],
-                            y_filt=wind_sect + 1,
-                        )
-                        tables[2].append(table)
-                    # 144 wind-wave misalignment tables
-                    for wind_sect in range(metocean_data.config["wind_sectors"]):
-                        tables.append([])
-                        for wave_sect in range(metocean_data.config["wave_sectors"]):
-                            table = Scatter(
-                                metocean_data,
-                                ["Hs_S_bins", "WS_10_bins"],
-                                ["WvD_S_sectors", "WnD_10_sectors"],
-                                x_filt=wind_sect + 1,
-                                y_filt=wave_sect + 1,
-                            )
-                            tables[3 + wind_sect].append(table)
-                    ws = wb.add_worksheet("WndSpd (@10m)-Hs (Swell)")
-                    ws.hide_gridlines(2)
-                    for i, row in enumerate(tables):
-                        for j, table in enumerate(row):
-                            table.print_table(
-                                wb,
-                                ws,
-                                row=(1 + i * (6 + table.table.shape[0])),
-                                col=(1 + j * (5 + table.table.shape[1])),
-                            )
-                    tables.clear()
-                    # -----------------------------------------------------------------------------------------
-                    # -----------------Wind Speed (@10m) vs Hs (Windsea) Tables (misalignments)----------------
-                    # -----------------------------------------------------------------------------------------
-                    # Omnidirectional table first
-                    tables.append([])
-                    table = Scatter(metocean_data, ["Hs_W_bins", "WS_10_bins"])
-                    tables[0].append(table)
-                    tables.append([])
-                    # Omnidirectional wind, directional wave tables
-                    for wave_sect in range(metocean_data.config["wave_sectors"]):
-                        table = Scatter(
-                            metocean_data,
-                            ["Hs_W_bins", "WS_10_bins"],
-                            keys=["WvD_W_sectors", False],
-                            x_filt=wave_sect + 1,
-                        )
-                        tables[1].append(table)
-                    tables.append([])
-                    # Omnidirecitonal wave, directional wind tables
-                    for wind_sect in range(metocean_data.config["wind_sectors"]):
-                        table = Scatter(
-                            metocean_data,
-                            ["Hs_W_bins", "WS_10_bins"],
-                            keys=[False, "WnD_10_sectors"],
-                            y_filt=wind_sect + 1,
-                        )
-                        tables[2].append(table)
-                    # 144 wind-wave misalignment tables
-                    for wind_sect in range(metocean_data.config["wind_sectors"]):
-                        tables.append([])
-                        for wave_sect in range(metocean_data.config["wave_sectors"]):
-                            table = Scatter(
-                                metocean_data,
-                                ["Hs_W_bins", "WS_10_bins"],
-                                ["WvD_W_sectors", "WnD_10_sectors"],
-                                x_filt=wind_sect + 1,
-                                y_filt=wave_sect + 1,
-                            )
-                            tables[3 + wind_sect].append(table)
-                    ws = wb.add_worksheet("WndSpd (@10m)-Hs (Windsea)")
-                    ws.hide_gridlines(2)
-                    for i, row in enumerate(tables):
-                        for j, table in enumerate(row):
-                            table.print_table(
-                                wb,
-                                ws,
-                                row=(1 + i * (6 + table.table.shape[0])),
-                                col=(1 + j * (5 + table.table.shape[1])),
-                            )
-                    tables.clear()
-            # -----------------------------------------------------------------------------------------
-            # ---------------------Hs Vs Tp (Totalsea) Tables (@ HH misalignments)---------------------
-            # -----------------------------------------------------------------------------------------
-            # Omnidirectional table first
-            tables.append([])
-            table = Scatter(metocean_data, ["Tp_bins", "Hs_bins"])
-            tables[0].append(table)
-            tables.append([])
-            # Omnidirectional wind, directional wave tables
-            for wave_sect in range(metocean_data.config["wave_sectors"]):
-                table = Scatter(
-                    metocean_data,
-                    ["Tp_bins", "Hs_bins"],
-                    keys=["WvD_sectors", False],
-                    x_filt=wave_sect + 1,
+            )
+            sheets.append(
+                (
+                    "WindDir-WaveDir by WndSpd(@10m)",
+                    "grid",
+                    by_wind_speed(bins["WS"], "WnD_10_sectors", "WS_10_bins"),
                 )
-                tables[1].append(table)
-            tables.append([])
-            # Omnidirecitonal wave, directional wind tables
-            for wind_sect in range(metocean_data.config["wind_sectors"]):
-                table = Scatter(
-                    metocean_data,
-                    ["Tp_bins", "Hs_bins"],
-                    keys=[False, "WnD_sectors"],
-                    y_filt=wind_sect + 1,
+            )
+    # -----------------------------------------------------------------------------------------
+    # ------------------------Current Speed Vs Current Direction Tables (Omni)-----------------
+    # -----------------------------------------------------------------------------------------
+    if config["current_status"]:
+        components = [""]
+        if config["current_components"]:
+            components += ["_Tid", "_Res"]
+        for speed, name in [("SV", "Srfc"), ("DaV", "DpthAvg")]:
+            sheets.append(
+                (
+                    f"{name} CurrentSpd-CurrentDir",
+                    "row",
+                    [omni([f"CD{c}_sectors", f"{speed}{c}_bins"]) for c in components],
                 )
-                tables[2].append(table)
-            # 144 wind-wave misalignment tables
-            for wind_sect in range(metocean_data.config["wind_sectors"]):
-                tables.append([])
-                for wave_sect in range(metocean_data.config["wave_sectors"]):
-                    table = Scatter(
-                        metocean_data,
-                        ["Tp_bins", "Hs_bins"],
-                        ["WvD_sectors", "WnD_sectors"],
-                        x_filt=wind_sect + 1,
-                        y_filt=wave_sect + 1,
-                    )
-                    tables[3 + wind_sect].append(table)
-            ws = wb.add_worksheet("Hs-Tp (Totalsea) (Wind @HH)")
-            ws.hide_gridlines(2)
-            for i, row in enumerate(tables):
-                for j, table in enumerate(row):
-                    table.print_table(
-                        wb,
-                        ws,
-                        row=(1 + i * (6 + table.table.shape[0])),
-                        col=(1 + j * (5 + table.table.shape[1])),
-                    )
-            tables.clear()
-            if metocean_data.config["wave_spectral"]:
-                # -----------------------------------------------------------------------------------------
-                # -----------------------Hs Vs Tp (Swell) Tables (@ HH misalignments)----------------------
-                # -----------------------------------------------------------------------------------------
-                # Omnidirectional table first
-                tables.append([])
-                table = Scatter(metocean_data, ["Tp_S_bins", "Hs_S_bins"])
-                tables[0].append(table)
-                tables.append([])
-                # Omnidirectional wind, directional wave tables
-                for wave_sect in range(metocean_data.config["wave_sectors"]):
-                    table = Scatter(
-                        metocean_data,
-                        ["Tp_S_bins", "Hs_S_bins"],
-                        keys=["WvD_S_sectors", False],
-                        x_filt=wave_sect + 1,
-                    )
-                    tables[1].append(table)
-                tables.append([])
-                # Omnidirecitonal wave, directional wind tables
-                for wind_sect in range(metocean_data.config["wind_sectors"]):
-                    table = Scatter(
-                        metocean_data,
-                        ["Tp_S_bins", "Hs_S_bins"],
-                        keys=[False, "WnD_sectors"],
-                        y_filt=wind_sect + 1,
-                    )
-                    tables[2].append(table)
-                # 144 wind-wave misalignment tables
-                for wind_sect in range(metocean_data.config["wind_sectors"]):
-                    tables.append([])
-                    for wave_sect in range(metocean_data.config["wave_sectors"]):
-                        table = Scatter(
-                            metocean_data,
-                            ["Tp_S_bins", "Hs_S_bins"],
-                            ["WvD_S_sectors", "WnD_sectors"],
-                            x_filt=wind_sect + 1,
-                            y_filt=wave_sect + 1,
-                        )
-                        tables[3 + wind_sect].append(table)
-                ws = wb.add_worksheet("Hs-Tp (Swell) (Wind @HH)")
-                ws.hide_gridlines(2)
-                for i, row in enumerate(tables):
-                    for j, table in enumerate(row):
-                        table.print_table(
-                            wb,
-                            ws,
-                            row=(1 + i * (6 + table.table.shape[0])),
-                            col=(1 + j * (5 + table.table.shape[1])),
-                        )
-                tables.clear()
-                # -----------------------------------------------------------------------------------------
-                # ----------------------Hs Vs Tp (Windsea) Tables (@ HH misalignments)---------------------
-                # -----------------------------------------------------------------------------------------
-                # Omnidirectional table first
-                tables.append([])
-                table = Scatter(metocean_data, ["Tp_W_bins", "Hs_W_bins"])
-                tables[0].append(table)
-                tables.append([])
-                # Omnidirectional wind, directional wave tables
-                for wave_sect in range(metocean_data.config["wave_sectors"]):
-                    table = Scatter(
-                        metocean_data,
-                        ["Tp_W_bins", "Hs_W_bins"],
-                        keys=["WvD_W_sectors", False],
-                        x_filt=wave_sect + 1,
-                    )
-                    tables[1].append(table)
-                tables.append([])
-                # Omnidirecitonal wave, directional wind tables
-                for wind_sect in range(metocean_data.config["wind_sectors"]):
-                    table = Scatter(
-                        metocean_data,
-                        ["Tp_W_bins", "Hs_W_bins"],
-                        keys=[False, "WnD_sectors"],
-                        y_filt=wind_sect + 1,
-                    )
-                    tables[2].append(table)
-                # 144 wind-wave misalignment tables
-                for wind_sect in range(metocean_data.config["wind_sectors"]):
-                    tables.append([])
-                    for wave_sect in range(metocean_data.config["wave_sectors"]):
-                        table = Scatter(
-                            metocean_data,
-                            ["Tp_W_bins", "Hs_W_bins"],
-                            ["WvD_W_sectors", "WnD_sectors"],
-                            x_filt=wind_sect + 1,
-                            y_filt=wave_sect + 1,
-                        )
-                        tables[3 + wind_sect].append(table)
-                ws = wb.add_worksheet("Hs-Tp (Windsea) (Wind @HH)")
-                ws.hide_gridlines(2)
-                for i, row in enumerate(tables):
-                    for j, table in enumerate(row):
-                        table.print_table(
-                            wb,
-                            ws,
-                            row=(1 + i * (6 + table.table.shape[0])),
-                            col=(1 + j * (5 + table.table.shape[1])),
-                        )
-                tables.clear()
-            if metocean_data.config["10m"]:
-                # -----------------------------------------------------------------------------------------
-                # --------------------Hs Vs Tp (Totalsea) Tables (@ 10m misalignments)---------------------
-                # -----------------------------------------------------------------------------------------
-                # Omnidirectional table first
-                tables.append([])
-                table = Scatter(metocean_data, ["Tp_bins", "Hs_bins"])
-                tables[0].append(table)
-                tables.append([])
-                # Omnidirectional wind, directional wave tables
-                for wave_sect in range(metocean_data.config["wave_sectors"]):
-                    table = Scatter(
-                        metocean_data,
-                        ["Tp_bins", "Hs_bins"],
-                        keys=["WvD_sectors", False],
-                        x_filt=wave_sect + 1,
-                    )
-                    tables[1].append(table)
-                tables.append([])
-                # Omnidirecitonal wave, directional wind tables
-                for wind_sect in range(metocean_data.config["wind_sectors"]):
-                    table = Scatter(
-                        metocean_data,
-                        ["Tp_bins", "Hs_bins"],
-                        keys=[False, "WnD_10_sectors"],
-                        y_filt=wind_sect + 1,
-                    )
-                    tables[2].append(table)
-                # 144 wind-wave misalignment tables
-                for wind_sect in range(metocean_data.config["wind_sectors"]):
-                    tables.append([])
-                    for wave_sect in range(metocean_data.config["wave_sectors"]):
-                        table = Scatter(
-                            metocean_data,
-                            ["Tp_bins", "Hs_bins"],
-                            ["WvD_sectors", "WnD_10_sectors"],
-                            x_filt=wind_sect + 1,
-                            y_filt=wave_sect + 1,
-                        )
-                        tables[3 + wind_sect].append(table)
-                ws = wb.add_worksheet("Hs-Tp (Totalsea) (Wind @10m)")
-                ws.hide_gridlines(2)
-                for i, row in enumerate(tables):
-                    for j, table in enumerate(row):
-                        table.print_table(
-                            wb,
-                            ws,
-                            row=(1 + i * (6 + table.table.shape[0])),
-                            col=(1 + j * (5 + table.table.shape[1])),
-                        )
-                tables.clear()
-                if metocean_data.config["wave_spectral"]:
-                    # -----------------------------------------------------------------------------------------
-                    # ----------------------Hs Vs Tp (Swell) Tables (@ 10m misalignments)----------------------
-                    # -----------------------------------------------------------------------------------------
-                    # Omnidirectional table first
-                    tables.append([])
-                    table = Scatter(metocean_data, ["Tp_S_bins", "Hs_S_bins"])
-                    tables[0].append(table)
-                    tables.append([])
-                    # Omnidirectional wind, directional wave tables
-                    for wave_sect in range(metocean_data.config["wave_sectors"]):
-                        table = Scatter(
-                            metocean_data,
-                            ["Tp_S_bins", "Hs_S_bins"],
-                            keys=["WvD_S_sectors", False],
-                            x_filt=wave_sect + 1,
-                        )
-                        tables[1].append(table)
-                    tables.append([])
-                    # Omnidirecitonal wave, directional wind tables
-                    for wind_sect in range(metocean_data.config["wind_sectors"]):
-                        table = Scatter(
-                            metocean_data,
-                            ["Tp_S_bins", "Hs_S_bins"],
-                            keys=[False, "WnD_10_sectors"],
-                            y_filt=wind_sect + 1,
-                        )
-                        tables[2].append(table)
-                    # 144 wind-wave misalignment tables
-                    for wind_sect in range(metocean_data.config["wind_sectors"]):
-                        tables.append([])
-                        for wave_sect in range(metocean_data.config["wave_sectors"]):
-                            table = Scatter(
-                                metocean_data,
-                                ["Tp_S_bins", "Hs_S_bins"],
-                                ["WvD_S_sectors", "WnD_10_sectors"],
-                                x_filt=wind_sect + 1,
-                                y_filt=wave_sect + 1,
-                            )
-                            tables[3 + wind_sect].append(table)
-                    ws = wb.add_worksheet("Hs-Tp (Swell) (Wind @10m)")
-                    ws.hide_gridlines(2)
-                    for i, row in enumerate(tables):
-                        for j, table in enumerate(row):
-                            table.print_table(
-                                wb,
-                                ws,
-                                row=(1 + i * (6 + table.table.shape[0])),
-                                col=(1 + j * (5 + table.table.shape[1])),
-                            )
-                    tables.clear()
-                    # -----------------------------------------------------------------------------------------
-                    # ----------------------Hs Vs Tp (Windsea) Tables (@ 10m misalignments)--------------------
-                    # -----------------------------------------------------------------------------------------
-                    # Omnidirectional table first
-                    tables.append([])
-                    table = Scatter(metocean_data, ["Tp_W_bins", "Hs_W_bins"])
-                    tables[0].append(table)
-                    tables.append([])
-                    # Omnidirectional wind, directional wave tables
-                    for wave_sect in range(metocean_data.config["wave_sectors"]):
-                        table = Scatter(
-                            metocean_data,
-                            ["Tp_W_bins", "Hs_W_bins"],
-                            keys=["WvD_W_sectors", False],
-                            x_filt=wave_sect + 1,
-                        )
-                        tables[1].append(table)
-                    tables.append([])
-                    # Omnidirecitonal wave, directional wind tables
-                    for wind_sect in range(metocean_data.config["wind_sectors"]):
-                        table = Scatter(
-                            metocean_data,
-                            ["Tp_W_bins", "Hs_W_bins"],
-                            keys=[False, "WnD_10_sectors"],
-                            y_filt=wind_sect + 1,
-                        )
-                        tables[2].append(table)
-                    # 144 wind-wave misalignment tables
-                    for wind_sect in range(metocean_data.config["wind_sectors"]):
-                        tables.append([])
-                        for wave_sect in range(metocean_data.config["wave_sectors"]):
-                            table = Scatter(
-                                metocean_data,
-                                ["Tp_W_bins", "Hs_W_bins"],
-                                ["WvD_W_sectors", "WnD_10_sectors"],
-                                x_filt=wind_sect + 1,
-                                y_filt=wave_sect + 1,
-                            )
-                            tables[3 + wind_sect].append(table)
-                    ws = wb.add_worksheet("Hs-Tp (Windsea) (Wind @10m)")
-                    ws.hide_gridlines(2)
-                    for i, row in enumerate(tables):
-                        for j, table in enumerate(row):
-                            table.print_table(
-                                wb,
-                                ws,
-                                row=(1 + i * (6 + table.table.shape[0])),
-                                col=(1 + j * (5 + table.table.shape[1])),
-                            )
-                    tables.clear()
-            # -----------------------------------------------------------------------------------------
-            # -------------------Wind Direction (@HH) vs Wave Direction Tables (Omni)------------------
-            # -----------------------------------------------------------------------------------------
-            table = Scatter(metocean_data, ["WvD_sectors", "WnD_sectors"])
-            tables.append(table)
-            # If spectral wave components have been input
-            if metocean_data.config["wave_spectral"]:
-                table = Scatter(metocean_data, ["WvD_S_sectors", "WnD_sectors"])
-                tables.append(table)
-                table = Scatter(metocean_data, ["WvD_W_sectors", "WnD_sectors"])
-                tables.append(table)
-            ws = wb.add_worksheet("WindDir-WaveDir (@HH)")
-            ws.hide_gridlines(2)
-            for i, table in enumerate(tables):
-                table.print_table(
-                    wb,
-                    ws,
-                    row=1,
-                    col=(1 + i * (5 + table.table.shape[1])),
+            )
+    # -----------------------------------------------------------------------------------------
+    # ----------------------------Conditional Percentile Tables---------------------------------
+    # -----------------------------------------------------------------------------------------
+    if config.get("percentiles"):
+        percentiles = config["percentiles"]
+        if config["wave_status"]:
+            sheets.append(
+                (
+                    "Tp per Hs Percentiles",
+                    "percentile",
+                    [(["Tp", "Hs_bins"], percentiles, "WvD_sectors")],
                 )
-            tables.clear()
-            # -----------------------------------------------------------------------------------------
-            # ----------------Wind Direction (@HH) vs Wave Direction Tables (by WndSpd)----------------
-            # -----------------------------------------------------------------------------------------
-            for i, wind_bin in enumerate(metocean_data.bins["WS"]):
-                tables.append([])
-                table = Scatter(
-                    metocean_data,
-                    ["WvD_sectors", "WnD_sectors"],
-                    keys=["WS_bins", False],
-                    x_filt=wind_bin,
+            )
+        if config["wind_status"] and config["wave_status"]:
+            sheets.append(
+                (
+                    "Hs per WndSpd Percentiles",
+                    "percentile",
+                    [(["Hs", "WS_bins"], percentiles, "WnD_sectors")],
                 )
-                tables[i].append(table)
-                # If Spectral wave components have been input
-                if metocean_data.config["wave_spectral"]:
-                    table = Scatter(
-                        metocean_data,
-                        ["WvD_S_sectors", "WnD_sectors"],
-                        keys=["WS_bins", False],
-                        x_filt=wind_bin,
-                    )
-                    tables[i].append(table)
-                    table = Scatter(
-                        metocean_data,
-                        ["WvD_W_sectors", "WnD_sectors"],
-                        keys=["WS_bins", False],
-                        x_filt=wind_bin,
-                    )
-                    tables[i].append(table)
-            ws = wb.add_worksheet("WindDir-WaveDir by WndSpd (@HH)")
-            ws.hide_gridlines(2)
-            for i, row in enumerate(tables):
-                for j, table in enumerate(row):
-                    table.print_table(
-                        wb,
-                        ws,
-                        row=(1 + i * (6 + table.table.shape[0])),
-                        col=(1 + j * (5 + table.table.shape[1])),
-                    )
-            tables.clear()
-            # -----------------------------------------------------------------------------------------
-            # -------------------Wind Direction (@10m) vs Wave Direction Tables (Omni)------------------
-            # -----------------------------------------------------------------------------------------
-            # If 10m MSL wind data has been input
-            if metocean_data.config["10m"]:
-                table = Scatter(metocean_data, ["WvD_sectors", "WnD_10_sectors"])
-                tables.append(table)
-                # If spectral wave components have been input
-                if metocean_data.config["wave_spectral"]:
-                    table = Scatter(metocean_data, ["WvD_S_sectors", "WnD_10_sectors"])
-                    tables.append(table)
-                    table = Scatter(metocean_data, ["WvD_W_sectors", "WnD_10_sectors"])
-                    tables.append(table)
-                ws = wb.add_worksheet("WindDir-WaveDir (@10m)")
-                ws.hide_gridlines(2)
-                for i, table in enumerate(tables):
-                    table.print_table(
-                        wb,
-                        ws,
-                        row=1,
-                        col=(1 + i * (5 + table.table.shape[1])),
-                    )
-                tables.clear()
-                # -----------------------------------------------------------------------------------------
-                # ----------------Wind Direction (@10m) vs Wave Direction Tables (by WndSpd)---------------
-                # -----------------------------------------------------------------------------------------
-                for i, wind_bin in enumerate(metocean_data.bins["WS"]):
-                    tables.append([])
-                    table = Scatter(
-                        metocean_data,
-                        ["WvD_sectors", "WnD_10_sectors"],
-                        keys=["WS_10_bins", False],
-                        x_filt=wind_bin,
-                    )
-                    tables[i].append(table)
-                    # If Spectral wave components have been input
-                    if metocean_data.config["wave_spectral"]:
-                        table = Scatter(
-                            metocean_data,
-                            ["WvD_S_sectors", "WnD_10_sectors"],
-                            keys=["WS_10_bins", False],
-                            x_filt=wind_bin,
-                        )
-                        tables[i].append(table)
-                        table = Scatter(
-                            metocean_data,
-                            ["WvD_W_sectors", "WnD_10_sectors"],
-                            keys=["WS_10_bins", False],
-                            x_filt=wind_bin,
-                        )
-                        tables[i].append(table)
-                ws = wb.add_worksheet("WindDir-WaveDir by WndSpd(@10m)")
-                ws.hide_gridlines(2)
-                for i, row in enumerate(tables):
-                    for j, table in enumerate(row):
-                        table.print_table(
-                            wb,
-                            ws,
-                            row=(1 + i * (6 + table.table.shape[0])),
-                            col=(1 + j * (5 + table.table.shape[1])),
-                        )
-                tables.clear()
-        # -----------------------------------------------------------------------------------------
-        # ----------------Surface Current Speed Vs Current Direction Tables (Omni)-----------------
-        # -----------------------------------------------------------------------------------------
-        # If current data has been input
-        if metocean_data.config["current_status"]:
-            # Omnidirectional surface current speed  table first
-            table = Scatter(metocean_data, ["CD_sectors", "SV_bins"])
-            tables.append(table)
-            # If current data by components has been input
-            if metocean_data.config["current_components"]:
-                # Create tidal surface current table
-                table = Scatter(metocean_data, ["CD_Tid_sectors", "SV_Tid_bins"])
-                tables.append(table)
-                # Create residual surface current table
-                table = Scatter(metocean_data, ["CD_Res_sectors", "SV_Res_bins"])
-                tables.append(table)
-            ws = wb.add_worksheet("Srfc CurrentSpd-CurrentDir")
-            ws.hide_gridlines(2)
-            for i, table in enumerate(tables):
-                table.print_table(
-                    wb,
-                    ws,
-                    row=1,
-                    col=(1 + i * (5 + table.table.shape[1])),
+            )
+    # -----------------------------------------------------------------------------------------
+    # ------------------------------Weather Window Persistence Tables---------------------------
+    # -----------------------------------------------------------------------------------------
+    if config.get("persistence_report"):
+        limits = {}
+        if config["wave_status"]:
+            limits["Hs"] = config["persistence_hs_limits"]
+        if config["wind_status"]:
+            limits["WS"] = config["persistence_ws_limits"]
+        limits = {var: lim for var, lim in limits.items() if lim}
+        if limits and config["persistence_durations"]:
+            sheets.append(
+                (
+                    "Weather Windows",
+                    "persistence",
+                    (limits, config["persistence_durations"]),
                 )
-            tables.clear()
-            # -----------------------------------------------------------------------------------------
-            # ------------Depth Averaged Current Speed Vs Current Direction Tables (Omni)--------------
-            # -----------------------------------------------------------------------------------------
-            # Omnidirectional depth averaged current speed table first
-            table = Scatter(metocean_data, ["CD_sectors", "DaV_bins"])
-            tables.append(table)
-            # If current data by components has been input
-            if metocean_data.config["current_components"]:
-                # Create tidal depth averaged current table
-                table = Scatter(metocean_data, ["CD_Tid_sectors", "DaV_Tid_bins"])
-                tables.append(table)
-                # Create residual depth averaged current table
-                table = Scatter(metocean_data, ["CD_Res_sectors", "DaV_Res_bins"])
-                tables.append(table)
-            ws = wb.add_worksheet("DpthAvg CurrentSpd-CurrentDir")
-            ws.hide_gridlines(2)
-            for i, table in enumerate(tables):
+            )
+    return sheets
+
+
+def make_sheet_tables(metocean_data, sheet, factory):
+    """make_sheet_tables Calculates all the tables of a sheet of the report plan.
+
+    Args:
+        metocean_data (MetoceanData): A MetoceanData object from the metocean_data module.
+        sheet (tuple): Sheet of the report plan, as returned by get_report_plan.
+        factory (TableFactory): Factory creating the Scatter tables of the report.
+
+    Returns:
+        [list]: Tables of the sheet, in the same layout as the sheet contents.
+    """
+    name, kind, contents = sheet
+    if kind == "row":
+        return [factory.scatter(*spec) for spec in contents]
+    if kind == "grid":
+        return [[factory.scatter(*spec) for spec in row] for row in contents]
+    if kind == "weibull":
+        tables = [Weibull(metocean_data, variables) for variables in contents]
+    elif kind == "percentile":
+        tables = [Percentile(metocean_data, *spec) for spec in contents]
+    elif kind == "persistence":
+        tables = [Persistence(metocean_data, *contents)]
+    else:
+        raise ValueError(f"Unknown sheet kind {kind}.")
+    if factory.progress is not None:
+        factory.progress.update(len(tables))
+    return tables
+
+
+def count_tables(plan):
+    """count_tables Returns the number of tables in a report plan, as returned by get_report_plan."""
+    count = 0
+    for name, kind, contents in plan:
+        if kind == "grid":
+            count += sum(len(row) for row in contents)
+        elif kind == "persistence":
+            count += 1
+        else:
+            count += len(contents)
+    return count
+
+
+def write_workbook(filename, sheets, profile="full", constant_memory=False):
+    """write_workbook Writes sheets of the report plan to a workbook of their own. Run by the worker processes of
+    the scatter report when report_workers is set in the config file.
+
+    Args:
+        filename (str): Path of the .xlsx workbook to write.
+        sheets (list): List of (sheet, tables) tuples, with the sheet as returned by get_report_plan and its tables
+            as returned by make_sheet_tables.
+        profile (str, optional): Report profile of the scatter tables, one of scatter.REPORT_PROFILES. Defaults to "full".
+        constant_memory (bool, optional): Write the workbook in xlsxwriter constant_memory mode. Defaults to False.
+
+    Returns:
+        [float]: Time taken in seconds.
+    """
+    start = time.perf_counter()
+    wb = xlsxwriter.Workbook(filename, {"constant_memory": constant_memory})
+    for sheet, tables in sheets:
+        write_sheet(wb, sheet, tables, profile)
+    wb.close()
+    return time.perf_counter() - start
+
+
+def write_index(wb, ws, parts):
+    """write_index Prints the Index sheet of a report split into several workbooks, with a link to every sheet.
+
+    Args:
+        wb (xlsxwriter.Workbook): xlsxwriter library Workbook class. Excel workbook of the report.
+        ws (xlsxwriter.Worksheet): xlsxwriter library worksheet class. Index sheet of the report.
+        parts (list): List of (sheet name, workbook file, number of tables, future) tuples of the sheets, in order.
+    """
+    header_format = wb.add_format(
+        {"bold": True, "border": 2, "font_color": "#FFFFFF", "bg_color": "072B31"}
+    )
+    ws.set_column(1, 1, 40)
+    ws.set_column(2, 2, 70)
+    for col, header in enumerate(["Sheet", "Workbook", "Tables"]):
+        ws.write_string(1, col + 1, header, header_format)
+    for row, (name, part, n_tables, future) in enumerate(parts, start=2):
+        if future is None:
+            # Sheets of the report workbook itself
+            ws.write_url(row, 1, f"internal:'{name}'!A1", string=name)
+        else:
+            ws.write_url(row, 1, f"external:{os.path.basename(part)}#'{name}'!A1", string=name)
+        ws.write_string(row, 2, os.path.basename(part))
+        ws.write_number(row, 3, n_tables)
+
+
+def write_sheet(wb, sheet, tables, profile="full"):
+    """write_sheet Adds a sheet of the report plan to the workbook and prints its tables.
+
+    Args:
+        wb (xlsxwriter.Workbook): xlsxwriter library Workbook class. Excel workbook of the report.
+        sheet (tuple): Sheet of the report plan, as returned by get_report_plan.
+        tables (list): Tables of the sheet, as returned by make_sheet_tables.
+        profile (str, optional): Report profile of the scatter tables, one of scatter.REPORT_PROFILES. Defaults to "full".
+    """
+    name, kind, contents = sheet
+    ws = wb.add_worksheet(name)
+    ws.hide_gridlines(2)
+    if wb.constant_memory:
+        # Tables are printed one at a time, so their cells are buffered one band of tables at a time
+        ws = RowBand(ws)
+    if profile == "fast":
+        ws = PlainSheet(ws)
+    if kind == "row":
+        scatter_sheet = ScatterSheet(wb, ws, profile)
+        for i, table in enumerate(tables):
+            table.print_table(
+                wb,
+                ws,
+                row=1,
+                col=(1 + i * (5 + table.shape[1])),
+                sheet=scatter_sheet,
+            )
+        scatter_sheet.close()
+    elif kind == "grid":
+        scatter_sheet = ScatterSheet(wb, ws, profile)
+        for i, row in enumerate(tables):
+            for j, table in enumerate(row):
                 table.print_table(
                     wb,
                     ws,
-                    row=1,
-                    col=(1 + i * (5 + table.table.shape[1])),
+                    row=(1 + i * (6 + table.shape[0])),
+                    col=(1 + j * (5 + table.shape[1])),
+                    sheet=scatter_sheet,
                 )
-            tables.clear()
+            if wb.constant_memory:
+                ws.flush()
+        scatter_sheet.close()
+    elif kind == "weibull":
+        for i, table in enumerate(tables):
+            table.print_table(wb, ws, row=1, col=1 + i * 8)
+    else:
+        for table in tables:
+            table.print_table(wb, ws, row=1, col=1)
+    if wb.constant_memory:
+        ws.flush()
+
+
+class PlainSheet:
+    """Class to write the tables of a worksheet without any styling, for the fast report profile.
+
+    Cell formats are dropped, merged ranges are written as their first cell and conditional formats are skipped,
+    so the values and bounds end up at the same positions as in the formatted report. Methods other than the cell,
+    merge and conditional format writes are passed on to the worksheet."""
+
+    def __init__(self, worksheet):
+        """__init__ Initialises the PlainSheet class.
+
+        Args:
+            worksheet (xlsxwriter.Worksheet): xlsxwriter library worksheet class, or a RowBand. Excel sheet to write to.
+        """
+        self.worksheet = worksheet
+
+    def __getattr__(self, name):
+        return getattr(self.worksheet, name)
+
+    def write(self, row, col, data, cell_format=None):
+        # Formatted blank cells only carry styling
+        if data is not None:
+            self.worksheet.write(row, col, data)
+
+    def write_number(self, row, col, number, cell_format=None):
+        self.worksheet.write_number(row, col, number)
+
+    def write_string(self, row, col, string, cell_format=None):
+        self.worksheet.write_string(row, col, string)
+
+    def write_blank(self, row, col, blank=None, cell_format=None):
+        pass
+
+    def merge_range(self, first_row, first_col, last_row, last_col, data, cell_format=None):
+        self.write(first_row, first_col, data)
+
+    def conditional_format(self, *args):
+        pass
+
 
-    end_time = time.perf_counter()
-    print(f"Report Finished in {round((end_time - start_time)/60, 2)} minutes.")
\ No newline at end of file
+class RowBand:
+    """Class to write the tables of a worksheet row by row, as workbooks in constant_memory mode require.
+
+    In constant_memory mode xlsxwriter writes a row to disk as soon as a later row is written, and drops the cells
+    written to rows above it afterwards. The print_table methods write one table at a time, top to bottom, so the
+    cells of a band of tables printed side by side are buffered here and written row by row across the whole band
+    when it is flushed. Memory then scales with the band instead of the sheet. Methods other than the cell and
+    merge writes are passed on to the worksheet."""
+
+    def __init__(self, worksheet):
+        """__init__ Initialises an empty RowBand.
+
+        Args:
+            worksheet (xlsxwriter.Worksheet): xlsxwriter library worksheet class. Excel sheet to write the cells to.
+        """
+        # flush adds the merged ranges to Worksheet.merge, which is private (see flush)
+        if xlsxwriter.__version__.split(".")[0] != "3" or not isinstance(getattr(worksheet, "merge", None), list):
+            sys.exit(
+                f"Constant memory scatter reports need xlsxwriter 3.x, not {xlsxwriter.__version__}. "
+                "Install xlsxwriter 3.x or turn off cell D69 of the config file."
+            )
+        self.worksheet = worksheet
+        # Buffered writes by row, as lists of (column, worksheet method, arguments)
+        self.cells = {}
+        self.merges = []
+
+    def __getattr__(self, name):
+        return getattr(self.worksheet, name)
+
+    def add(self, row, col, method, args):
+        """add Buffers a cell write until the band is flushed."""
+        self.cells.setdefault(row, []).append((col, method, args))
+
+    def write(self, row, col, *args):
+        self.add(row, col, "write", args)
+
+    def write_number(self, row, col, *args):
+        self.add(row, col, "write_number", args)
+
+    def write_string(self, row, col, *args):
+        self.add(row, col, "write_string", args)
+
+    def write_blank(self, row, col, *args):
+        self.add(row, col, "write_blank", args)
+
+    def merge_range(self, first_row, first_col, last_row, last_col, data, cell_format=None):
+        """merge_range Buffers a merged range as its first cell and the formatted blank cells padding the rest of it,
+        like xlsxwriter's merge_range, so that they are also written in row order."""
+        self.merges.append([first_row, first_col, last_row, last_col])
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                if row == first_row and col == first_col:
+                    self.add(row, col, "write", (data, cell_format))
+                else:
+                    self.add(row, col, "write_blank", (None, cell_format))
+
+    def flush(self):
+        """flush Writes the buffered cells to the worksheet in row order and clears the band."""
+        for row in sorted(self.cells):
+            # Stable sort, so that the last write to a cell still wins
+            for col, method, args in sorted(self.cells[row], key=lambda cell: cell[0]):
+                getattr(self.worksheet, method)(row, col, *args)
+        # The cells of the merged ranges are written above, so only the ranges are added. xlsxwriter has no public
+        # call for this: merge_range writes the blank cells of a range spanning several rows straight away, which
+        # in constant_memory mode drops the rest of its first row. Worksheet.merge is the list of ranges merge_range
+        # appends to and the worksheet writes on close, in xlsxwriter 3.x (checked up to 3.2.9, see __init__).
+        self.worksheet.merge.extend(self.merges)
+        self.cells = {}
+        self.merges = []
+
+
+def print_bin_size_sweep(metocean_data, suffix=""):
+    """print_bin_size_sweep Prints one scatter table report per combination of the bin size variants in the
+    config file. Every table is counted once at the config bin sizes and re-binned for each variant.
+
+    Args:
+        metocean_data (MetoceanData): A MetoceanData object from the metocean_data module.
+        suffix (str, optional): Text appended to the report file names. Defaults to "".
+    """
+    settings = list(metocean_data.config["bin_size_sweep"].keys())
+    cache = {}
+    for sizes in itertools.product(
+        *[metocean_data.config["bin_size_sweep"][s] for s in settings]
+    ):
+        print_scatter_report(metocean_data, dict(zip(settings, sizes)), cache, suffix)
+
+
+def print_sector_sweep(metocean_data):
+    """print_sector_sweep Prints the scatter table report(s) once per combination of the sector count variants
+    in the config file. Sector columns of each variant are assembled from the fine angular bins of
+    MetoceanData.resectorise instead of sectorising the raw directions again. The sectors of the config file are
+    restored afterwards, so that the rest of the run sees them.
+
+    Args:
+        metocean_data (MetoceanData): A MetoceanData object from the metocean_data module.
+    """
+    # Sector settings without variants keep their config value, but are still rotated by the offset
+    sweep = {
+        setting: metocean_data.config["sector_sweep"].get(
+            setting, [metocean_data.config[setting]]
+        )
+        for setting in SECTOR_GROUPS
+        if setting in metocean_data.config
+    }
+    settings = list(sweep.keys())
+    offset = metocean_data.config["sector_offset"]
+    config_sectors = {setting: metocean_data.config[setting] for setting in settings}
+    try:
+        for counts in itertools.product(*[sweep[s] for s in settings]):
+            with metocean_data.profiler.span("resectorise"):
+                metocean_data.resectorise(dict(zip(settings, counts)), offset)
+            suffix = "_" + "_".join(
+                f"{setting.replace('_sectors', '')}{count}S"
+                for setting, count in zip(settings, counts)
+                if setting in metocean_data.config["sector_sweep"]
+            )
+            if offset:
+                suffix += f"_{offset:g}deg"
+            if metocean_data.config["bin_size_sweep"]:
+                print_bin_size_sweep(metocean_data, suffix)
+            else:
+                print_scatter_report(metocean_data, suffix=suffix)
+    finally:
+        with metocean_data.profiler.span("resectorise"):
+            metocean_data.resectorise(config_sectors, offset)
+
+
+def get_bin_factors(metocean_data, bin_sizes):
+    """get_bin_factors Works out how many config-sized bins make up one bin of each variable.
+
+    Args:
+        metocean_data (MetoceanData): A MetoceanData object from the metocean_data module.
+        bin_sizes (dict): Dictionary of {bin size setting: bin size}. Can be None.
+
+    Returns:
+        [dict]: Dictionary of {variable: integer factor} for every re-binned variable.
+    """
+    factors = {}
+    for setting, size in (bin_sizes or {}).items():
+        base = metocean_data.config[setting]
+        factor = int(round(size / base))
+        if factor < 1 or not np.isclose(factor * base, size):
+            sys.exit(
+                f"Bin size {size} for {setting} is not a multiple of the config bin size {base}. Check the config file and try again."
+            )
+        for header in BIN_SIZE_GROUPS[setting]:
+            if header in metocean_data.bins:
+                factors[header] = factor
+    return factors
+
+
+def get_fine_bins(centres, coarse_centre, factor):
+    """get_fine_bins Returns the config-sized bin centres that fall within a coarse bin.
+
+    Args:
+        centres (numpy.ndarray): Bin centres at the config bin size.
+        coarse_centre (float): Centre of the coarse bin.
+        factor (int): Number of config-sized bins in a coarse bin.
+
+    Returns:
+        [numpy.ndarray]: Bin centres within the coarse bin.
+    """
+    index = int(np.floor(coarse_centre / (2 * centres[0] * factor)))
+    return centres[index * factor : (index + 1) * factor]
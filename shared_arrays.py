@@ -0,0 +1,66 @@
+"""
+Module for the SharedArrays class
+Metocean & Energy Assessment Department
+
+Shares read-only numpy arrays with worker processes through shared memory, so that the data columns are copied
+once instead of being pickled to every worker.
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class SharedArrays:
+    """Class to copy numpy arrays to shared memory blocks in the parent process. Use it as a context manager: the
+    blocks are freed on exit, so the workers must be done by then."""
+
+    def __init__(self, arrays):
+        """__init__ Initialises the SharedArrays class and copies the arrays to shared memory.
+
+        Args:
+            arrays (dict): Dictionary of {name: numpy array}.
+        """
+        self.blocks = []
+        # Picklable description of the arrays, to pass to the workers and read with attach
+        self.spec = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        """close Frees the shared memory blocks."""
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(spec):
+    """attach Returns read-only views of the arrays of a SharedArrays spec, in a worker process.
+
+    Args:
+        spec (dict): SharedArrays.spec of the parent process.
+
+    Returns:
+        [tuple]: Tuple of ({name: numpy array}, shared memory blocks). Close the blocks once the arrays, and any
+            views of them, are no longer used.
+    """
+    arrays = {}
+    blocks = []
+    for name, (block_name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        array = np.ndarray(shape, dtype, buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+        blocks.append(block)
+    return arrays, blocks
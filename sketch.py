@@ -0,0 +1,107 @@
+"""
+Module for the QuantileSketch class
+Metocean & Energy Assessment Department
+"""
+
+import numpy as np
+
+
+class QuantileSketch:
+    """A mergeable KLL quantile sketch. Holds a bounded number of values whatever the size of the stream,
+    and answers quantile queries within a rank error of roughly error * n."""
+
+    def __init__(self, error=0.01, seed=None):
+        """__init__ Initialises an empty sketch.
+
+        Args:
+            error (float, optional): Target normalised rank error of the quantiles. Defaults to 0.01.
+            seed (int, optional): Seed of the random compaction offsets, for reproducible results. Defaults to None.
+        """
+        self.error = error
+        # Capacity of the top compactor. Rank error of KLL is about 1.7 / k.
+        self.k = max(8, int(np.ceil(1.7 / error)))
+        self.rng = np.random.default_rng(seed)
+        self.compactors = [np.empty(0)]
+        self.n = 0
+
+    def update(self, values):
+        """update Adds a batch of values to the sketch. NaNs are ignored.
+
+        Args:
+            values (numpy.ndarray): Values to add.
+        """
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self.n += len(values)
+        self.compactors[0] = np.concatenate([self.compactors[0], values])
+        self.compress()
+
+    def merge(self, other):
+        """merge Adds the contents of another sketch into this one. Used to combine per-chunk or per-worker sketches.
+
+        Args:
+            other (QuantileSketch): Sketch to merge into this one. It is not modified.
+        """
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append(np.empty(0))
+        for h, items in enumerate(other.compactors):
+            self.compactors[h] = np.concatenate([self.compactors[h], items])
+        self.n += other.n
+        self.compress()
+
+    def capacity(self, h):
+        """capacity Returns the capacity of compactor h. Lower compactors hold geometrically fewer items."""
+        depth = len(self.compactors) - h - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def compress(self):
+        """compress Compacts every compactor above its capacity. Every other item of the sorted compactor,
+        starting at a random offset, is promoted to the next level with twice the weight."""
+        h = 0
+        while h < len(self.compactors):
+            items = self.compactors[h]
+            if len(items) > self.capacity(h):
+                if h + 1 == len(self.compactors):
+                    self.compactors.append(np.empty(0))
+                items = np.sort(items)
+                # Keep one item back if the number of items is odd
+                keep = items[:1] if len(items) % 2 else items[:0]
+                items = items[len(keep) :]
+                offset = self.rng.integers(2)
+                self.compactors[h + 1] = np.concatenate(
+                    [self.compactors[h + 1], items[offset::2]]
+                )
+                self.compactors[h] = keep
+                # The capacities change when a level is added, so start again from the bottom
+                h = 0
+                continue
+            h += 1
+
+    def quantile(self, q):
+        """quantile Returns the approximate quantiles of the values added so far.
+
+        Args:
+            q (float or list): Quantile(s) between 0 and 1.
+
+        Returns:
+            [numpy.ndarray]: Approximate quantiles. NaN if the sketch is empty.
+        """
+        q = np.atleast_1d(np.asarray(q, dtype=float))
+        if self.n == 0:
+            return np.full(q.shape, np.nan)
+        # Nothing has been compacted yet, so the quantiles are exact
+        if len(self.compactors) == 1:
+            return np.quantile(self.compactors[0], q)
+        items = np.concatenate(self.compactors)
+        weights = np.concatenate(
+            [np.full(len(c), 2.0 ** h) for h, c in enumerate(self.compactors)]
+        )
+        order = np.argsort(items, kind="stable")
+        items = items[order]
+        cumulative = np.cumsum(weights[order])
+        index = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        return items[np.minimum(index, len(items) - 1)]
+
+    def median(self):
+        """median Returns the approximate median of the values added so far."""
+        return self.quantile(0.5)[0]
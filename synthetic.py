@@ -0,0 +1,290 @@
+"""
+Module to generate synthetic hindcast input files
+Metocean & Energy Assessment Department
+
+Writes wind, wave, current and seawater .txt files in the layouts read by the MetoceanData.parse_* methods,
+together with a matching config .xlsx file. Used for benchmarking and testing without real hindcast data.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from metocean_data import config_cell_values
+
+
+def write_synthetic_inputs(
+    directory,
+    years=1,
+    freq="1H",
+    spectral=True,
+    peak_enhancement=False,
+    ten_m=True,
+    current=True,
+    current_components=False,
+    water=False,
+    edges=0,
+    seed=0,
+    **config,
+):
+    """write_synthetic_inputs Generates a synthetic hindcast and writes it as input .txt files plus a config file.
+
+    Args:
+        directory (str): Folder to write the files to. Created if it does not exist.
+        years (float, optional): Length of the timeseries in years. Defaults to 1.
+        freq (str, optional): Time step of the timeseries as a pandas frequency, e.g. "1H" or "10min". Defaults to "1H".
+        spectral (bool, optional): Include windsea and swell wave components. Defaults to True.
+        peak_enhancement (bool, optional): Include peak enhancement factor columns in the wave file. Defaults to False.
+        ten_m (bool, optional): Include wind at 10m MSL. Defaults to True.
+        current (bool, optional): Write a current file. Defaults to True.
+        current_components (bool, optional): Include tidal and residual current components. Defaults to False.
+        water (bool, optional): Write a seawater file. Defaults to False.
+        edges (float, optional): Share of the values moved onto bin and sector edges, or missing for directions, to
+            exercise the edge semantics of the binning. See move_to_edges. Defaults to 0.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+        **config: Overrides of the config file values, as keys of MetoceanData.config (e.g. wind_sectors=16).
+
+    Returns:
+        [tuple]: Tuple of (config file path, dictionary of data file paths) as taken by MetoceanData.
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    # Separate stream, so that the rest of the data does not depend on edges
+    edge_rng = np.random.default_rng([seed, 1])
+    index = pd.date_range("2000-01-01", periods=get_periods(years, freq), freq=freq)
+    n = len(index)
+    hours = (index - index[0]) / pd.Timedelta(hours=1)
+    # Time columns in the YYYYMMDD and HHMM format read by make_time_index
+    date = index.strftime("%Y%m%d").astype(int)
+    time = index.strftime("%H%M").astype(int)
+
+    # Wind speed from a correlated Gaussian process mapped onto a Weibull distribution, with a seasonal cycle
+    steps_per_day = pd.Timedelta(days=1) / pd.Timedelta(freq)
+    z = ar1(rng, n, 1 - 1 / (2 * steps_per_day))
+    season = 1 + 0.2 * np.cos(2 * np.pi * index.dayofyear / 365.25)
+    ws = 9.0 * season * (-np.log(norm_sf(z))) ** (1 / 2.1)
+    wnd = (200 + np.cumsum(rng.normal(0, 6 / np.sqrt(steps_per_day / 24), n))) % 360
+    temp = 10 - 5 * np.cos(2 * np.pi * index.dayofyear / 365.25) + rng.normal(0, 1, n)
+    roh = 1.225 + 0.003 * (10 - temp)
+
+    files = {}
+    wind = [date, time, ws, wnd, temp, roh]
+    if ten_m:
+        wind += [ws * 0.78, (wnd + rng.normal(0, 3, n)) % 360, temp + 0.5, roh + 0.001]
+    files["wind"] = write_txt(
+        directory, "wind", move_to_edges(edge_rng, wind, [3, 7], edges)
+    )
+
+    # Windsea driven by the wind, swell as an independent slowly varying process
+    hs_w = 0.025 * ws ** 1.8 + 0.05
+    tp_w = 3.3 * hs_w ** 0.5 + 1 + rng.uniform(0, 0.5, n)
+    wvd_w = (wnd + 180 + rng.normal(0, 15, n)) % 360
+    hs_s = 0.6 * np.exp(0.5 * ar1(rng, n, 1 - 1 / (5 * steps_per_day)))
+    tp_s = 10 + 3 * hs_s ** 0.5 + rng.uniform(0, 1, n)
+    wvd_s = (290 + rng.normal(0, 20, n)) % 360
+    hs = np.sqrt(hs_w ** 2 + hs_s ** 2)
+    tp = np.where(hs_w > hs_s, tp_w, tp_s)
+    wvd = np.where(hs_w > hs_s, wvd_w, wvd_s)
+    wave = [date, time, hs, wvd, tp, tp * 0.72]
+    wave_directions = [3]
+    if peak_enhancement:
+        wave.append(np.clip(3.3 + rng.normal(0, 0.5, n), 1, 7))
+    if spectral:
+        wave_directions.append(len(wave) + 1)
+        wave += [hs_w, wvd_w, tp_w, tp_w * 0.75]
+        if peak_enhancement:
+            wave.append(np.clip(3.3 + rng.normal(0, 0.5, n), 1, 7))
+        wave_directions.append(len(wave) + 1)
+        wave += [hs_s, wvd_s, tp_s, tp_s * 0.7]
+        if peak_enhancement:
+            wave.append(np.full(n, 10.0))
+    files["wave"] = write_txt(
+        directory, "wave", move_to_edges(edge_rng, wave, wave_directions, edges)
+    )
+
+    if current:
+        # Semi-diurnal tide plus a wind-driven residual
+        tide = 0.8 * np.sin(2 * np.pi * hours / 12.42) * (
+            1 + 0.3 * np.cos(2 * np.pi * hours / (14.77 * 24))
+        )
+        sv_tid = np.abs(tide)
+        cd_tid = np.where(tide > 0, 45.0, 225.0) + rng.normal(0, 5, n)
+        sv_res = 0.015 * ws + rng.uniform(0, 0.05, n)
+        cd_res = (wnd + 180 + rng.normal(0, 20, n)) % 360
+        u = sv_tid * np.sin(np.radians(cd_tid)) + sv_res * np.sin(np.radians(cd_res))
+        v = sv_tid * np.cos(np.radians(cd_tid)) + sv_res * np.cos(np.radians(cd_res))
+        sv = np.hypot(u, v)
+        cd = np.degrees(np.arctan2(u, v)) % 360
+        current_cols = [date, time, sv, sv * 0.85, cd]
+        if current_components:
+            current_cols += [sv_tid, sv_tid * 0.85, cd_tid % 360, sv_res, sv_res * 0.7, cd_res]
+        files["current"] = write_txt(
+            directory, "current", move_to_edges(edge_rng, current_cols, [4, 7, 10], edges)
+        )
+
+    if water:
+        sst = 12 - 4 * np.cos(2 * np.pi * index.dayofyear / 365.25) + rng.normal(0, 0.3, n)
+        salt = 34.5 + rng.normal(0, 0.2, n)
+        files["water"] = write_txt(
+            directory, "water", [date, time, salt, sst, 1025 + 0.8 * (salt - 35) - 0.2 * (sst - 10)]
+        )
+
+    settings = {
+        "project": "SYNTHETIC",
+        "method": "median",
+        "bin_type": "left",
+        "hub_weibull_a": 10.0,
+        "hub_weibull_k": 2.1,
+        "hub_height": 150,
+        "10m": ten_m,
+        "wind_bin_size": 1,
+        "wind_sectors": 12,
+        "wave_spectral": spectral,
+        "peak_enhancement": peak_enhancement,
+        "derive_peak_enhancement": False,
+        "wave_height_bin_size": 0.5,
+        "wave_period_bin_size": 1,
+        "wave_sectors": 12,
+        "current_bin_size": 0.1,
+        "current_sectors": 12,
+        "current_components": current_components,
+        "nss_report": True,
+        "scatter_report": True,
+        "wind_status": True,
+        "wave_status": True,
+        "current_status": current,
+        "water_status": water,
+    }
+    settings.update(config)
+    config_file = write_config(os.path.join(directory, "config.xlsx"), settings)
+    return config_file, files
+
+
+def write_config(filepath, settings):
+    """write_config Writes a config .xlsx file with the cell layout read by MetoceanData.parse_config.
+
+    Args:
+        filepath (str): Path of the config file to write.
+        settings (dict): Config values, as keys of MetoceanData.config.
+
+    Returns:
+        [str]: Path of the config file.
+    """
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Config"
+    set_config_cells(ws, settings)
+    wb.save(filepath)
+    return filepath
+
+
+def update_config(filepath, settings, output):
+    """update_config Copies a config .xlsx file with some of its values changed.
+
+    Args:
+        filepath (str): Path of the config file to copy.
+        settings (dict): Config values to change, as keys of MetoceanData.config. None empties the cell.
+        output (str): Path of the config file to write.
+
+    Returns:
+        [str]: Path of the written config file.
+    """
+    wb = load_workbook(filepath)
+    set_config_cells(wb["Config"], settings)
+    wb.save(output)
+    return output
+
+
+def set_config_cells(ws, settings):
+    """set_config_cells Writes config values to the cells of a Config worksheet.
+
+    Args:
+        ws (openpyxl.worksheet.worksheet.Worksheet): Config worksheet.
+        settings (dict): Config values, as keys of MetoceanData.config.
+    """
+    for cell, value in config_cell_values(settings).items():
+        ws[cell] = value
+
+
+def write_txt(directory, name, columns):
+    """write_txt Writes columns to a tab separated .txt file with no header.
+
+    Args:
+        directory (str): Folder to write the file to.
+        name (str): Name of the file, without extension.
+        columns (list): List of 1D arrays. The first two are the date and time columns.
+
+    Returns:
+        [str]: Path of the written file.
+    """
+    filepath = os.path.join(directory, f"{name}.txt")
+    df = pd.DataFrame({i: np.asarray(col) for i, col in enumerate(columns)})
+    df.to_csv(filepath, sep="\t", header=False, index=False, float_format="%.4f")
+    return filepath
+
+
+def move_to_edges(rng, columns, directions, share):
+    """move_to_edges Moves a share of the values of the data columns of a file onto bin and sector edges. Values are
+    rounded to multiples of 0.5, which are edges of every bin size the config files use, including 0. Directions are
+    rounded to multiples of 3.75 deg, the sector edges of 4, 8, 12, 16 and 24 sectors, up to 360, or made missing.
+
+    Args:
+        rng (numpy.random.Generator): Random generator.
+        columns (list): List of 1D arrays, as taken by write_txt.
+        directions (list): Positions of the direction columns.
+        share (float): Share of the values of every column to move. 0 leaves the columns unchanged.
+
+    Returns:
+        [list]: List of 1D arrays.
+    """
+    if not share:
+        return columns
+    moved = columns[:2]
+    for i, values in enumerate(columns[2:], 2):
+        values = np.array(values, dtype=float)
+        rows = rng.random(len(values)) < share
+        if i in directions:
+            values[rows] = np.round(values[rows] / 3.75) * 3.75
+            values[rows & (rng.random(len(values)) < 0.2)] = np.nan
+        else:
+            values[rows] = np.round(values[rows] * 2) / 2
+        moved.append(values)
+    return moved
+
+
+def get_periods(years, freq):
+    """get_periods Returns the number of time steps of freq in a number of years."""
+    return int(round(years * 365.25 * pd.Timedelta(days=1) / pd.Timedelta(freq)))
+
+
+def ar1(rng, n, phi):
+    """ar1 Returns a first order autoregressive process with unit variance.
+
+    Args:
+        rng (numpy.random.Generator): Random generator.
+        n (int): Number of samples.
+        phi (float): Lag one autocorrelation.
+
+    Returns:
+        [numpy.ndarray]: Array of n samples.
+    """
+    noise = rng.normal(0, np.sqrt(1 - phi ** 2), n)
+    noise[0] = rng.normal()
+    # Recursive filter solved in blocks of doubling length, which keeps it vectorised
+    x = noise.copy()
+    step = 1
+    coefficient = phi
+    while step < n:
+        x[step:] += coefficient * x[:-step]
+        coefficient = coefficient ** 2
+        step *= 2
+    return x
+
+
+def norm_sf(z):
+    """norm_sf Returns the survival function of the standard normal distribution."""
+    from math import erfc
+
+    return np.clip(np.vectorize(erfc)(z / np.sqrt(2)) / 2, 1e-12, 1 - 1e-12)
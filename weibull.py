@@ -0,0 +1,181 @@
+"""
+Module for the Weibull class
+Metocean & Energy Assessment Department
+"""
+
+import numpy as np
+
+
+class Weibull:
+    """Class to represent the directional Weibull distribution fit of a wind speed timeseries."""
+
+    def __init__(self, met_data, variables=["WS", "WnD_sectors"], tol=1e-6, max_iter=50):
+        """__init__ Initialises the Weibull class and fits the Weibull A and k parameters for every wind
+        sector and the omnidirectional case by maximum likelihood.
+
+        All sectors are solved at the same time. The shape k of every sector is first estimated from the
+        moments of the data and then refined with Newton iterations on the likelihood equation, where the
+        sums over each sector are taken with a single np.bincount per iteration.
+
+        Args:
+            met_data (MetoceanData): MetoceanData object to extract statistics from.
+            variables (list, optional): List of strings. Wind speed and wind direction sector keys of the met_data dataframe.
+                Defaults to ["WS", "WnD_sectors"].
+            tol (float, optional): Convergence tolerance on the shape parameter k. Defaults to 1e-6.
+            max_iter (int, optional): Maximum number of Newton iterations. Defaults to 50.
+        """
+        self.ws_var = variables[0]  # Key for the wind speed variable
+        self.dir_var = variables[1]  # Key for the wind direction sector variable
+        self.n_sectors = met_data.config["wind_sectors"]
+        self.sector_offset = met_data.config.get("sector_offset", 0)
+        # The config file holds the Weibull parameters at hub height only
+        self.config_A = None
+        self.config_k = None
+        if self.ws_var == "WS":
+            self.config_A = met_data.config.get("hub_weibull_a")
+            self.config_k = met_data.config.get("hub_weibull_k")
+
+        speed = met_data.data[self.ws_var].to_numpy(float)
+        sector = met_data.sector_numbers(self.dir_var)
+        # Calms and missing values cannot be fitted and are left out
+        valid = speed > 0
+        speed = speed[valid]
+        sector = sector[valid]
+
+        # Group 0 is omnidirectional, groups 1 to n_sectors are the sectors. Every record belongs to two groups,
+        # except records with no direction (sector 0), which are only omnidirectional.
+        n_groups = self.n_sectors + 1
+        directional = sector > 0
+        group = np.concatenate([np.zeros(len(speed), dtype=np.int64), sector[directional]])
+        log_x = np.log(speed)
+        log_x = np.concatenate([log_x, log_x[directional]])
+
+        n = np.bincount(group, minlength=n_groups).astype(float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.bincount(group, weights=np.exp(log_x), minlength=n_groups) / n
+            mean_sq = np.bincount(group, weights=np.exp(2 * log_x), minlength=n_groups) / n
+            mean_log = np.bincount(group, weights=log_x, minlength=n_groups) / n
+            # Moment estimate of k (Justus) as the starting point
+            std = np.sqrt(np.maximum(mean_sq - mean ** 2, 0))
+            k = np.where(std > 0, (std / mean) ** -1.086, 2.0)
+        k[~np.isfinite(k)] = 2.0
+
+        for iteration in range(max_iter):
+            x_k = np.exp(k[group] * log_x)
+            s0 = np.bincount(group, weights=x_k, minlength=n_groups)
+            s1 = np.bincount(group, weights=x_k * log_x, minlength=n_groups)
+            s2 = np.bincount(group, weights=x_k * log_x ** 2, minlength=n_groups)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                f = 1 / k + mean_log - s1 / s0
+                df = -1 / k ** 2 - (s2 * s0 - s1 ** 2) / s0 ** 2
+                step = np.where(n > 1, f / df, 0)
+            step[~np.isfinite(step)] = 0
+            # Keep k positive
+            k = np.maximum(k - step, k / 2)
+            if np.all(np.abs(step) < tol):
+                break
+
+        x_k = np.exp(k[group] * log_x)
+        s0 = np.bincount(group, weights=x_k, minlength=n_groups)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.A = (s0 / n) ** (1 / k)
+        self.k = k
+        self.A[n < 2] = np.nan
+        self.k[n < 2] = np.nan
+        self.mean = mean
+        self.frequency = n / n[0]
+        self.iterations = iteration + 1
+
+        print(
+            f"Weibull fit of {self.ws_var} complete! Omni A = {self.A[0]:.2f} m/s, k = {self.k[0]:.2f}."
+        )
+
+    def print_table(self, workbook, worksheet, row=0, col=0):
+        """print_table Function to print the Weibull parameters per sector into an excel sheet, followed by a
+        comparison of the omnidirectional fit against the values in the config file.
+
+        Args:
+            workbook (xlsxwriter.Workbook): xlsxwriter library Workbook class. Excel workbook at which to print the table.
+            worksheet (xlsxwriter.Worksheet): xlsxwriter library worksheet class. Excel sheet at which to print the table.
+            row (int, optional): Zero-indexed row number in the excel sheet to place the table. Refers to the upper-left. Defaults to 0.
+            col (int, optional): Zero-indexed column number in the excel sheet to place the table. Refers to the upper-left. Defaults to 0.
+        """
+        header_format = workbook.add_format(
+            {
+                "bold": True,
+                "border": 2,
+                "font_color": "#FFFFFF",
+                "bg_color": "072B31",
+                "align": "center",
+            }
+        )
+        index_format = workbook.add_format(
+            {"border": 1, "bold": True, "align": "center", "bg_color": "D9D9D6"}
+        )
+        number_format = workbook.add_format(
+            {"border": 1, "align": "center", "num_format": "0.00"}
+        )
+        percent_format = workbook.add_format(
+            {"border": 1, "align": "center", "num_format": "0.00%"}
+        )
+        headers = [
+            "Sector",
+            "Lower [degN]",
+            "Upper [degN]",
+            "Frequency [%]",
+            "Mean [m/s]",
+            "Weibull A [m/s]",
+            "Weibull k [-]",
+        ]
+        worksheet.set_column(col, col + len(headers) - 1, 15)
+        worksheet.merge_range(
+            row,
+            col,
+            row,
+            col + len(headers) - 1,
+            f"Weibull fit of {self.ws_var} by {self.dir_var}",
+            header_format,
+        )
+        for c, header in enumerate(headers):
+            worksheet.write_string(row + 1, col + c, header, index_format)
+
+        width = 360 / self.n_sectors
+        for g in range(self.n_sectors + 1):
+            r = row + 2 + g
+            if g == 0:
+                worksheet.write_string(r, col, "OMNI", index_format)
+                worksheet.write_number(r, col + 1, 0, index_format)
+                worksheet.write_number(r, col + 2, 360, index_format)
+            else:
+                centre = self.sector_offset + (g - 1) * width
+                worksheet.write_number(r, col, g, index_format)
+                worksheet.write_number(r, col + 1, (centre - width / 2) % 360, index_format)
+                worksheet.write_number(r, col + 2, (centre + width / 2) % 360, index_format)
+            worksheet.write_number(r, col + 3, self.frequency[g], percent_format)
+            for c, value in enumerate([self.mean[g], self.A[g], self.k[g]]):
+                if np.isnan(value):
+                    worksheet.write_string(r, col + 4 + c, "NaN", number_format)
+                else:
+                    worksheet.write_number(r, col + 4 + c, value, number_format)
+
+        # Comparison with the Weibull parameters in the config file
+        if self.config_A is None or self.config_k is None:
+            return
+        r = row + 4 + self.n_sectors
+        worksheet.merge_range(
+            r, col, r, col + 3, "Omni fit Vs. config file", header_format
+        )
+        for c, header in enumerate(["Parameter", "Config", "Fitted", "Difference [%]"]):
+            worksheet.write_string(r + 1, col + c, header, index_format)
+        for i, (name, config, fitted) in enumerate(
+            [
+                ("Weibull A [m/s]", self.config_A, self.A[0]),
+                ("Weibull k [-]", self.config_k, self.k[0]),
+            ]
+        ):
+            worksheet.write_string(r + 2 + i, col, name, index_format)
+            worksheet.write_number(r + 2 + i, col + 1, config, number_format)
+            worksheet.write_number(r + 2 + i, col + 2, fitted, number_format)
+            worksheet.write_number(
+                r + 2 + i, col + 3, (fitted - config) / config, percent_format
+            )